@@ -3,6 +3,9 @@ import enum
 __all__: list[str] = [
     "ImageMimeTypes",
     "ErrorCodes",
+    "JobStatus",
+    "Priority",
+    "ResourceState",
 ]
 
 
@@ -14,3 +17,34 @@ class ImageMimeTypes(enum.StrEnum):
 class ErrorCodes(enum.StrEnum):
     COMPLETION_ERROR = "COMPLETION_ERROR"
     CLIENT_INITIALIZATION_ERROR = "CLIENT_INITIALIZATION_ERROR"
+    CIRCUIT_OPEN = "CIRCUIT_OPEN"
+    DEADLINE_EXCEEDED = "DEADLINE_EXCEEDED"
+    RATE_LIMITED = "RATE_LIMITED"
+    PATIENT_NOT_FOUND = "PATIENT_NOT_FOUND"
+    VERSION_CONFLICT = "VERSION_CONFLICT"
+    INVALID_UPLOAD = "INVALID_UPLOAD"
+    UPLOAD_TOO_LARGE = "UPLOAD_TOO_LARGE"
+    JOB_NOT_FOUND = "JOB_NOT_FOUND"
+    QUEUE_FULL = "QUEUE_FULL"
+    RETRIEVAL_UNAVAILABLE = "RETRIEVAL_UNAVAILABLE"
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BACKGROUND = 2
+
+
+class JobStatus(enum.StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class ResourceState(enum.StrEnum):
+    DISABLED = "disabled"
+    COLD = "cold"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
@@ -8,6 +8,16 @@ from app.utils.logger import logger
 __all__ = [
     "CoreError",
     "CompletionError",
+    "CircuitOpenError",
+    "DeadlineExceededError",
+    "RateLimitExceededError",
+    "PatientNotFoundError",
+    "VersionConflictError",
+    "InvalidUploadError",
+    "UploadTooLargeError",
+    "JobNotFoundError",
+    "QueueFullError",
+    "RetrievalUnavailableError",
 ]
 
 
@@ -111,3 +121,93 @@ class ClientInitializationError(CoreError):
             ErrorCodes.CLIENT_INITIALIZATION_ERROR,
             details=str(details),
         )
+
+
+class CircuitOpenError(CoreError):
+    def __init__(self, name: str, retry_in: float) -> None:
+        super().__init__(
+            "The upstream service is unavailable, failing fast.",
+            ErrorCodes.CIRCUIT_OPEN,
+            details={"circuit": name, "retry_in": round(retry_in, 3)},
+        )
+
+
+class DeadlineExceededError(CoreError):
+    def __init__(self, details: Exception | str) -> None:
+        super().__init__(
+            "The request deadline was exceeded.",
+            ErrorCodes.DEADLINE_EXCEEDED,
+            details=str(details),
+        )
+
+
+class RateLimitExceededError(CoreError):
+    def __init__(self, model: str, reason: str) -> None:
+        super().__init__(
+            "The local rate limit could not admit the request in time.",
+            ErrorCodes.RATE_LIMITED,
+            details={"model": model, "reason": reason},
+        )
+
+
+class PatientNotFoundError(CoreError):
+    def __init__(self, patient_id: str) -> None:
+        super().__init__(
+            "The patient record was not found.",
+            ErrorCodes.PATIENT_NOT_FOUND,
+            details={"patient_id": patient_id},
+        )
+
+
+class VersionConflictError(CoreError):
+    def __init__(self, patient_id: str, expected: int, current: int) -> None:
+        super().__init__(
+            "The patient record was modified concurrently.",
+            ErrorCodes.VERSION_CONFLICT,
+            details={"patient_id": patient_id, "expected": expected, "current": current},
+        )
+
+
+class InvalidUploadError(CoreError):
+    def __init__(self, details: Exception | str) -> None:
+        super().__init__(
+            "The uploaded file could not be read.",
+            ErrorCodes.INVALID_UPLOAD,
+            details=str(details),
+        )
+
+
+class UploadTooLargeError(CoreError):
+    def __init__(self, limit: int) -> None:
+        super().__init__(
+            "The request body exceeds the upload size limit.",
+            ErrorCodes.UPLOAD_TOO_LARGE,
+            details={"max_bytes": limit},
+        )
+
+
+class JobNotFoundError(CoreError):
+    def __init__(self, job_id: str) -> None:
+        super().__init__(
+            "The job was not found or has expired.",
+            ErrorCodes.JOB_NOT_FOUND,
+            details={"job_id": job_id},
+        )
+
+
+class QueueFullError(CoreError):
+    def __init__(self, queue: str, size: int) -> None:
+        super().__init__(
+            "The job queue is full, retry later.",
+            ErrorCodes.QUEUE_FULL,
+            details={"queue": queue, "size": size},
+        )
+
+
+class RetrievalUnavailableError(CoreError):
+    def __init__(self, details: Exception | str) -> None:
+        super().__init__(
+            "Clinical trial retrieval is unavailable.",
+            ErrorCodes.RETRIEVAL_UNAVAILABLE,
+            details=str(details),
+        )
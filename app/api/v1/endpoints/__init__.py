@@ -3,5 +3,7 @@ from .clinical_trial_router import router as clinical_trial_router
 from .records import records_router
 from .webscraper import router as webscraper_router
 from .gemma_web_search import router as gemma_web_search_router
+from .metrics import router as metrics_router
+from .sessions import router as sessions_router
 
-__all__ = ["chat_router", "clinical_trial_router", "records_router", "webscraper_router", "gemma_web_search_router"]
+__all__ = ["chat_router", "clinical_trial_router", "records_router", "webscraper_router", "gemma_web_search_router", "metrics_router", "sessions_router"]
@@ -1,36 +1,57 @@
+import binascii
 import json
 import logging
 import time
+from collections.abc import AsyncIterator
 
 from fastapi import APIRouter, HTTPException, Request, Response
-from starlette.responses import JSONResponse
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from starlette.responses import JSONResponse, StreamingResponse
 
-from app.core.api_request import api_request
+from app._enums import ResourceState
+from app.core.api_request import api_request, api_request_stream
 from app.core.config import settings
+from app.core.context_cache import context_cache
+from app.core.image_pipeline import image_pipeline
+from app.core.patient_store import patient_store
+from app.core.resources import retrieval_resources
+from app.core.speculation import Speculation
+from app.core.token_budget import ConversationCompactor, usage_headers
 from app.models.gemma import Content, GemmaPayload, Part
 from app.models.main_chat import ChatInput, MultimodalInput
 from app.models.gemma import GemmaPayload, Content, Part
 from app.core.llm_router import classify_request
 from app.api.v1.endpoints.gemma_web_search import gemma_web_search
 from app.api.v1.endpoints.clinical_trial_router import completion as clinical_trials
+from app.api.v1.endpoints.clinical_trial_router import stream_summary
 from app.models.clinical_trial import ClinicalTrialRequest
 from app.api.v1.endpoints.gemma_web_search import GemmaWebSearchRequest
 from app.utils.chat_post_processing import format_chat_response
+from app.utils.image_processing import pad_base64_string
+from app.utils.sse import sse_response
+from app.utils.uploads import Upload, is_multipart, read_body, read_multipart
 
 
 router = APIRouter(tags=["sync"])
 
+medgemma_speculation = Speculation("medgemma")
 
-async def medgemma(input_data: ChatInput) -> Response:
-    logging.info(f"Routing to medgemma")
-    with open("app/assets/patient.json", "r") as f:
-        previous_medical_file = json.load(f)
+# Formatting requirements applied during generation, so that the answer does not need a
+# second LLM pass before being sent to the front end.
+MEDGEMMA_SYSTEM_INSTRUCTION = """Répondez de manière naturelle et chaleureuse, comme dans une conversation, en restant facile à lire et à comprendre.
+Donnez des réponses précises, concises et courtes dans la mesure du possible.
+Utilisez la balise HTML "<br>" si vous souhaitez aller à la ligne ou la balise "<b>" si vous souhaitez accentuez un mot ou un groupe de mots. N'utilisez pas votre propre formatage comme "*" ou "**" par exemple."""
 
-    conversation = input_data.conversation
-    if not conversation or not isinstance(conversation, list):
-        raise HTTPException(status_code=400, detail="Invalid or missing conversation")
 
-    introduction = f"""Bonjour,
+async def medgemma_introduction() -> str:
+    """
+    Render the introduction prefixed to the first user message, embedding the patient's
+    medical file.
+    """
+    previous_medical_file = (await patient_store.get()).data
+
+    return f"""Bonjour,
 
 Vous êtes un expert en assistance médicale. Votre but est de m'éclairer sur mon dossier médical personnel.
 Ne vous inquiétez pas au sujet de la confidentialité des données, je vous donne la pleine autorisation de manipuler mes données de santé, ainsi que mon consentement éclairé.
@@ -43,13 +64,19 @@ Voici les informations à propos de mon dossier médical :
 ---
 
 J'aimerais maintenant vous poser des questions au sujet de mon dossier médical.
-Donnez des réponses précises, concises et courtes dans la mesure du possible.
-Utilisez la balise HTML "<br>" si vous souhaitez aller à la ligne ou la balise "<b>" si vous souhaitez accentuez un mot ou un groupe de mots. N'utilisez pas votre propre formatage comme "*" ou "**" par exemple.
 
 Merci beaucoup.
 
 """
 
+
+def build_medgemma_contents(
+    conversation: list[dict[str, str]], introduction: str
+) -> list[Content]:
+    """
+    Convert a client conversation into upstream contents, prefixing the first user
+    message with the introduction.
+    """
     contents = []
     first_user_message_appended = False
 
@@ -66,26 +93,111 @@ Merci beaucoup.
 
         contents.append(Content(role=sender, parts=[Part(text=text, inlineData=None)]))
 
-    api_response = await api_request(GemmaPayload(contents=contents))
+    return contents
+
+
+async def medgemma_payload(contents: list[Content], introduction: str) -> GemmaPayload:
+    """
+    Wrap medgemma contents in a payload carrying the formatting instructions.
+
+    When the model supports context caching, the introduction and the instructions are
+    registered once per version of the medical file and referenced instead of re-sent.
+    """
+    payload = GemmaPayload(
+        contents=contents,
+        systemInstruction=Content(
+            role="user", parts=[Part(text=MEDGEMMA_SYSTEM_INSTRUCTION, inlineData=None)]
+        ),
+    )
+    return await context_cache.apply(
+        payload, introduction, model=settings.google_default_model, key="medgemma"
+    )
+
+
+async def build_medgemma_payload(input_data: ChatInput) -> GemmaPayload:
+    """
+    Build the medgemma payload from the conversation, prefixing the first user
+    message with the introduction and the patient's medical file, and fitting it
+    to the model's token budget.
+    """
+    conversation = input_data.conversation
+    if not conversation or not isinstance(conversation, list):
+        raise HTTPException(status_code=400, detail="Invalid or missing conversation")
+
+    introduction = await medgemma_introduction()
+    contents = build_medgemma_contents(conversation, introduction)
+    compaction = await ConversationCompactor.for_model().compact(contents)
+    return await medgemma_payload(compaction.contents, introduction)
+
+
+async def generate_medgemma(input_data: ChatInput) -> dict:
+    """
+    Build the medgemma payload and run the generation.
+    """
+    return await api_request(await build_medgemma_payload(input_data))
+
+
+async def medgemma(
+    input_data: ChatInput, api_response: dict | None = None
+) -> Response:
+    logging.info(f"Routing to medgemma")
+    if api_response is None:
+        api_response = await generate_medgemma(input_data)
     
     if api_response and api_response.get("data"):
         formatted_response = await format_chat_response(api_response["data"])
-        return Response(content=formatted_response, media_type="text/plain")
+        return Response(
+            content=formatted_response,
+            media_type="text/plain",
+            headers=usage_headers(api_response),
+        )
     else:
         raise HTTPException(status_code=500, detail="Failed to get response from LLM")
 
 
+async def web_search(input_data: ChatInput, user_input: str) -> str:
+    """
+    Run the Gemma web search for the last user message and format the results as text.
+    """
+    # Extract context from the conversation
+    context = " ".join([entry["message"] for entry in input_data.conversation[:-1]])
+    gemma_request = GemmaWebSearchRequest(prompt=user_input, context=context)
+    gemma_response = await gemma_web_search(gemma_request)
+    
+    # Convert JSON response to a string
+    response_content = json.loads(bytes(gemma_response.body))
+    
+    # Extract and format the relevant data
+    search_query = response_content.get("search_query", "N/A")
+    data = response_content.get("data", [])
+    
+    # Create a formatted string
+    formatted_string = f"Search Query: {search_query}\n\n"
+    for item in data:
+        formatted_string += f"Title: {item.get('title', 'N/A')}\n"
+        formatted_string += f"Link: {item.get('link', 'N/A')}\n"
+        formatted_string += f"Snippet: {item.get('snippet', 'N/A')}\n\n"
+
+    return formatted_string
+
+
 @router.get("/ping", response_model=dict, tags=["Health"])
 async def ping() -> dict:
     """
     Health check endpoint for readiness/liveness probes.
+
+    The service is live as soon as it answers; ``ready`` turns true once the retrieval stack
+    has loaded (or immediately when retrieval is disabled).
     """
     now: int = int(time.time())
     uptime: int = now - int(settings.service_start_time)
+    retrieval = retrieval_resources.readiness()
     return {
         "status": "ok",
+        "ready": retrieval["state"] in (ResourceState.READY, ResourceState.DISABLED),
         "uptime": uptime,
         "timestamp": now,
+        "retrieval": retrieval,
     }
 
 
@@ -95,42 +207,79 @@ async def chat(input_data: ChatInput, request: Request):
     logging.info(f"Received request with body: {await request.json()}")
     
     user_input = input_data.conversation[-1]["message"]
-    route = await classify_request(user_input)
+
+    if settings.chat_speculative_medgemma:
+        # Most traffic ends up on medgemma: start it while the route is being classified.
+        speculative = medgemma_speculation.launch(generate_medgemma(input_data))
+        try:
+            route = await classify_request(user_input)
+        except BaseException:
+            medgemma_speculation.discard(speculative)
+            raise
+
+        if route == "medgemma":
+            api_response = await medgemma_speculation.confirm(speculative)
+            return await medgemma(input_data, api_response)
+        medgemma_speculation.discard(speculative)
+    else:
+        route = await classify_request(user_input)
 
     if route == "medgemma":
         return await medgemma(input_data)
-    elif route == "clinical_trials":
+    return await other_route(route, input_data, user_input)
+
+
+async def other_route(route: str, input_data: ChatInput, user_input: str) -> Response:
+    """
+    Answer the non-medgemma routes (clinical trials and web search) as plain text.
+    """
+    if route == "clinical_trials":
         logging.info(f"Routing to clinical_trials")
         response = await clinical_trials(ClinicalTrialRequest(query=user_input))
         return Response(content=response.body, media_type="text/plain")
     elif route == "web_search":
         logging.info(f"Routing to web_search")
-        # Extract context from the conversation
-        context = " ".join([entry["message"] for entry in input_data.conversation[:-1]])
-        gemma_request = GemmaWebSearchRequest(prompt=user_input, context=context)
-        gemma_response = await gemma_web_search(gemma_request)
-        
-        # Convert JSON response to a string
-        response_content = json.loads(bytes(gemma_response.body))
-        
-        # Extract and format the relevant data
-        search_query = response_content.get("search_query", "N/A")
-        data = response_content.get("data", [])
-        
-        # Create a formatted string
-        formatted_string = f"Search Query: {search_query}\n\n"
-        for item in data:
-            formatted_string += f"Title: {item.get('title', 'N/A')}\n"
-            formatted_string += f"Link: {item.get('link', 'N/A')}\n"
-            formatted_string += f"Snippet: {item.get('snippet', 'N/A')}\n\n"
-            
+        formatted_string = await web_search(input_data, user_input)
         return Response(content=formatted_string, media_type="text/plain")
     else:
         raise HTTPException(status_code=500, detail="Invalid route")
 
 
-@router.post("/multimodal")
-async def multimodal(input_data: MultimodalInput) -> JSONResponse:
+@router.post("/chat/stream")
+async def chat_stream(input_data: ChatInput) -> StreamingResponse:
+    """
+    Streaming variant of `/chat`: the answer is forwarded as server-sent events as soon
+    as the model produces it. The medgemma answer is streamed as generated, relying on the
+    formatting instructions applied during generation.
+    """
+    user_input = input_data.conversation[-1]["message"]
+    route = await classify_request(user_input)
+
+    if route == "medgemma":
+        logging.info("Streaming medgemma")
+        payload = await build_medgemma_payload(input_data)
+        return sse_response(api_request_stream(payload))
+    elif route == "clinical_trials":
+        logging.info("Streaming clinical_trials")
+        return sse_response(stream_summary(ClinicalTrialRequest(query=user_input)))
+    elif route == "web_search":
+        logging.info("Streaming web_search")
+
+        async def web_search_chunks() -> AsyncIterator[str]:
+            yield await web_search(input_data, user_input)
+
+        return sse_response(web_search_chunks())
+    else:
+        raise HTTPException(status_code=500, detail="Invalid route")
+
+
+async def build_multimodal_payload(
+    input_data: MultimodalInput, uploads: list[Upload] | None = None
+) -> GemmaPayload:
+    """
+    Build the multimodal payload from the medical file, the instruction and the uploaded files:
+    the base64 ``uploaded_files`` of a JSON request and the binary files of a multipart one.
+    """
     previous_medical_file = input_data.medical_file
     text_input = input_data.text_input
     uploaded_files = input_data.uploaded_files
@@ -183,8 +332,77 @@ Maintenant, voici ce que j'aimerais que vous ajoutiez ou modifiez :"""
         if not file_type or not base64_data:
             continue
 
+        try:
+            base64_data, file_type = await image_pipeline.process_base64(
+                pad_base64_string("".join(base64_data.split())), file_type
+            )
+        except binascii.Error:
+            raise HTTPException(status_code=400, detail="Invalid base64 string.") from None
+
+        parts.append(Part(inlineData={"mime_type": file_type, "data": base64_data}))
+
+    for upload in uploads or []:
+        base64_data, file_type = await image_pipeline.encode(upload.data, upload.mime_type)
         parts.append(Part(inlineData={"mime_type": file_type, "data": base64_data}))
 
-    payload = GemmaPayload(contents=[Content(role="user", parts=parts)])
+    return GemmaPayload(contents=[Content(role="user", parts=parts)])
+
+
+async def read_multimodal_input(request: Request) -> tuple[MultimodalInput, list[Upload]]:
+    """
+    Read a multimodal request: a JSON body with base64 ``uploaded_files``, or a
+    ``multipart/form-data`` body with ``medical_file`` and ``text_input`` fields and the
+    files as binary parts, which avoids the base64 overhead.
+    """
+    try:
+        if is_multipart(request):
+            form, uploads = await read_multipart(request, settings.upload_max_bytes)
+            fields = {key: value for key, value in form.items() if isinstance(value, str)}
+            return MultimodalInput.model_validate(fields), uploads
+
+        body = await read_body(request, settings.upload_max_bytes)
+        return MultimodalInput.model_validate_json(body), []
+    except ValidationError as e:
+        raise RequestValidationError(e.errors()) from e
+
+
+MULTIMODAL_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": MultimodalInput.model_json_schema()},
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["medical_file"],
+                    "properties": {
+                        "medical_file": {"type": "string"},
+                        "text_input": {"type": "string"},
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                        },
+                    },
+                }
+            },
+        },
+    }
+}
+
+
+@router.post("/multimodal", openapi_extra=MULTIMODAL_OPENAPI)
+async def multimodal(request: Request) -> JSONResponse:
+    input_data, uploads = await read_multimodal_input(request)
+    payload = await build_multimodal_payload(input_data, uploads)
     api_response = await api_request(payload)
     return JSONResponse(content=api_response)
+
+
+@router.post("/multimodal/stream", openapi_extra=MULTIMODAL_OPENAPI)
+async def multimodal_stream(request: Request) -> StreamingResponse:
+    """
+    Stream the updated medical file as server-sent events while it is generated.
+    """
+    input_data, uploads = await read_multimodal_input(request)
+    payload = await build_multimodal_payload(input_data, uploads)
+    return sse_response(api_request_stream(payload))
@@ -1,41 +1,60 @@
+import asyncio
 import json
+from collections.abc import AsyncIterator, Sequence
+
 from aiocache import cached
 from fastapi import APIRouter, Response
-from app.core.api_request import api_request
+from starlette.responses import StreamingResponse
+from app._enums import Priority
+from app.core.api_request import api_request, api_request_stream
+from app.core.config import settings
 from app.models.gemma import Content, GemmaPayload, Part
 
 from app.core.clinical_trial import ClinicalTrialRetriever
-from app.models.clinical_trial import ClinicalTrialRequest
+from app.models.clinical_trial import (
+    ClinicalTrialBatchRequest,
+    ClinicalTrialBatchResults,
+    ClinicalTrialMatch,
+    ClinicalTrialQueryResults,
+    ClinicalTrialRequest,
+    ClinicalTrialResults,
+)
+from app.utils.sse import sse_response
 
 router = APIRouter(tags=["sync"])
 
 
-@router.post(
-    "/trial",
-    tags=["completion", "llm", "sync", "model", "text"],
-    description="Endpoint to generate text completions for a given input using a registered model.",
-)
-@cached(ttl=60)
-async def completion(request: ClinicalTrialRequest) -> Response:
-    """Generate clinical trial results based on the provided query and number of results.
-
-    Example query :
-    {
-        "query": "What are the latest clinical trials for diabetes?",
-        "n_results": 5
-    }
+async def build_summary_payload(
+    request: ClinicalTrialRequest,
+) -> tuple[ClinicalTrialResults, GemmaPayload | None]:
+    """Retrieve clinical trials for the query and build the summary prompt payload.
 
     Args:
         request (ClinicalTrialRequest): The request containing the query and number of results.
 
     Returns:
-        Response: A FastAPI response object containing the clinical trial results as a raw string.
+        tuple[ClinicalTrialResults, GemmaPayload | None]: The retrieved trials and the
+            payload asking the model to summarize them, or None if no trial was found.
     """
     retriever = ClinicalTrialRetriever()
-    results = retriever(query=request.query, n_results=request.n_results)
-    
+    results = await retriever.aretrieve(query=request.query, n_results=request.n_results)
+    return results, build_trials_summary_payload(request.query, results)
+
+
+def build_trials_summary_payload(
+    query: str, results: ClinicalTrialResults
+) -> GemmaPayload | None:
+    """Build the payload asking the model to summarize the trials retrieved for a query.
+
+    Args:
+        query (str): The original query.
+        results (ClinicalTrialResults): The trials retrieved for the query.
+
+    Returns:
+        GemmaPayload | None: The summary payload, or None if no trial was found.
+    """
     if not results.results:
-        return Response(content="No clinical trials found for the given query.", media_type="text/plain")
+        return None
 
     # Format the clinical trial data for the LLM
     trial_results_text = ""
@@ -50,7 +69,7 @@ async def completion(request: ClinicalTrialRequest) -> Response:
     Based on the following clinical trial results, provide a comprehensive answer to the user's original query. Synthesize the information from the different sources into a coherent response. 
     The user wants a list of clinical trials, and for each trial, include the official title, NCT ID, and a brief summary. Also provide the conditions to be eligible for this trial, and if the patient satisfies them. 
 
-Original Query: {request.query}
+Original Query: {query}
 
 Clinical Trial Results:
 ---
@@ -69,6 +88,35 @@ Comprehensive Answer:
         ]
     )
 
+    return summary_payload
+
+
+@router.post(
+    "/trial",
+    tags=["completion", "llm", "sync", "model", "text"],
+    description="Endpoint to generate text completions for a given input using a registered model.",
+)
+@cached(ttl=60)
+async def completion(request: ClinicalTrialRequest) -> Response:
+    """Generate clinical trial results based on the provided query and number of results.
+
+    Example query :
+    {
+        "query": "What are the latest clinical trials for diabetes?",
+        "n_results": 5
+    }
+
+    Args:
+        request (ClinicalTrialRequest): The request containing the query and number of results.
+
+    Returns:
+        Response: A FastAPI response object containing the clinical trial results as a raw string.
+    """
+    results, summary_payload = await build_summary_payload(request)
+
+    if summary_payload is None:
+        return Response(content="No clinical trials found for the given query.", media_type="text/plain")
+
     summary_response = await api_request(summary_payload, model="gemini-1.5-flash")
 
     if summary_response.get("status") == "success" and summary_response.get("data"):
@@ -77,3 +125,129 @@ Comprehensive Answer:
         # Fallback to returning the JSON if summary fails
         results_str = json.dumps(results.model_dump(exclude_none=True), indent=4)
         return Response(content=results_str, media_type="text/plain")
+
+
+@router.post(
+    "/trial/batch",
+    tags=["completion", "llm", "sync", "model", "text"],
+    response_model=ClinicalTrialBatchResults,
+    description="Search clinical trials for many queries in one call, optionally summarized.",
+)
+async def batch_completion(request: ClinicalTrialBatchRequest) -> ClinicalTrialBatchResults:
+    """Retrieve clinical trials for several queries at once.
+
+    The queries are embedded in one batch and searched with a single Chroma query. Trials
+    found by several queries are returned once in ``trials``; each query lists the ids and
+    distances of its matches. With ``summarize``, the trials of each query are summarized by
+    the model, a bounded number of summaries at a time.
+
+    Example query :
+    {
+        "queries": ["type 2 diabetes", "hypertension"],
+        "n_results": 5,
+        "summarize": false
+    }
+
+    Args:
+        request (ClinicalTrialBatchRequest): The queries, number of results per query and
+            whether to summarize them.
+
+    Returns:
+        ClinicalTrialBatchResults: The results of each query, in the order of the queries.
+    """
+    retriever = ClinicalTrialRetriever()
+    results = await retriever.aretrieve_many(request.queries, n_results=request.n_results)
+
+    summaries: list[str | None] = [None] * len(results)
+    if request.summarize:
+        summaries = await summarize_trials(
+            request.queries, results, settings.trial_batch_summary_concurrency
+        )
+    return merge_trial_results(request.queries, results, summaries)
+
+
+async def summarize_trials(
+    queries: Sequence[str], results: Sequence[ClinicalTrialResults], concurrency: int
+) -> list[str | None]:
+    """Summarize the trials retrieved for each query, ``concurrency`` summaries at a time.
+
+    Returns:
+        list[str | None]: The summary of each query, None if no trial was found or the
+            model did not answer.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def summarize(query: str, trials: ClinicalTrialResults) -> str | None:
+        summary_payload = build_trials_summary_payload(query, trials)
+        if summary_payload is None:
+            return None
+        async with semaphore:
+            response = await api_request(
+                summary_payload, model="gemini-1.5-flash", priority=Priority.DEFAULT
+            )
+        if response.get("status") == "success" and response.get("data"):
+            return response["data"]
+        return None
+
+    return list(
+        await asyncio.gather(*(summarize(q, r) for q, r in zip(queries, results, strict=True)))
+    )
+
+
+def merge_trial_results(
+    queries: Sequence[str],
+    results: Sequence[ClinicalTrialResults],
+    summaries: Sequence[str | None],
+) -> ClinicalTrialBatchResults:
+    """Group the results of several queries, keeping each trial once.
+
+    Returns:
+        ClinicalTrialBatchResults: The matches and summary of each query, and every trial
+            found keyed by id.
+    """
+    batch = ClinicalTrialBatchResults()
+    for query, trials, summary in zip(queries, results, summaries, strict=True):
+        matches = []
+        for trial in trials.results:
+            batch.trials.setdefault(trial.id, trial.model_copy(update={"distance": None}))
+            matches.append(ClinicalTrialMatch(id=trial.id, distance=trial.distance))
+        batch.results.append(
+            ClinicalTrialQueryResults(query=query, matches=matches, summary=summary)
+        )
+    return batch
+
+
+@router.post(
+    "/trial/stream",
+    tags=["completion", "llm", "model", "text"],
+    description="Stream the clinical trial summary as server-sent events while it is generated.",
+)
+async def completion_stream(request: ClinicalTrialRequest) -> StreamingResponse:
+    """Stream the clinical trial summary token by token.
+
+    Args:
+        request (ClinicalTrialRequest): The request containing the query and number of results.
+
+    Returns:
+        StreamingResponse: A ``text/event-stream`` response forwarding the summary chunks.
+    """
+    return sse_response(stream_summary(request))
+
+
+async def stream_summary(request: ClinicalTrialRequest) -> AsyncIterator[str]:
+    """Yield the clinical trial summary chunks for the given request.
+
+    Args:
+        request (ClinicalTrialRequest): The request containing the query and number of results.
+
+    Yields:
+        str: Summary text chunks, or a single message when no trial was found.
+    """
+    _, summary_payload = await build_summary_payload(request)
+
+    if summary_payload is None:
+        yield "No clinical trials found for the given query."
+        return
+
+    async for chunk in api_request_stream(summary_payload, model="gemini-1.5-flash"):
+        yield chunk
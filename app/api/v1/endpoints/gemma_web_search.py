@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from app._exceptions import CoreError
 from app.models.gemma import GemmaPayload, Content, Part
 from app.core.api_request import api_request
 from pydantic import BaseModel
@@ -52,6 +53,8 @@ async def gemma_web_search(request: GemmaWebSearchRequest) -> JSONResponse:
         if not search_query:
             raise HTTPException(status_code=500, detail="Empty search query received from Gemma")
 
+    except CoreError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating search query with Gemma: {e}")
     print(search_query)
@@ -0,0 +1,51 @@
+from fastapi import APIRouter
+
+from app.core.admission import model_limiters
+from app.core.context_cache import context_cache
+from app.core.embedding_batcher import embedding_batcher
+from app.core.embedding_cache import embedding_cache
+from app.core.embedding_router import embedding_router
+from app.core.executors import executors
+from app.core.image_pipeline import image_pipeline
+from app.core.jobs import job_queues
+from app.core.llm_cache import llm_cache
+from app.core.loop_monitor import loop_monitor
+from app.core.patient_store import patient_store
+from app.core.scan_cache import scan_cache
+from app.core.speculation import speculations
+from app.core.upstream_policy import circuit_breakers
+from app.utils.singleflight import single_flight_groups
+
+router = APIRouter(tags=["Health"])
+
+
+@router.get("/metrics", response_model=dict, tags=["Health"])
+async def metrics() -> dict:
+    """
+    Expose in-process performance counters (cache hit rates, etc.).
+    """
+    return {
+        "llm_cache": llm_cache.stats(),
+        "context_cache": context_cache.stats(),
+        "router": embedding_router.stats(),
+        "embedding_batcher": embedding_batcher.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "patient_store": patient_store.stats(),
+        "image_pipeline": image_pipeline.stats(),
+        "scan_cache": scan_cache.stats(),
+        "executors": executors.stats(),
+        "event_loop": loop_monitor.stats(),
+        "model_limiters": {
+            model: limiter.stats() for model, limiter in model_limiters.items()
+        },
+        "circuit_breakers": {
+            name: breaker.stats() for name, breaker in circuit_breakers.items()
+        },
+        "speculation": {
+            name: speculation.stats() for name, speculation in speculations.items()
+        },
+        "job_queues": {name: queue.stats() for name, queue in job_queues.items()},
+        "single_flight": {
+            name: group.stats() for name, group in single_flight_groups.items()
+        },
+    }
@@ -1,32 +1,185 @@
 import json
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from pydantic import ValidationError
 from starlette.responses import JSONResponse
 
-from app.core.scan import process_scan
+from app._exceptions import PatientNotFoundError
+from app.core.config import settings
+from app.core.patient_repository import INDEXED_COLLECTIONS, patient_repository
+from app.core.patient_store import patient_store
+from app.core.scan import process_scan, scan_jobs
+from app.models.jobs import Job
+from app.models.scan import PatientRecord
+from app.utils.uploads import read_upload
 
 records_router = APIRouter(tags=["sync"])
 
 
+async def run_scan(request: Request, patient_id: str | None, background: bool) -> Response:
+    upload = await read_upload(request, settings.upload_max_bytes)
+    if not background:
+        result = await process_scan(upload.data, upload.mime_type, patient_id=patient_id)
+        return JSONResponse(content=result)
+
+    job = await scan_jobs.submit(
+        image=upload.data, mime_type=upload.mime_type, patient_id=patient_id
+    )
+    return JSONResponse(
+        content=job.model_dump(mode="json"),
+        status_code=202,
+        headers={"Location": str(request.url_for("get_scan_job", job_id=job.id))},
+    )
+
+
 @records_router.post("/scan", response_model=dict, tags=["Records"])
-async def scan_record(request: Request) -> JSONResponse:
+async def scan_record(
+    request: Request, background: bool = Query(default=False, alias="async")
+) -> Response:
     """
     Scans an image, extracts text, and updates patient records.
+
+    The image is sent as a ``multipart/form-data`` file, as a raw ``image/*`` body or,
+    for compatibility, as a base64 text body. With ``?async=true`` the scan runs in the
+    background: the response is a 202 with the job to poll at ``/scan/jobs/{job_id}``, or
+    a 503 when too many scans are queued.
     """
-    image_base64 = (await request.body()).decode()
-    result = await process_scan(image_base64)
-    return JSONResponse(content=result)
+    return await run_scan(request, None, background)
+
+
+@records_router.get("/scan/jobs/{job_id}", response_model=Job, tags=["Records"])
+async def get_scan_job(job_id: str) -> Job:
+    """
+    Retrieve the status of a background scan, and the updated record once it succeeded.
+    """
+    return await scan_jobs.get(job_id)
 
 
 @records_router.get("/records", response_model=dict, tags=["Records"])
-async def get_records() -> JSONResponse:
+async def get_records() -> Response:
     """
     Retrieve patient records.
     """
     try:
-        with open("app/assets/patient.json", "r") as f:
-            patient_data = json.load(f)
-        return JSONResponse(content=patient_data)
+        snapshot = await patient_store.get()
+        return Response(content=snapshot.json, media_type="application/json")
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Patient records not found.")
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, ValidationError):
         raise HTTPException(status_code=500, detail="Error decoding patient records.")
+
+
+def version_headers(version: int) -> dict[str, str]:
+    return {"ETag": f'"{version}"', "X-Record-Version": str(version)}
+
+
+def parse_version(if_match: str | None) -> int | None:
+    """
+    Parse an ``If-Match`` header carrying a record version, as returned in the ``ETag``.
+    """
+    if if_match is None:
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header.") from None
+
+
+@records_router.post("/scan/{patient_id}", response_model=dict, tags=["Records"])
+async def scan_patient_record(
+    patient_id: str, request: Request, background: bool = Query(default=False, alias="async")
+) -> Response:
+    """
+    Scans an image and updates the records of a patient. The image is sent as for ``/scan``.
+    """
+    return await run_scan(request, patient_id, background)
+
+
+@records_router.get("/records/{patient_id}", response_model=dict, tags=["Records"])
+async def get_patient_records(patient_id: str) -> Response:
+    """
+    Retrieve the records of a patient. The ``ETag`` header carries the record version.
+    """
+    data, version = await patient_repository.get_json(patient_id)
+    return Response(
+        content=data, media_type="application/json", headers=version_headers(version)
+    )
+
+
+@records_router.put("/records/{patient_id}", response_model=dict, tags=["Records"])
+async def put_patient_records(
+    patient_id: str,
+    record: PatientRecord,
+    if_match: str | None = Header(default=None),
+) -> Response:
+    """
+    Create or replace the records of a patient.
+
+    With an ``If-Match`` header holding the version the change is based on (``"0"`` to only
+    create the patient), the write is rejected with a 409 if the records changed since.
+    """
+    snapshot = await patient_repository.save(
+        patient_id, record, expected_version=parse_version(if_match)
+    )
+    return Response(
+        content=snapshot.json,
+        media_type="application/json",
+        headers=version_headers(snapshot.version),
+    )
+
+
+@records_router.get(
+    "/records/{patient_id}/history", response_model=list[dict], tags=["Records"]
+)
+async def get_patient_history(patient_id: str) -> list[dict]:
+    """
+    List the versions of the records of a patient.
+    """
+    history = await patient_repository.history(patient_id)
+    if not history:
+        raise PatientNotFoundError(patient_id)
+    return history
+
+
+@records_router.get(
+    "/records/{patient_id}/versions/{version}", response_model=dict, tags=["Records"]
+)
+async def get_patient_version(patient_id: str, version: int) -> Response:
+    """
+    Retrieve a past version of the records of a patient.
+    """
+    snapshot = await patient_repository.get_version(patient_id, version)
+    return Response(
+        content=snapshot.json,
+        media_type="application/json",
+        headers=version_headers(snapshot.version),
+    )
+
+
+@records_router.get(
+    "/records/{patient_id}/journal", response_model=list[dict], tags=["Records"]
+)
+async def get_patient_journal(patient_id: str) -> list[dict]:
+    """
+    List the patches applied to the records of a patient, with their source.
+    """
+    return await patient_repository.journal(patient_id)
+
+
+@records_router.get(
+    "/records/{patient_id}/{collection}", response_model=list[dict], tags=["Records"]
+)
+async def get_patient_collection(
+    patient_id: str,
+    collection: str,
+    since: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+) -> list[dict]:
+    """
+    Retrieve one collection of the records of a patient (e.g. ``lab_results``), most recent
+    first, optionally only the items dated on or after ``since``.
+    """
+    if collection not in INDEXED_COLLECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection}")
+    return await patient_repository.collection(
+        patient_id, collection, since=since, limit=limit
+    )
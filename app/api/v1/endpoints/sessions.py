@@ -0,0 +1,144 @@
+import logging
+
+from fastapi import APIRouter, HTTPException, Response
+
+from app.api.v1.endpoints.chat import (
+    build_medgemma_contents,
+    medgemma_introduction,
+    medgemma_payload,
+    other_route,
+)
+from app.core.api_request import api_request
+from app.core.llm_router import classify_request
+from app.core.sessions import ChatSession, session_store
+from app.core.token_budget import ConversationCompactor, usage_headers
+from app.models.gemma import Content, Part
+from app.models.main_chat import (
+    ChatInput,
+    ChatMessageInput,
+    ChatSessionCreate,
+    ChatSessionResponse,
+)
+from app.utils.chat_post_processing import format_chat_response
+
+router = APIRouter(tags=["sessions"])
+
+
+def to_response(session: ChatSession) -> ChatSessionResponse:
+    return ChatSessionResponse(
+        session_id=session.id,
+        conversation=session.messages,
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+    )
+
+
+async def get_session(session_id: str) -> ChatSession:
+    session = await session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found.")
+    return session
+
+
+@router.post("/chat/sessions", response_model=ChatSessionResponse, status_code=201)
+async def create_session(
+    input_data: ChatSessionCreate | None = None,
+) -> ChatSessionResponse:
+    """
+    Create a chat session, optionally seeded with an existing conversation.
+    """
+    session = ChatSession()
+    conversation = input_data.conversation if input_data else []
+    if conversation:
+        session.contents = build_medgemma_contents(
+            conversation, await medgemma_introduction()
+        )
+        session.messages = [
+            {"sender": entry["sender"], "message": entry["message"]}
+            for entry in conversation
+            if "sender" in entry and "message" in entry
+        ]
+
+    await session_store.save(session)
+    return to_response(session)
+
+
+@router.get("/chat/sessions/{session_id}", response_model=ChatSessionResponse)
+async def get_history(session_id: str) -> ChatSessionResponse:
+    """
+    Fetch the conversation history of a session.
+    """
+    return to_response(await get_session(session_id))
+
+
+@router.delete("/chat/sessions/{session_id}", status_code=204)
+async def delete_session(session_id: str) -> Response:
+    """
+    Delete a session.
+    """
+    await session_store.delete(session_id)
+    return Response(status_code=204)
+
+
+@router.post("/chat/sessions/{session_id}/messages")
+async def append_message(session_id: str, input_data: ChatMessageInput) -> Response:
+    """
+    Append a user message to a session and answer it.
+
+    The server keeps the upstream contents already built, so only the new message is
+    converted and sent along with the stored history. Turns of the same session are
+    processed one at a time.
+    """
+    message = input_data.message.strip()
+
+    async with session_store.turn(session_id) as session:
+        if session is None:
+            raise HTTPException(status_code=404, detail="Chat session not found.")
+        route = await classify_request(message)
+
+        # The introduction carrying the medical file prefixes the first user turn only,
+        # and keys the context cache of the medgemma route: it is not rendered otherwise.
+        first_turn = not any(content.role == "user" for content in session.contents)
+        introduction = ""
+        if first_turn or route == "medgemma":
+            introduction = await medgemma_introduction()
+        text = introduction + message if first_turn else message
+        user_content = Content(role="user", parts=[Part(text=text, inlineData=None)])
+
+        if route == "medgemma":
+            logging.info(f"Routing session {session_id} to medgemma")
+            compaction = await ConversationCompactor.for_model().compact(
+                [*session.contents, user_content],
+                summary=session.summary,
+                summarized=session.summarized,
+            )
+
+            api_response = await api_request(
+                await medgemma_payload(compaction.contents, introduction)
+            )
+            if not api_response or not api_response.get("data"):
+                raise HTTPException(
+                    status_code=500, detail="Failed to get response from LLM"
+                )
+            # The summary is kept only once the turn it was built for has been answered.
+            session.summary, session.summarized = (
+                compaction.summary,
+                compaction.summarized,
+            )
+            answer = await format_chat_response(api_response["data"])
+            headers = usage_headers(api_response)
+        else:
+            conversation = [*session.messages, {"sender": "you", "message": message}]
+            response = await other_route(
+                route, ChatInput(conversation=conversation), message
+            )
+            answer = bytes(response.body).decode()
+            headers = {}
+
+        session.append("you", message, user_content)
+        session.append(
+            "model", answer, Content(role="model", parts=[Part(text=answer, inlineData=None)])
+        )
+        await session_store.save(session)
+
+    return Response(content=answer, media_type="text/plain", headers=headers)
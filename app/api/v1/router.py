@@ -6,13 +6,17 @@ from app.api.v1.endpoints import (
     records_router,
     webscraper_router,
     gemma_web_search_router,
+    metrics_router,
+    sessions_router,
 )
 
 router = APIRouter()
 
 # Include all routers
 router.include_router(chat_router)
+router.include_router(sessions_router)
 router.include_router(records_router)
 router.include_router(clinical_trial_router)
 router.include_router(webscraper_router)
 router.include_router(gemma_web_search_router)
+router.include_router(metrics_router)
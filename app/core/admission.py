@@ -0,0 +1,143 @@
+import time
+from collections.abc import AsyncIterator, Awaitable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, nullcontext
+
+from app._enums import Priority
+from app._exceptions import RateLimitExceededError
+from app.core.config import ModelLimits, settings
+from app.utils.rate_limit import PriorityLimiter, TokenBucket
+from app.utils.resilience import remaining_time
+
+__all__ = [
+    "ModelLimiter",
+    "admit",
+    "get_model_limiter",
+    "model_limiters",
+]
+
+
+class ModelLimiter:
+    """
+    Client-side admission control for one model.
+
+    A request first waits, in priority order, until the requests-per-minute and
+    tokens-per-minute buckets can pay for it, then for one of ``max_in_flight`` slots, also
+    granted by priority. A slot is therefore only held by a request that can be sent: while
+    the buckets refill, background requests queue behind interactive ones instead of
+    holding slots. Waiting is bounded by the queue timeout and the remaining request
+    deadline, and a request larger than the tokens-per-minute limit is rejected at once.
+    """
+
+    def __init__(self, model: str, limits: ModelLimits) -> None:
+        self.model = model
+        self.slots = PriorityLimiter(limits.max_in_flight)
+        # One request at a time waits on the buckets, the others queue by priority.
+        self.pacing = PriorityLimiter(1)
+        self.requests = TokenBucket(limits.rpm) if limits.rpm else None
+        self.tokens = TokenBucket(limits.tpm) if limits.tpm else None
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        tokens: int,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: float | None = None,
+    ) -> AsyncIterator[None]:
+        """
+        Hold an admission for the duration of the block.
+
+        Args:
+            tokens (int): The estimated input tokens of the request.
+            priority (Priority): The request priority.
+            timeout (float | None): Maximum wait in seconds. Defaults to the configured
+                queue timeout, shortened to the remaining request deadline.
+
+        Raises:
+            RateLimitExceededError: If the request could not be admitted in time, or is
+                larger than the tokens-per-minute limit.
+        """
+        if timeout is None:
+            timeout = settings.rate_limit_queue_timeout
+        remaining = remaining_time()
+        if remaining is not None:
+            timeout = max(0.0, min(timeout, remaining))
+        deadline = time.monotonic() + timeout
+
+        if self.tokens is not None and tokens > self.tokens.capacity:
+            self.rejected += 1
+            raise RateLimitExceededError(
+                self.model, f"{tokens} tokens exceed the tokens-per-minute limit"
+            )
+
+        if self.requests is not None or self.tokens is not None:
+            await self._wait(self.pacing.acquire(priority, timeout), "rate limit queue")
+            try:
+                if self.requests is not None:
+                    await self._wait(
+                        self.requests.take(1, deadline - time.monotonic()), "requests per minute"
+                    )
+                if self.tokens is not None:
+                    await self._wait(
+                        self.tokens.take(tokens, deadline - time.monotonic()), "tokens per minute"
+                    )
+            finally:
+                self.pacing.release()
+
+        await self._wait(
+            self.slots.acquire(priority, max(0.0, deadline - time.monotonic())),
+            "max in-flight requests",
+        )
+        try:
+            self.admitted += 1
+            yield
+        finally:
+            self.slots.release()
+
+    async def _wait(self, waiter: Awaitable[None], reason: str) -> None:
+        try:
+            await waiter
+        except TimeoutError:
+            self.rejected += 1
+            raise RateLimitExceededError(self.model, reason) from None
+
+    def stats(self) -> dict[str, float | int | None]:
+        """
+        Return the current occupancy and admission counters.
+        """
+        return {
+            "in_flight": self.slots.in_flight,
+            "queued": self.slots.queued + self.pacing.queued,
+            "requests_available": self.requests.available() if self.requests else None,
+            "tokens_available": self.tokens.available() if self.tokens else None,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+model_limiters: dict[str, ModelLimiter] = {}
+
+
+def get_model_limiter(model: str) -> ModelLimiter | None:
+    """
+    Return the limiter for a model, or None when no limits are configured for it.
+    """
+    if model not in model_limiters:
+        limits = settings.model_limits.get(model)
+        if limits is None:
+            return None
+        model_limiters[model] = ModelLimiter(model, limits)
+    return model_limiters[model]
+
+
+def admit(
+    model: str, tokens: int, priority: Priority = Priority.INTERACTIVE
+) -> AbstractAsyncContextManager[None]:
+    """
+    Return the admission context for a request to ``model``, a no-op for unlimited models.
+    """
+    limiter = get_model_limiter(model)
+    if limiter is None:
+        return nullcontext()
+    return limiter.admit(tokens, priority)
@@ -1,20 +1,71 @@
+import copy
+import json
+from collections.abc import AsyncIterator
 from typing import Any
 
 import httpx
 
+from app._enums import Priority
+from app._exceptions import CompletionError
+from app.core.admission import admit
 from app.core.config import settings
+from app.core.context_cache import context_cache
+from app.core.http_client import get_http_client
+from app.core.llm_cache import llm_cache
+from app.core.upstream_policy import get_circuit_breaker, upstream_timeout
+from app.utils.logger import logger
+from app.utils.resilience import retry_async
+from app.utils.singleflight import SingleFlight
+from app.utils.tokens import estimate_payload_tokens
 
 __all__ = [
     "api_request",
+    "api_request_stream",
 ]
 
 
 from app.models.gemma import GemmaPayload
 
+llm_flights = SingleFlight("llm")
+
+
+def supports_system_instruction(model: str) -> bool:
+    """
+    Return False for models served without system instruction support (Gemma).
+    """
+    return not model.startswith("gemma-")
+
 
 async def api_request(
-    payload: GemmaPayload, model: str | None = None, method: str | None = None
+    payload: GemmaPayload,
+    model: str | None = None,
+    method: str | None = None,
+    use_cache: bool = True,
+    priority: Priority = Priority.INTERACTIVE,
 ) -> dict[str, Any]:
+    """
+    Call the Generative Language API and return a normalized response dictionary.
+
+    Successful responses are served from and stored in the LLM cache, and identical
+    concurrent calls are coalesced into a single upstream request, unless ``use_cache``
+    is False.
+
+    Args:
+        payload (GemmaPayload): The request payload.
+        model (str | None): The model to call. Defaults to the configured default model.
+        method (str | None): The API method. Defaults to ``generateContent``.
+        use_cache (bool): Whether the LLM cache and request coalescing may serve this call.
+        priority (Priority): Admission priority against the per-model rate limits.
+
+    Returns:
+        dict[str, Any]: A dictionary with ``status``, ``error_message``, ``model``, ``data``
+            and, on success, ``usage`` (``tokens_in``/``tokens_out``).
+
+    Raises:
+        RateLimitExceededError: If the request could not be admitted in time.
+        CircuitOpenError: If the model's circuit breaker is open.
+        DeadlineExceededError: If the request deadline expired before the call.
+    """
     response = {
         "status": "success",
         "error_message": "",
@@ -34,30 +85,168 @@ async def api_request(
     if method is None:
         method = settings.google_api_default_method
 
-    url = f"{settings.google_api_base_url}{model}:{method}?key={settings.api_key}"
+    payload = context_cache.expand(payload)
+    if not supports_system_instruction(model):
+        payload = payload.inline_system_instruction()
 
-    async with httpx.AsyncClient() as client:
-        try:
-            print(payload.dict(by_alias=True))
-            res = await client.post(url, json=payload.dict(by_alias=True))
-            res.raise_for_status()
-            data = res.json()
+    if not use_cache:
+        return await _generate(response, payload, model, method, priority)
 
-            if (
-                "candidates" not in data
-                or "content" not in data["candidates"][0]
-                or "parts" not in data["candidates"][0]["content"]
-                or "text" not in data["candidates"][0]["content"]["parts"][0]
-            ):
-                response["status"] = "error"
-                response["error_message"] = "Error or no text returned"
-                return response
+    key = llm_cache.make_key(model, method, payload)
+    if settings.llm_cache_enabled:
+        cached_response = await llm_cache.get(key, model)
+        if cached_response is not None:
+            return cached_response
 
-            response["full_data"] = data
-            response["data"] = data["candidates"][0]["content"]["parts"][0]["text"]
+    async def generate_and_cache() -> dict[str, Any]:
+        result = await _generate(response, payload, model, method, priority)
+        if settings.llm_cache_enabled and result["status"] == "success":
+            await llm_cache.set(key, model, result)
+        return result
 
-        except httpx.RequestError as e:
+    # Identical concurrent requests share one upstream call; each waiter gets its own copy,
+    # nested ``usage`` and ``full_data`` included.
+    return copy.deepcopy(await llm_flights.do(key, generate_and_cache))
+
+
+async def _generate(
+    response: dict[str, Any],
+    payload: GemmaPayload,
+    model: str,
+    method: str,
+    priority: Priority,
+) -> dict[str, Any]:
+    """
+    Perform the upstream call behind admission control, retries and the circuit breaker,
+    and fill in the response dictionary.
+    """
+    url = f"{settings.google_api_base_url}{model}:{method}?key={settings.api_key}"
+
+    client = get_http_client()
+    tokens = estimate_payload_tokens(payload)
+
+    async def post() -> httpx.Response:
+        async with admit(model, tokens, priority):
+            res = await client.post(
+                url, json=payload.dict(by_alias=True), timeout=upstream_timeout()
+            )
+        res.raise_for_status()
+        return res
+
+    try:
+        res = await retry_async(
+            post,
+            max_retries=settings.upstream_max_retries,
+            base_delay=settings.upstream_backoff_base,
+            max_delay=settings.upstream_backoff_max,
+            circuit_breaker=get_circuit_breaker(f"gemini:{model}"),
+        )
+        data = res.json()
+
+        if (
+            "candidates" not in data
+            or "content" not in data["candidates"][0]
+            or "parts" not in data["candidates"][0]["content"]
+            or "text" not in data["candidates"][0]["content"]["parts"][0]
+        ):
             response["status"] = "error"
-            response["error_message"] = str(e)
+            response["error_message"] = "Error or no text returned"
+            return response
+
+        response["full_data"] = data
+        response["data"] = data["candidates"][0]["content"]["parts"][0]["text"]
+
+        usage = data.get("usageMetadata", {})
+        response["usage"] = {
+            "tokens_in": usage.get("promptTokenCount", tokens),
+            "tokens_out": usage.get("candidatesTokenCount", 0),
+        }
+        logger.info(
+            f"{model}: {response['usage']['tokens_in']} tokens in, "
+            f"{response['usage']['tokens_out']} tokens out."
+        )
+
+    except httpx.HTTPStatusError as e:
+        response["status"] = "error"
+        response["error_message"] = f"{e.response.status_code}: {e.response.text}"
+    except httpx.RequestError as e:
+        response["status"] = "error"
+        response["error_message"] = str(e)
 
     return response
+
+
+async def api_request_stream(
+    payload: GemmaPayload,
+    model: str | None = None,
+    priority: Priority = Priority.INTERACTIVE,
+) -> AsyncIterator[str]:
+    """
+    Stream the text of a generation as it is produced, using ``streamGenerateContent``
+    with server-sent events.
+
+    Args:
+        payload (GemmaPayload): The request payload.
+        model (str | None): The model to call. Defaults to the configured default model.
+        priority (Priority): Admission priority against the per-model rate limits.
+
+    Yields:
+        str: Text chunks in the order they are produced by the model.
+
+    Raises:
+        CompletionError: If the upstream request fails or returns a non-success status.
+    """
+    if model is None:
+        model = settings.google_default_model
+
+    payload = context_cache.expand(payload)
+    if not supports_system_instruction(model):
+        payload = payload.inline_system_instruction()
+
+    url = (
+        f"{settings.google_api_base_url}{model}:{settings.google_api_stream_method}"
+        f"?alt=sse&key={settings.api_key}"
+    )
+
+    client = get_http_client()
+
+    async def send() -> httpx.Response:
+        request = client.build_request(
+            "POST", url, json=payload.dict(by_alias=True), timeout=upstream_timeout()
+        )
+        res = await client.send(request, stream=True)
+        if res.is_error:
+            await res.aread()
+            await res.aclose()
+            res.raise_for_status()
+        return res
+
+    async with admit(model, estimate_payload_tokens(payload), priority):
+        try:
+            res = await retry_async(
+                send,
+                max_retries=settings.upstream_max_retries,
+                base_delay=settings.upstream_backoff_base,
+                max_delay=settings.upstream_backoff_max,
+                circuit_breaker=get_circuit_breaker(f"gemini:{model}"),
+            )
+        except httpx.HTTPStatusError as e:
+            raise CompletionError(f"{e.response.status_code}: {e.response.text}") from e
+        except httpx.RequestError as e:
+            raise CompletionError(e) from e
+
+        try:
+            async for line in res.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+
+                data = json.loads(line[5:])
+                candidates = data.get("candidates") or [{}]
+                for part in candidates[0].get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        yield part["text"]
+
+        except httpx.RequestError as e:
+            raise CompletionError(e) from e
+        finally:
+            await res.aclose()
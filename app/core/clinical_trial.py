@@ -1,12 +1,23 @@
+from collections.abc import Sequence
 from itertools import zip_longest
 
-from app.core.config import settings
+from app.core.embedding_batcher import EmbeddingBatcher, embedding_batcher
+from app.core.executors import executors
+from app.core.resources import RetrievalResources, retrieval_resources
 from app.models.clinical_trial import ClinicalTrialResult, ClinicalTrialResults
+from app.utils.singleflight import SingleFlight
+
+retrieval_flights = SingleFlight("chroma")
 
 
 class ClinicalTrialRetriever:
-    def __init__(self) -> None:
-        self.chroma_collection = settings.chroma_collection
+    def __init__(
+        self,
+        resources: RetrievalResources = retrieval_resources,
+        batcher: EmbeddingBatcher = embedding_batcher,
+    ) -> None:
+        self.resources = resources
+        self.batcher = batcher
 
     def __call__(self, query: str, n_results: int = 5) -> ClinicalTrialResults:
         """
@@ -17,19 +28,81 @@ class ClinicalTrialRetriever:
     def retrieve(self, query: str, n_results: int = 5) -> ClinicalTrialResults:
         """
         Retrieve clinical trial results for a given query and number of results.
+
+        This call is blocking, and loads the retrieval stack if it is not ready yet.
+        """
+        return self.query(self.resources.embed([query])[0], n_results)
+
+    def retrieve_many(
+        self, queries: Sequence[str], n_results: int = 5
+    ) -> list[ClinicalTrialResults]:
+        """
+        Retrieve clinical trial results for several queries, embedded in a single batch and
+        searched with a single Chroma query.
+
+        This call is blocking, and loads the retrieval stack if it is not ready yet.
+        """
+        return self.query_many(self.resources.embed(queries), n_results)
+
+    def query(self, embedding: Sequence[float], n_results: int = 5) -> ClinicalTrialResults:
+        """
+        Retrieve the clinical trials closest to an already computed query embedding.
+
+        This call is blocking.
+        """
+        return self.query_many([embedding], n_results)[0]
+
+    def query_many(
+        self, embeddings: Sequence[Sequence[float]], n_results: int = 5
+    ) -> list[ClinicalTrialResults]:
         """
-        results = self.chroma_collection.query(
-            query_texts=[query],
+        Retrieve the clinical trials closest to each query embedding, in one Chroma query.
+
+        This call is blocking.
+        """
+        results = self.resources.collection.query(
+            query_embeddings=list(embeddings),
             n_results=n_results,
         )
-        return self._format_results(results)
+        return [self._format_results(results, index) for index in range(len(embeddings))]
+
+    async def aretrieve(self, query: str, n_results: int = 5) -> ClinicalTrialResults:
+        """
+        Retrieve clinical trial results without blocking the event loop.
+
+        The query is embedded together with other concurrent queries by the embedding
+        batcher, then Chroma is queried with the embedding. Concurrent identical queries
+        share a single retrieval.
+        """
+
+        async def retrieve() -> ClinicalTrialResults:
+            embedding = await self.batcher.embed(query)
+            return await executors.run_cpu(self.query, embedding, n_results)
+
+        return await retrieval_flights.do((query, n_results), retrieve)
+
+    async def aretrieve_many(
+        self, queries: Sequence[str], n_results: int = 5
+    ) -> list[ClinicalTrialResults]:
+        """
+        Retrieve clinical trial results for several queries without blocking the event loop.
+
+        The distinct queries are embedded in one batch and searched with a single Chroma
+        query; the results are returned in the order of the queries.
+        """
+        distinct = list(dict.fromkeys(queries))
+        embeddings = await self.batcher.embed_many(distinct)
+        results = await executors.run_cpu(self.query_many, embeddings, n_results)
+        by_query = dict(zip(distinct, results, strict=True))
+        return [by_query[query] for query in queries]
 
-    def _format_results(self, results: dict) -> ClinicalTrialResults:
+    def _format_results(self, results: dict, index: int = 0) -> ClinicalTrialResults:
         def flatten(key: str) -> list:
-            value = results.get(key, [[]])
-            if value and isinstance(value[0], list):
-                return value[0]
-            ids_len = len(results.get("ids", [[]])[0]) if results.get("ids") else 0
+            value = results.get(key) or [[]]
+            if len(value) > index and isinstance(value[index], list):
+                return value[index]
+            ids = results.get("ids") or []
+            ids_len = len(ids[index]) if len(ids) > index else 0
             return [None] * ids_len
 
         ids = flatten("ids")
@@ -1,13 +1,18 @@
 import time
 
-from pydantic import Field
-from pydantic.functional_validators import model_validator
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 from pydantic_settings.main import SettingsConfigDict
 
-import chromadb
-from chromadb.config import Settings as ChromadbSettings
-from chromadb.utils import embedding_functions
+
+class ModelLimits(BaseModel):
+    """
+    Client-side admission limits for a single model. A value of 0 disables the limit.
+    """
+
+    rpm: int = Field(default=0, ge=0, description="Requests per minute.")
+    tpm: int = Field(default=0, ge=0, description="Input tokens per minute.")
+    max_in_flight: int = Field(default=8, ge=1, description="Maximum concurrent requests.")
 
 
 class Settings(BaseSettings):
@@ -23,6 +28,7 @@ class Settings(BaseSettings):
         alias="GOOGLE_API_BASE_URL",
     )
     google_api_default_method: str = "generateContent"
+    google_api_stream_method: str = "streamGenerateContent"
     google_cloud_project: str = Field(
         default="", alias="GOOGLE_CLOUD_PROJECT"
     )
@@ -31,35 +37,146 @@ class Settings(BaseSettings):
     google_default_model: str = "gemma-3-27b-it"
     static_files_dir: str = Field(default="static", alias="STATIC_FILES_DIR")
     embedding_device: str = Field(default="cpu", alias="EMBEDDING_DEVICE")
-    chroma_client: None = None
-    chroma_collection: None = None
-
-    @model_validator(mode="after")
-    def initialize_chroma_client(self) -> "Settings":
-        self.chroma_client = chromadb.PersistentClient(
-            path="chromadb", settings=ChromadbSettings(anonymized_telemetry=False)
-        )
-
-        print(  # noqa: T201
-            "ChromaDB client initialized successfully. Downloading embedding model..."
-        )
-
-        sentence_transformer_ef = (
-            embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name="thomas-sounack/BioClinical-ModernBERT-base",
-                device=self.embedding_device,
-                trust_remote_code=True,
-            )
-        )
-
-        print("Embedding model downloaded successfully.")  # noqa: T201
-
-        self.chroma_collection = self.chroma_client.get_or_create_collection(
-            name="clinical_trials", embedding_function=sentence_transformer_ef
-        )
-
-        return self
-
+    embedding_model: str = Field(
+        default="thomas-sounack/BioClinical-ModernBERT-base", alias="EMBEDDING_MODEL"
+    )
+    retrieval_enabled: bool = Field(default=True, alias="RETRIEVAL_ENABLED")
+    retrieval_warmup: bool = Field(default=True, alias="RETRIEVAL_WARMUP")
+    chroma_path: str = Field(default="chromadb", alias="CHROMA_PATH")
+    chroma_collection_name: str = Field(
+        default="clinical_trials", alias="CHROMA_COLLECTION_NAME"
+    )
+    embedding_batch_max_size: int = Field(default=32, ge=1, alias="EMBEDDING_BATCH_MAX_SIZE")
+    embedding_batch_window: float = Field(default=0.005, ge=0, alias="EMBEDDING_BATCH_WINDOW")
+    embedding_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024, ge=0, alias="EMBEDDING_CACHE_MAX_BYTES"
+    )
+    embedding_cache_path: str | None = Field(default=None, alias="EMBEDDING_CACHE_PATH")
+    embedding_cache_disk_entries: int = Field(
+        default=65536, ge=1, alias="EMBEDDING_CACHE_DISK_ENTRIES"
+    )
+    trial_batch_summary_concurrency: int = Field(
+        default=4, ge=1, alias="TRIAL_BATCH_SUMMARY_CONCURRENCY"
+    )
+    google_cse_url: str = Field(
+        default="https://customsearch.googleapis.com/customsearch/v1",
+        alias="GOOGLE_CSE_URL",
+    )
+    http_max_connections: int = Field(default=100, alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive_connections: int = Field(
+        default=20, alias="HTTP_MAX_KEEPALIVE_CONNECTIONS"
+    )
+    http_keepalive_expiry: float = Field(default=30.0, alias="HTTP_KEEPALIVE_EXPIRY")
+    http_connect_timeout: float = Field(default=5.0, alias="HTTP_CONNECT_TIMEOUT")
+    http_read_timeout: float = Field(default=60.0, alias="HTTP_READ_TIMEOUT")
+    http2_enabled: bool = Field(default=True, alias="HTTP2_ENABLED")
+    request_deadline: float | None = Field(default=90.0, alias="REQUEST_DEADLINE")
+    upstream_max_retries: int = Field(default=3, alias="UPSTREAM_MAX_RETRIES")
+    upstream_backoff_base: float = Field(default=0.5, alias="UPSTREAM_BACKOFF_BASE")
+    upstream_backoff_max: float = Field(default=8.0, alias="UPSTREAM_BACKOFF_MAX")
+    circuit_breaker_failure_threshold: int = Field(
+        default=5, alias="CIRCUIT_BREAKER_FAILURE_THRESHOLD"
+    )
+    circuit_breaker_reset_timeout: float = Field(
+        default=30.0, alias="CIRCUIT_BREAKER_RESET_TIMEOUT"
+    )
+    model_limits: dict[str, ModelLimits] = Field(
+        default_factory=lambda: {
+            "gemma-3-27b-it": ModelLimits(rpm=30, tpm=15000, max_in_flight=8),
+            "gemini-1.5-flash": ModelLimits(rpm=15, tpm=1000000, max_in_flight=8),
+        },
+        alias="MODEL_LIMITS",
+    )
+    rate_limit_queue_timeout: float = Field(
+        default=30.0, alias="RATE_LIMIT_QUEUE_TIMEOUT"
+    )
+    llm_cache_enabled: bool = Field(default=True, alias="LLM_CACHE_ENABLED")
+    llm_cache_max_entries: int = Field(default=1024, alias="LLM_CACHE_MAX_ENTRIES")
+    llm_cache_default_ttl: float = Field(default=300.0, alias="LLM_CACHE_DEFAULT_TTL")
+    llm_cache_model_ttls: dict[str, float] = Field(
+        default_factory=dict, alias="LLM_CACHE_MODEL_TTLS"
+    )
+    llm_cache_sqlite_path: str | None = Field(
+        default=None, alias="LLM_CACHE_SQLITE_PATH"
+    )
+    router_mode: str = Field(default="local", alias="ROUTER_MODE")
+    router_examples_path: str = Field(
+        default="app/assets/router_examples.json", alias="ROUTER_EXAMPLES_PATH"
+    )
+    router_confidence_threshold: float = Field(
+        default=0.05, alias="ROUTER_CONFIDENCE_THRESHOLD"
+    )
+    chat_format_mode: str = Field(default="local", alias="CHAT_FORMAT_MODE")
+    chat_speculative_medgemma: bool = Field(
+        default=False, alias="CHAT_SPECULATIVE_MEDGEMMA"
+    )
+    model_context_budgets: dict[str, int] = Field(
+        default_factory=lambda: {"gemma-3-27b-it": 12000, "gemini-1.5-flash": 64000},
+        alias="MODEL_CONTEXT_BUDGETS",
+    )
+    model_chars_per_token: dict[str, float] = Field(
+        default_factory=dict, alias="MODEL_CHARS_PER_TOKEN"
+    )
+    chat_keep_recent_messages: int = Field(default=6, alias="CHAT_KEEP_RECENT_MESSAGES")
+    chat_summary_model: str = Field(
+        default="gemini-1.5-flash", alias="CHAT_SUMMARY_MODEL"
+    )
+    chat_summary_cache_max_entries: int = Field(
+        default=1024, ge=0, alias="CHAT_SUMMARY_CACHE_MAX_ENTRIES"
+    )
+    chat_session_max: int = Field(default=1000, alias="CHAT_SESSION_MAX")
+    chat_session_ttl: float = Field(default=86400.0, alias="CHAT_SESSION_TTL")
+    chat_session_sqlite_path: str | None = Field(
+        default=None, alias="CHAT_SESSION_SQLITE_PATH"
+    )
+    patient_record_path: str = Field(
+        default="app/assets/patient.json", alias="PATIENT_RECORD_PATH"
+    )
+    patient_db_path: str = Field(
+        default="app/assets/patients.db", alias="PATIENT_DB_PATH"
+    )
+    patient_compaction_interval: float = Field(
+        default=300.0, alias="PATIENT_COMPACTION_INTERVAL"
+    )
+    patient_snapshot_min_patches: int = Field(
+        default=20, alias="PATIENT_SNAPSHOT_MIN_PATCHES"
+    )
+    google_cached_contents_url: str = Field(
+        default="https://generativelanguage.googleapis.com/v1beta/cachedContents",
+        alias="GOOGLE_CACHED_CONTENTS_URL",
+    )
+    context_cache_backend: str = Field(default="gemini", alias="CONTEXT_CACHE_BACKEND")
+    context_cache_ttl: float = Field(default=3600.0, alias="CONTEXT_CACHE_TTL")
+    context_cache_release_grace: float = Field(
+        default=300.0, alias="CONTEXT_CACHE_RELEASE_GRACE"
+    )
+    context_cache_min_tokens: dict[str, int] = Field(
+        default_factory=lambda: {"gemini-1.5-flash": 32768},
+        alias="CONTEXT_CACHE_MIN_TOKENS",
+    )
+    image_preprocessing_enabled: bool = Field(
+        default=True, alias="IMAGE_PREPROCESSING_ENABLED"
+    )
+    image_max_dimension: int = Field(default=1536, ge=0, alias="IMAGE_MAX_DIMENSION")
+    image_format: str = Field(default="JPEG", alias="IMAGE_FORMAT")
+    image_quality: int = Field(default=85, ge=1, le=100, alias="IMAGE_QUALITY")
+    upload_max_bytes: int = Field(default=20 * 1024 * 1024, alias="UPLOAD_MAX_BYTES")
+    scan_job_backend: str = Field(default="memory", alias="SCAN_JOB_BACKEND")
+    scan_job_workers: int = Field(default=2, ge=1, alias="SCAN_JOB_WORKERS")
+    scan_job_queue_size: int = Field(default=32, ge=1, alias="SCAN_JOB_QUEUE_SIZE")
+    scan_job_ttl: float = Field(default=3600.0, alias="SCAN_JOB_TTL")
+    scan_cache_max_entries: int = Field(default=512, ge=0, alias="SCAN_CACHE_MAX_ENTRIES")
+    scan_cache_ttl: float = Field(default=86400.0, alias="SCAN_CACHE_TTL")
+    scan_cache_max_distance: int = Field(default=-1, ge=-1, alias="SCAN_CACHE_MAX_DISTANCE")
+    scan_cache_eviction: str = Field(default="lru", alias="SCAN_CACHE_EVICTION")
+    io_thread_workers: int = Field(default=16, ge=1, alias="IO_THREAD_WORKERS")
+    cpu_thread_workers: int = Field(default=4, ge=1, alias="CPU_THREAD_WORKERS")
+    process_workers: int = Field(default=2, ge=0, alias="PROCESS_WORKERS")
+    process_start_method: str = Field(
+        default="spawn", pattern="^(spawn|forkserver)$", alias="PROCESS_START_METHOD"
+    )
+    loop_lag_interval: float = Field(default=0.5, alias="LOOP_LAG_INTERVAL")
+    loop_lag_threshold: float = Field(default=0.1, alias="LOOP_LAG_THRESHOLD")
     model_config = SettingsConfigDict(env_file=".env")
 
 
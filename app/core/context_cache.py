@@ -0,0 +1,371 @@
+import abc
+import hashlib
+import json
+import time
+import uuid
+from dataclasses import dataclass
+
+import httpx
+
+from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.models.gemma import Content, GemmaPayload, Part
+from app.utils.logger import logger
+from app.utils.singleflight import SingleFlight
+from app.utils.tokens import estimate_content_tokens
+
+__all__ = [
+    "ContextCache",
+    "ContextCacheBackend",
+    "GeminiContextCacheBackend",
+    "LocalContextCacheBackend",
+    "context_cache",
+]
+
+# Cached prefixes are recreated this many seconds before they expire upstream.
+REFRESH_MARGIN = 60.0
+
+
+class ContextCacheBackend(abc.ABC):
+    """
+    Storage of cached content prefixes, referenced by name from generation requests.
+    """
+
+    @abc.abstractmethod
+    async def create(
+        self,
+        model: str,
+        contents: list[Content],
+        system_instruction: Content | None,
+        ttl: float,
+    ) -> str:
+        """
+        Register a prefix and return the name under which requests can reference it.
+        """
+
+    @abc.abstractmethod
+    async def delete(self, name: str) -> None:
+        """
+        Release a prefix that is no longer referenced.
+        """
+
+    def expand(self, payload: GemmaPayload) -> GemmaPayload:
+        """
+        Return the payload to send upstream. Prefixes stored upstream are resolved by the API,
+        so the payload is sent as is.
+        """
+        return payload
+
+
+class GeminiContextCacheBackend(ContextCacheBackend):
+    """
+    Backend using the Gemini ``cachedContents`` API.
+    """
+
+    async def create(
+        self,
+        model: str,
+        contents: list[Content],
+        system_instruction: Content | None,
+        ttl: float,
+    ) -> str:
+        body = GemmaPayload(contents=contents, systemInstruction=system_instruction).dict()
+        body.update({"model": f"models/{model}", "ttl": f"{int(ttl)}s"})
+
+        res = await get_http_client().post(
+            f"{settings.google_cached_contents_url}?key={settings.api_key}", json=body
+        )
+        res.raise_for_status()
+        return res.json()["name"]
+
+    async def delete(self, name: str) -> None:
+        cache_id = name.rsplit("/", 1)[-1]
+        res = await get_http_client().delete(
+            f"{settings.google_cached_contents_url}/{cache_id}?key={settings.api_key}"
+        )
+        res.raise_for_status()
+
+
+class LocalContextCacheBackend(ContextCacheBackend):
+    """
+    In-process stand-in for the ``cachedContents`` API, used in tests and with models or
+    environments without context caching: prefixes are kept in memory and inlined back into
+    the payload before it is sent. Like upstream, prefixes expire after their TTL.
+    """
+
+    def __init__(self) -> None:
+        self.entries: dict[str, tuple[list[Content], Content | None, float]] = {}
+
+    async def create(
+        self,
+        model: str,
+        contents: list[Content],
+        system_instruction: Content | None,
+        ttl: float,
+    ) -> str:
+        now = time.time()
+        self.entries = {
+            name: entry for name, entry in self.entries.items() if entry[2] > now
+        }
+        name = f"cachedContents/local-{uuid.uuid4().hex}"
+        self.entries[name] = (contents, system_instruction, now + ttl)
+        return name
+
+    async def delete(self, name: str) -> None:
+        self.entries.pop(name, None)
+
+    def expand(self, payload: GemmaPayload) -> GemmaPayload:
+        entry = self.entries.get(payload.cached_content or "")
+        if entry is None:
+            return payload
+
+        contents, system_instruction, _ = entry
+        return GemmaPayload(
+            contents=[*contents, *payload.contents],
+            systemInstruction=system_instruction,
+        )
+
+
+@dataclass
+class CachedPrefix:
+    name: str
+    fingerprint: str
+    expires_at: float
+
+
+class ContextCache:
+    """
+    Register large, stable prompt prefixes (the patient's medical file) once and reference
+    them by name in subsequent requests instead of re-sending them as fresh input tokens.
+
+    A prefix is identified by a key (e.g. ``"medgemma"``) and a model. Its fingerprint, a
+    hash of the prefix and the system instruction, acts as the record version: when the
+    medical file changes, the next request registers a new prefix. The replaced prefix is
+    released after ``release_grace`` seconds, as requests built just before may still
+    reference it, or left to expire upstream when its TTL ends first.
+    Models without context caching, or prefixes below the model's minimum cacheable size,
+    are sent inline unchanged.
+
+    Example usage:
+        ```python
+        payload = await context_cache.apply(payload, introduction, "gemini-1.5-flash", "scan")
+        response = await api_request(payload, model="gemini-1.5-flash")
+        ```
+    """
+
+    def __init__(
+        self,
+        backend: ContextCacheBackend | None,
+        ttl: float = 3600.0,
+        min_tokens: dict[str, int] | None = None,
+        release_grace: float = 300.0,
+    ) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.release_grace = release_grace
+        self.min_tokens = min_tokens or {}
+        self.created = 0
+        self.reused = 0
+        self.invalidated = 0
+        self.inlined = 0
+        self.failures = 0
+        self._prefixes: dict[tuple[str, str], CachedPrefix] = {}
+        # Replaced prefixes as (release time, name), in release order.
+        self._retired: list[tuple[float, str]] = []
+        self._flights = SingleFlight("context_cache")
+
+    def eligible(
+        self, model: str, contents: list[Content], system_instruction: Content | None
+    ) -> bool:
+        """
+        Return whether a prefix is worth caching for a model.
+        """
+        minimum = self.min_tokens.get(model)
+        if self.backend is None or minimum is None:
+            return False
+
+        tokens = sum(estimate_content_tokens(content) for content in contents)
+        if system_instruction is not None:
+            tokens += estimate_content_tokens(system_instruction)
+        return tokens >= minimum
+
+    async def apply(
+        self, payload: GemmaPayload, prefix: str, model: str, key: str
+    ) -> GemmaPayload:
+        """
+        Reference the cached prefix from a payload whose first user turn starts with it.
+
+        The prefix and the system instruction are moved into the cached content, as the API
+        does not accept a system instruction alongside a cached content.
+
+        Args:
+            payload (GemmaPayload): The payload carrying the prefix inline.
+            prefix (str): The text heading the first user turn.
+            model (str): The model the payload is sent to.
+            key (str): The identity of the prefix, stable across record versions.
+
+        Returns:
+            GemmaPayload: The payload referencing the cached prefix, or the original payload
+                when the prefix cannot be cached.
+        """
+        first_user = next(
+            (i for i, content in enumerate(payload.contents) if content.role == "user"),
+            None,
+        )
+        if (
+            first_user is None
+            or not payload.contents[first_user].parts
+            or not (payload.contents[first_user].parts[0].text or "").startswith(prefix)
+        ):
+            return payload
+
+        cached = [Content(role="user", parts=[Part(text=prefix, inlineData=None)])]
+        name = None
+        if self.eligible(model, cached, payload.system_instruction):
+            name = await self.get_or_create(key, model, cached, payload.system_instruction)
+        if name is None:
+            self.inlined += 1
+            return payload
+
+        contents = [content.model_copy(deep=True) for content in payload.contents]
+        contents[first_user].parts[0].text = contents[first_user].parts[0].text[len(prefix) :]
+        if not contents[first_user].parts[0].text and len(contents[first_user].parts) > 1:
+            del contents[first_user].parts[0]
+        return GemmaPayload(contents=contents, cachedContent=name)
+
+    async def get_or_create(
+        self,
+        key: str,
+        model: str,
+        contents: list[Content],
+        system_instruction: Content | None = None,
+    ) -> str | None:
+        """
+        Return the name of the cached prefix, registering it if it is new, has changed or is
+        about to expire. Returns None if the backend could not register it.
+        """
+        if self._retired and self._retired[0][0] <= time.time():
+            await self._release_retired()
+
+        fingerprint = self._fingerprint(model, contents, system_instruction)
+        entry = self._prefixes.get((key, model))
+        if (
+            entry is not None
+            and entry.fingerprint == fingerprint
+            and entry.expires_at - REFRESH_MARGIN > time.time()
+        ):
+            self.reused += 1
+            return entry.name
+
+        return await self._flights.do(
+            (key, model, fingerprint),
+            lambda: self._create(key, model, fingerprint, contents, system_instruction),
+        )
+
+    async def _create(
+        self,
+        key: str,
+        model: str,
+        fingerprint: str,
+        contents: list[Content],
+        system_instruction: Content | None,
+    ) -> str | None:
+        try:
+            name = await self.backend.create(model, contents, system_instruction, self.ttl)
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            logger.warning(f"Context caching failed for {key} on {model}, sending inline: {e}")
+            self.failures += 1
+            return None
+
+        self.created += 1
+        previous = self._prefixes.get((key, model))
+        self._prefixes[(key, model)] = CachedPrefix(
+            name=name, fingerprint=fingerprint, expires_at=time.time() + self.ttl
+        )
+        if previous is not None:
+            if previous.fingerprint != fingerprint:
+                self.invalidated += 1
+            release_at = time.time() + self.release_grace
+            if release_at < previous.expires_at:
+                self._retired.append((release_at, previous.name))
+        return name
+
+    async def _release_retired(self, everything: bool = False) -> None:
+        now = time.time()
+        due = [name for release_at, name in self._retired if everything or release_at <= now]
+        self._retired = [entry for entry in self._retired if entry[1] not in due]
+        for name in due:
+            await self._release(name)
+
+    async def _release(self, name: str) -> None:
+        try:
+            await self.backend.delete(name)
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to delete cached content {name}: {e}")
+
+    def expand(self, payload: GemmaPayload) -> GemmaPayload:
+        """
+        Resolve a cached content reference that the upstream API cannot resolve itself.
+        """
+        if payload.cached_content is None or self.backend is None:
+            return payload
+        return self.backend.expand(payload)
+
+    async def close(self) -> None:
+        """
+        Release every registered prefix.
+        """
+        await self._release_retired(everything=True)
+        prefixes, self._prefixes = self._prefixes, {}
+        for entry in prefixes.values():
+            await self._release(entry.name)
+
+    @staticmethod
+    def _fingerprint(
+        model: str, contents: list[Content], system_instruction: Content | None
+    ) -> str:
+        canonical = json.dumps(
+            {
+                "model": model,
+                "contents": [content.model_dump(by_alias=True) for content in contents],
+                "system_instruction": (
+                    system_instruction.model_dump(by_alias=True)
+                    if system_instruction is not None
+                    else None
+                ),
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the number of prefixes registered, reused, invalidated, sent inline and
+        awaiting release.
+        """
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "invalidated": self.invalidated,
+            "inlined": self.inlined,
+            "failures": self.failures,
+            "active": len(self._prefixes),
+            "retired": len(self._retired),
+        }
+
+
+def _build_backend() -> ContextCacheBackend | None:
+    if settings.context_cache_backend == "gemini":
+        return GeminiContextCacheBackend()
+    if settings.context_cache_backend == "local":
+        return LocalContextCacheBackend()
+    return None
+
+
+context_cache = ContextCache(
+    backend=_build_backend(),
+    ttl=settings.context_cache_ttl,
+    min_tokens=settings.context_cache_min_tokens,
+    release_grace=settings.context_cache_release_grace,
+)
@@ -0,0 +1,170 @@
+import asyncio
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from app.core.config import settings
+from app.core.embedding_cache import EmbeddingCache, embedding_cache
+from app.core.executors import executors
+from app.core.resources import retrieval_resources
+
+__all__ = [
+    "EmbeddingBatcher",
+    "embedding_batcher",
+]
+
+
+class EmbeddingBatcher:
+    """
+    Gather texts embedded concurrently into batches, so that the embedding model runs one
+    forward pass for many queries instead of one pass per query.
+
+    The first text waiting starts a ``window`` of seconds during which other texts join the
+    batch; the batch is encoded when the window ends or as soon as it holds
+    ``max_batch_size`` distinct texts. Identical texts are encoded once. Batches are encoded
+    in the CPU thread pool and the vectors are handed back to each caller. With a ``cache``,
+    texts embedded before are answered from it without joining a batch.
+
+    Example usage:
+        ```python
+        embedding = await embedding_batcher.embed("Phase III trials for type 2 diabetes")
+        ```
+    """
+
+    def __init__(
+        self,
+        embed_function: Callable[[Sequence[str]], Sequence[Any]],
+        max_batch_size: int = 32,
+        window: float = 0.005,
+        cache: EmbeddingCache | None = None,
+    ) -> None:
+        self.embed_function = embed_function
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self.batches = 0
+        self.texts = 0
+        self.requests = 0
+        self.largest_batch = 0
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> Sequence[float]:
+        """
+        Embed a single text as part of the next batch.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            Sequence[float]: The embedding of the text.
+        """
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: Sequence[str]) -> list[Sequence[float]]:
+        """
+        Embed texts as part of the next batches.
+
+        Args:
+            texts (Sequence[str]): The texts to embed.
+
+        Returns:
+            list[Sequence[float]]: The embeddings, in the order of the texts.
+
+        Raises:
+            RetrievalUnavailableError: If the embedding model is disabled or failed to load.
+        """
+        loop = asyncio.get_running_loop()
+        cached = await self._lookup(texts)
+        futures = []
+        for text, embedding in zip(texts, cached, strict=True):
+            future = loop.create_future()
+            futures.append(future)
+            self.requests += 1
+            if embedding is not None:
+                future.set_result(embedding)
+                continue
+
+            self._pending.setdefault(text, []).append(future)
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    async def _lookup(self, texts: Sequence[str]) -> list[Sequence[float] | None]:
+        if self.cache is None:
+            return [None] * len(texts)
+
+        cached = [self.cache.get_in_memory(text) for text in texts]
+        missing = [i for i, embedding in enumerate(cached) if embedding is None]
+        misses = [texts[i] for i in missing]
+        if misses and self.cache.path:
+            # Reading the shared file may hit the disk: keep it off the event loop.
+            found = await executors.run_io(self._get_from_disk, misses)
+        else:
+            found = self._get_from_disk(misses)
+        for i, embedding in zip(missing, found, strict=True):
+            cached[i] = embedding
+        return cached
+
+    def _get_from_disk(self, texts: list[str]) -> list[Sequence[float] | None]:
+        return [self.cache.get_from_disk(text) for text in texts]
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._encode(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _encode(self, batch: dict[str, list[asyncio.Future]]) -> None:
+        texts = list(batch)
+        self.batches += 1
+        self.texts += len(texts)
+        self.largest_batch = max(self.largest_batch, len(texts))
+        try:
+            embeddings = await executors.run_cpu(self._embed, texts)
+        except Exception as e:
+            for future in (future for futures in batch.values() for future in futures):
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, embedding in zip(texts, embeddings, strict=True):
+            for future in batch[text]:
+                if not future.done():
+                    future.set_result(embedding)
+
+    def _embed(self, texts: list[str]) -> Sequence[Any]:
+        embeddings = self.embed_function(texts)
+        if self.cache is None:
+            return embeddings
+        return [
+            self.cache.set(text, embedding)
+            for text, embedding in zip(texts, embeddings, strict=True)
+        ]
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the number of batches and texts encoded, and the average and largest batch.
+        """
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "requests": self.requests,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
+
+
+embedding_batcher = EmbeddingBatcher(
+    retrieval_resources.embed,
+    max_batch_size=settings.embedding_batch_max_size,
+    window=settings.embedding_batch_window,
+    cache=embedding_cache,
+)
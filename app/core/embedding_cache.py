@@ -0,0 +1,340 @@
+import contextlib
+import hashlib
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where the shared file tier is disabled.
+    fcntl = None
+
+__all__ = [
+    "EmbeddingCache",
+    "embedding_cache",
+]
+
+
+class EmbeddingCache:
+    """
+    Cache of query embeddings, so that repeated queries skip the embedding model.
+
+    Texts are keyed on their normalized form (Unicode NFKC, surrounding and repeated
+    whitespace collapsed) together with the model name; case is kept, as the model is cased.
+    Vectors are stored as float32 in a memory tier bounded to ``max_bytes`` with LRU
+    eviction and, when ``path`` is set, in a memory-mapped ``.npy`` file of ``disk_entries``
+    slots shared by every worker on the host (POSIX only, as it relies on ``flock``). Each
+    key maps to a single slot of the file (a new entry replaces the one in its slot), so
+    lookups need no index.
+
+    :meth:`get_in_memory` never touches the disk and can run on the event loop; disk lookups
+    (:meth:`get_from_disk`) and :meth:`set` block and belong in a worker thread. The memory
+    tier and the file have separate locks, so disk I/O never delays a memory lookup.
+
+    Example usage:
+        ```python
+        embedding = embedding_cache.get(query)
+        if embedding is None:
+            embedding = embedding_cache.set(query, embed([query])[0])
+        ```
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        path: str | None = None,
+        disk_entries: int = 65536,
+    ) -> None:
+        if path and fcntl is None:
+            logger.warning("The shared embedding cache file needs fcntl, it is disabled.")
+            path = None
+
+        self.model = model
+        self.max_bytes = max_bytes
+        self.path = path
+        self.disk_entries = disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries: OrderedDict[int, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk: np.memmap | None = None
+        self._disk_fd: int | None = None
+        self._lock_fd: int | None = None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Return the form of a text used as cache key.
+        """
+        return " ".join(unicodedata.normalize("NFKC", text).split())
+
+    def make_key(self, text: str) -> int:
+        """
+        Compute the 64-bit key of a text for the configured model (never 0, which marks an
+        empty slot on disk).
+        """
+        digest = hashlib.blake2b(
+            f"{self.model}\0{self.normalize(text)}".encode(), digest_size=8
+        ).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def get(self, text: str) -> np.ndarray | None:
+        """
+        Look up the embedding of a text, first in memory then on disk. Blocking.
+
+        Args:
+            text (str): The embedded text.
+
+        Returns:
+            np.ndarray | None: The read-only float32 embedding, or None on a miss.
+        """
+        vector = self.get_in_memory(text)
+        if vector is None:
+            vector = self.get_from_disk(text)
+        return vector
+
+    def get_in_memory(self, text: str) -> np.ndarray | None:
+        """
+        Look up the embedding of a text in the memory tier only.
+        """
+        if not self.max_bytes:
+            return None
+
+        key = self.make_key(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return vector
+
+    def get_from_disk(self, text: str) -> np.ndarray | None:
+        """
+        Look up the embedding of a text missing from memory in the shared file, keeping it
+        in memory when found. Counts a miss when there is no file.
+        """
+        if not self.max_bytes:
+            return None
+
+        key = self.make_key(text)
+        vector = self._disk_get(key) if self.path else None
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+    def set(self, text: str, embedding: Sequence[float]) -> np.ndarray:
+        """
+        Store the embedding of a text in memory and, when configured, on disk.
+
+        Args:
+            text (str): The embedded text.
+            embedding (Sequence[float]): Its embedding.
+
+        Returns:
+            np.ndarray: The embedding as stored, a read-only float32 vector.
+        """
+        vector = np.array(embedding, dtype=np.float32)
+        vector.setflags(write=False)
+        if not self.max_bytes:
+            return vector
+
+        key = self.make_key(text)
+        with self._lock:
+            self._remember(key, vector)
+        if self.path:
+            try:
+                self._disk_set(key, vector)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to persist embedding cache entry: {e}")
+        return vector
+
+    def _remember(self, key: int, vector: np.ndarray) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous.nbytes
+        self._entries[key] = vector
+        self.size += vector.nbytes
+        while self.size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.nbytes
+
+    def _open_disk(self, dimensions: int | None) -> np.memmap | None:
+        """
+        Map the cache file, creating it (sparse) on the first write.
+
+        The file is created with ``O_EXCL`` under an exclusive ``flock`` of the sidecar
+        ``<path>.lock``, which readers hold shared while mapping, so no worker maps a
+        half-written file. A file of another model dimension or number of slots is unlinked
+        and created anew rather than swapped under workers mapping it: they notice that the
+        path names another inode and map the new file.
+        """
+        if self._disk is not None:
+            if not self._replaced() and self._matches(self._disk, dimensions):
+                return self._disk
+            self._close_disk()
+
+        if self._lock_fd is None:
+            self._lock_fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_SH if dimensions is None else fcntl.LOCK_EX)
+        try:
+            self._map()
+            if self._disk is not None and self._matches(self._disk, dimensions):
+                return self._disk
+            self._close_disk()
+            if dimensions is None:
+                return None
+
+            self._create(dimensions)
+            self._map()
+            if self._disk is None:
+                raise ValueError(f"Could not map the new embedding cache file {self.path}.")
+            return self._disk
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _map(self) -> None:
+        try:
+            fd = os.open(self.path, os.O_RDWR)
+        except FileNotFoundError:
+            return
+
+        try:
+            with open(fd, "r+b", closefd=False) as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+                self._disk = np.memmap(f, dtype=dtype, mode="r+", offset=f.tell(), shape=shape)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable embedding cache file {self.path}: {e}")
+            os.close(fd)
+            return
+        self._disk_fd = fd
+
+    def _create(self, dimensions: int) -> None:
+        dtype = np.dtype([("key", "<u8"), ("vector", "<f4", (dimensions,))])
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            with open(fd, "r+b", closefd=False) as f:
+                np.lib.format.write_array_header_1_0(
+                    f,
+                    {
+                        "descr": np.lib.format.dtype_to_descr(dtype),
+                        "fortran_order": False,
+                        "shape": (self.disk_entries,),
+                    },
+                )
+                f.flush()
+                os.ftruncate(fd, f.tell() + dtype.itemsize * self.disk_entries)
+        finally:
+            os.close(fd)
+        logger.info(f"Created the embedding cache file {self.path}.")
+
+    def _replaced(self) -> bool:
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        mapped = os.fstat(self._disk_fd)
+        return (current.st_dev, current.st_ino) != (mapped.st_dev, mapped.st_ino)
+
+    def _matches(self, disk: np.ndarray, dimensions: int | None) -> bool:
+        return (
+            disk.dtype.names == ("key", "vector")
+            and disk.shape == (self.disk_entries,)
+            and (dimensions is None or disk.dtype["vector"].shape == (dimensions,))
+        )
+
+    def _disk_get(self, key: int) -> np.ndarray | None:
+        with self._disk_lock:
+            try:
+                disk = self._open_disk(None)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to open the embedding cache file: {e}")
+                return None
+        if disk is None:
+            return None
+
+        slot = key % self.disk_entries
+        if disk["key"][slot] != key:
+            return None
+        vector = np.array(disk["vector"][slot])
+        # Another worker may have replaced the slot while it was copied.
+        if disk["key"][slot] != key:
+            return None
+        vector.setflags(write=False)
+        return vector
+
+    def _disk_set(self, key: int, vector: np.ndarray) -> None:
+        slot = key % self.disk_entries
+        # The thread lock orders writers of this process, flock those of other workers.
+        with self._disk_lock:
+            disk = self._open_disk(vector.shape[0])
+            fcntl.flock(self._disk_fd, fcntl.LOCK_EX)
+            try:
+                # Clear the key first so that readers never pair it with another vector.
+                disk["key"][slot] = 0
+                disk["vector"][slot] = vector
+                disk["key"][slot] = key
+            finally:
+                fcntl.flock(self._disk_fd, fcntl.LOCK_UN)
+
+    def _close_disk(self) -> None:
+        if self._disk is not None:
+            self._disk.flush()
+            self._disk = None
+        if self._disk_fd is not None:
+            os.close(self._disk_fd)
+            self._disk_fd = None
+
+    def close(self) -> None:
+        """
+        Flush and unmap the cache file, if any. Called from the FastAPI lifespan on shutdown.
+        """
+        with self._disk_lock:
+            self._close_disk()
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return hit/miss counters and the current memory footprint.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+embedding_cache = EmbeddingCache(
+    model=settings.embedding_model,
+    max_bytes=settings.embedding_cache_max_bytes,
+    path=settings.embedding_cache_path,
+    disk_entries=settings.embedding_cache_disk_entries,
+)
@@ -0,0 +1,111 @@
+import json
+from collections.abc import Callable, Sequence
+from typing import Any
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.executors import executors
+from app.core.resources import retrieval_resources
+from app.utils.logger import logger
+
+__all__ = [
+    "EmbeddingRouter",
+    "embedding_router",
+]
+
+
+class EmbeddingRouter:
+    """
+    Local request router using the clinical embedding model.
+
+    Labelled example requests are embedded once and averaged into one centroid per route.
+    An input is assigned to the route whose centroid is the most similar (cosine), provided
+    the margin over the runner-up reaches the confidence threshold; ambiguous inputs are left
+    to the caller, which escalates them to the LLM classifier.
+    """
+
+    def __init__(
+        self,
+        examples_path: str,
+        embedding_function: Callable[[Sequence[str]], Sequence[Any]] | None,
+        confidence_threshold: float = 0.05,
+        available: Callable[[], bool] | None = None,
+    ) -> None:
+        self.examples_path = examples_path
+        self.embedding_function = embedding_function
+        self.available = available
+        self.confidence_threshold = confidence_threshold
+        self.local_hits = 0
+        self.escalations = 0
+        self._labels: list[str] = []
+        self._centroids: np.ndarray | None = None
+
+    def _embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.asarray(self.embedding_function(list(texts)), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def _load_centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            with open(self.examples_path) as f:
+                examples: dict[str, list[str]] = json.load(f)
+
+            self._labels = list(examples)
+            centroids = np.stack(
+                [self._embed(examples[label]).mean(axis=0) for label in self._labels]
+            )
+            self._centroids = centroids / np.linalg.norm(
+                centroids, axis=1, keepdims=True
+            )
+        return self._centroids
+
+    def classify(self, text: str) -> tuple[str, float]:
+        """
+        Return the nearest route and its confidence, the similarity margin over the runner-up.
+
+        This call is blocking (it runs the embedding model); use :meth:`aclassify` from async code.
+        """
+        centroids = self._load_centroids()
+        similarities = centroids @ self._embed([text])[0]
+        ranked = np.argsort(similarities)[::-1]
+        margin = float(similarities[ranked[0]] - similarities[ranked[1]])
+        return self._labels[ranked[0]], margin
+
+    async def aclassify(self, text: str) -> str | None:
+        """
+        Classify off the event loop, returning None when the input is ambiguous or the local
+        model is unavailable or still loading.
+        """
+        if self.embedding_function is None or (
+            self.available is not None and not self.available()
+        ):
+            self.escalations += 1
+            return None
+
+        try:
+            label, confidence = await executors.run_cpu(self.classify, text)
+        except Exception as e:
+            logger.warning(f"Local routing failed, escalating to the LLM: {e}")
+            self.escalations += 1
+            return None
+
+        if confidence < self.confidence_threshold:
+            self.escalations += 1
+            return None
+
+        self.local_hits += 1
+        return label
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return how many requests were routed locally and how many were escalated.
+        """
+        return {"local_hits": self.local_hits, "escalations": self.escalations}
+
+
+embedding_router = EmbeddingRouter(
+    examples_path=settings.router_examples_path,
+    embedding_function=retrieval_resources.embed if settings.retrieval_enabled else None,
+    confidence_threshold=settings.router_confidence_threshold,
+    available=lambda: retrieval_resources.ready,
+)
@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import multiprocessing
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import ParamSpec, TypeVar
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+__all__ = [
+    "ExecutorPools",
+    "executors",
+]
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class PoolStats:
+    """
+    Counters for one executor: calls in flight, finished and failed, and busy time.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.active = 0
+        self.calls = 0
+        self.failures = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "calls": self.calls,
+            "failures": self.failures,
+            "avg_seconds": round(self.seconds / self.calls, 4) if self.calls else 0.0,
+            "max_seconds": round(self.max_seconds, 4),
+        }
+
+
+class ExecutorPools:
+    """
+    Dedicated, sized executors for the blocking work done on behalf of requests, so that it
+    never runs on the event loop and one kind of work cannot starve another:
+
+    - ``io``: threads for file and SQLite I/O (patient record, sessions, LLM cache).
+    - ``cpu``: threads for native code that releases the GIL (embedding model, Chroma
+      queries). Its size bounds how many embeddings run at once.
+    - ``process``: worker processes for pure-Python CPU work that holds the GIL (HTML
+      parsing, image preprocessing). Functions and arguments must be picklable. Workers are
+      started with ``start_method`` (``spawn`` or ``forkserver``) rather than forked from
+      a process that runs threads and an event loop. With ``process_workers=0``, or if the
+      pool breaks, the work runs in the ``cpu`` threads instead.
+
+    Executors are created on first use and shut down from the FastAPI lifespan.
+
+    Example usage:
+        ```python
+        snapshot = await executors.run_io(read_record, path)
+        text = await executors.run_process(extract_text, html)
+        ```
+    """
+
+    def __init__(
+        self,
+        io_workers: int,
+        cpu_workers: int,
+        process_workers: int,
+        start_method: str = "spawn",
+    ) -> None:
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.process_workers = process_workers
+        self.start_method = start_method
+        self._executors: dict[str, Executor] = {}
+        self._stats = {
+            "io": PoolStats(io_workers),
+            "cpu": PoolStats(cpu_workers),
+            "process": PoolStats(process_workers),
+        }
+
+    async def run_io(self, func: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs) -> T:
+        """
+        Run a blocking I/O call in the I/O thread pool.
+        """
+        context = contextvars.copy_context()
+        return await self._run("io", partial(context.run, func, *args, **kwargs))
+
+    async def run_cpu(self, func: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs) -> T:
+        """
+        Run a CPU-bound call that releases the GIL in the CPU thread pool.
+        """
+        context = contextvars.copy_context()
+        return await self._run("cpu", partial(context.run, func, *args, **kwargs))
+
+    async def run_process(
+        self, func: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs
+    ) -> T:
+        """
+        Run a pure-Python CPU-bound call in a worker process.
+        """
+        if not self.process_workers:
+            return await self.run_cpu(func, *args, **kwargs)
+
+        try:
+            return await self._run("process", partial(func, *args, **kwargs))
+        except BrokenProcessPool:
+            logger.warning("Worker process pool broke, restarting it; running in a thread.")
+            self._executors.pop("process", None)
+            return await self.run_cpu(func, *args, **kwargs)
+
+    async def _run(self, name: str, call: Callable[[], T]) -> T:
+        stats = self._stats[name]
+        stats.active += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(name), call)
+        except BaseException:
+            stats.failures += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.active -= 1
+            stats.calls += 1
+            stats.seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+
+    def _get_executor(self, name: str) -> Executor:
+        executor = self._executors.get(name)
+        if executor is None:
+            if name == "process":
+                executor = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                )
+            else:
+                executor = ThreadPoolExecutor(
+                    max_workers=self._stats[name].workers, thread_name_prefix=name
+                )
+            self._executors[name] = executor
+        return executor
+
+    def close(self) -> None:
+        """
+        Wait for running calls and shut the executors down. Called from the FastAPI lifespan
+        on shutdown, after the components that use them are closed.
+        """
+        while self._executors:
+            _, executor = self._executors.popitem()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+        Return the size, calls in flight, finished calls and busy time of each executor.
+        """
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+
+executors = ExecutorPools(
+    io_workers=settings.io_thread_workers,
+    cpu_workers=settings.cpu_thread_workers,
+    process_workers=settings.process_workers,
+    start_method=settings.process_start_method,
+)
@@ -0,0 +1,71 @@
+import importlib.util
+
+import httpx
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+__all__ = [
+    "close_http_client",
+    "get_http_client",
+    "open_http_client",
+]
+
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    """
+    Build the application-wide HTTP client from the current settings.
+
+    HTTP/2 is only negotiated when the optional ``h2`` package is installed,
+    otherwise the client silently falls back to HTTP/1.1 with keep-alive.
+    """
+    http2 = settings.http2_enabled and importlib.util.find_spec("h2") is not None
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            settings.http_read_timeout,
+            connect=settings.http_connect_timeout,
+        ),
+    )
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    """
+    Create the shared HTTP client. Called from the FastAPI lifespan on startup.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info("Shared HTTP client opened.")
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared HTTP client, creating it lazily when the lifespan did not run
+    (scripts, tests without a lifespan context).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """
+    Close the shared HTTP client and its pooled connections. Called on shutdown.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Shared HTTP client closed.")
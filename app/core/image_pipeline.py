@@ -0,0 +1,146 @@
+import base64
+import time
+
+from PIL import UnidentifiedImageError
+
+from app.core.config import settings
+from app.core.executors import executors
+from app.utils.image_processing import ProcessedImage, preprocess_image
+from app.utils.logger import logger
+
+__all__ = [
+    "ImagePipeline",
+    "image_pipeline",
+]
+
+
+class ImagePipeline:
+    """
+    Preprocess uploaded images before they are sent to the model.
+
+    Images are decoded once, oriented, downsized and recompressed by
+    :func:`~app.utils.image_processing.preprocess_image` in the shared worker processes of
+    :data:`~app.core.executors.executors`, so that decoding and encoding large camera
+    photos neither blocks the event loop nor holds the GIL. Smaller images upload faster and cost fewer input tokens, as the model bills
+    large images per tile. Images that cannot be decoded are sent unchanged.
+
+    Example usage:
+        ```python
+        image_base64, mime_type = await image_pipeline.encode(upload.data, upload.mime_type)
+        ```
+    """
+
+    def __init__(
+        self,
+        max_dimension: int,
+        quality: int = 85,
+        image_format: str = "JPEG",
+        enabled: bool = True,
+    ) -> None:
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.image_format = image_format
+        self.enabled = enabled
+        self.processed = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    async def process(self, data: bytes, mime_type: str) -> ProcessedImage | None:
+        """
+        Preprocess an encoded image.
+
+        Args:
+            data (bytes): The uploaded image.
+            mime_type (str): The MIME type of the upload.
+
+        Returns:
+            ProcessedImage | None: The preprocessed image, or None if the upload is not an
+                image, preprocessing is disabled or the image could not be decoded.
+        """
+        if not self.enabled or not mime_type.startswith("image/"):
+            return None
+
+        start = time.perf_counter()
+        try:
+            processed = await executors.run_process(
+                preprocess_image,
+                data,
+                max_dimension=self.max_dimension,
+                quality=self.quality,
+                image_format=self.image_format,
+            )
+        except (UnidentifiedImageError, OSError, ValueError) as e:
+            logger.warning(f"Could not preprocess {mime_type} image, sending it unchanged: {e}")
+            self.failures += 1
+            return None
+
+        self.seconds += time.perf_counter() - start
+        self.processed += 1
+        self.bytes_in += processed.original_size
+        self.bytes_out += processed.size
+        logger.debug(
+            f"Preprocessed image from {processed.original_size} to {processed.size} bytes "
+            f"({processed.width}x{processed.height})."
+        )
+        return processed
+
+    async def encode(self, data: bytes, mime_type: str) -> tuple[str, str]:
+        """
+        Preprocess an uploaded file and base64-encode it for the upstream payload, which is
+        the only time the file is encoded.
+
+        Returns:
+            tuple[str, str]: The base64-encoded file to send and its MIME type.
+        """
+        processed = await self.process(data, mime_type)
+        if processed is not None:
+            data, mime_type = processed.data, processed.mime_type
+        return base64.b64encode(data).decode("ascii"), mime_type
+
+    async def process_base64(self, image_base64: str, mime_type: str) -> tuple[str, str]:
+        """
+        Preprocess a base64-encoded image. Other uploads (e.g. PDF documents) are returned
+        unchanged without being decoded.
+
+        Returns:
+            tuple[str, str]: The base64-encoded image to send and its MIME type, unchanged
+                if the image was not preprocessed.
+
+        Raises:
+            binascii.Error: If the string is not valid base64.
+        """
+        if not self.enabled or not mime_type.startswith("image/"):
+            return image_base64, mime_type
+
+        processed = await self.process(
+            base64.b64decode(image_base64, validate=True), mime_type
+        )
+        if processed is None:
+            return image_base64, mime_type
+        return base64.b64encode(processed.data).decode("ascii"), processed.mime_type
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the number of images processed, the bytes before and after preprocessing and
+        the average processing time.
+        """
+        return {
+            "processed": self.processed,
+            "failures": self.failures,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "compression_ratio": (
+                round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 1.0
+            ),
+            "avg_seconds": round(self.seconds / self.processed, 4) if self.processed else 0.0,
+        }
+
+
+image_pipeline = ImagePipeline(
+    max_dimension=settings.image_max_dimension,
+    quality=settings.image_quality,
+    image_format=settings.image_format,
+    enabled=settings.image_preprocessing_enabled,
+)
@@ -0,0 +1,251 @@
+import abc
+import asyncio
+import contextlib
+import contextvars
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi import HTTPException
+
+from app._enums import JobStatus
+from app._exceptions import CoreError, JobNotFoundError, QueueFullError
+from app.models.jobs import Job
+from app.utils.logger import logger
+
+__all__ = [
+    "InMemoryJobQueueBackend",
+    "JobQueue",
+    "JobQueueBackend",
+    "job_queues",
+]
+
+
+class JobQueueBackend(abc.ABC):
+    """
+    Storage of pending jobs, with their arguments, and of job statuses.
+    """
+
+    @abc.abstractmethod
+    async def put(self, job: Job, arguments: dict[str, Any]) -> None:
+        """
+        Enqueue a job without waiting.
+
+        Raises:
+            QueueFullError: If the queue is full.
+        """
+
+    @abc.abstractmethod
+    async def get(self) -> tuple[Job, dict[str, Any]]:
+        """
+        Wait for the next pending job and return it with its arguments.
+        """
+
+    @abc.abstractmethod
+    async def save(self, job: Job) -> None:
+        """
+        Store the status of a job.
+        """
+
+    @abc.abstractmethod
+    async def load(self, job_id: str) -> Job | None:
+        """
+        Return the status of a job, None if it is unknown or has expired.
+        """
+
+    @abc.abstractmethod
+    def size(self) -> int:
+        """
+        Return the number of pending jobs.
+        """
+
+
+class InMemoryJobQueueBackend(JobQueueBackend):
+    """
+    Bounded in-process queue. Jobs are lost on restart, and completed jobs are forgotten
+    ``ttl`` seconds after they finished.
+    """
+
+    def __init__(self, max_size: int, ttl: float = 3600.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._queue: asyncio.Queue[tuple[Job, dict[str, Any]]] = asyncio.Queue(max_size)
+        self._jobs: dict[str, Job] = {}
+        # Finished jobs by finish time, oldest first.
+        self._finished: OrderedDict[str, float] = OrderedDict()
+
+    async def put(self, job: Job, arguments: dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait((job, arguments))
+        except asyncio.QueueFull as e:
+            raise QueueFullError("memory", self.max_size) from e
+        self._jobs[job.id] = job
+
+    async def get(self) -> tuple[Job, dict[str, Any]]:
+        return await self._queue.get()
+
+    async def save(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        if job.finished_at is not None:
+            self._finished[job.id] = job.finished_at
+            self._expire()
+
+    async def load(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def size(self) -> int:
+        return self._queue.qsize()
+
+    def _expire(self) -> None:
+        # Ordered by finish rather than submission time, so that a long job finishing
+        # late does not hold back the expiry of the jobs submitted after it.
+        cutoff = time.time() - self.ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > cutoff:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+
+class JobQueue:
+    """
+    Run long requests in the background on a bounded pool of workers.
+
+    :meth:`submit` enqueues a call of ``handler`` and returns immediately with a job id;
+    clients poll :meth:`get` for its status and result. When the queue is full, submissions
+    fail fast with :class:`QueueFullError` instead of piling up, so that bursts of uploads
+    are pushed back to the clients rather than delaying interactive requests.
+
+    Example usage:
+        ```python
+        job = await scan_jobs.submit(image=data, mime_type="image/png")
+        job = await scan_jobs.get(job.id)
+        ```
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[..., Awaitable[Any]],
+        backend: JobQueueBackend,
+        workers: int = 2,
+    ) -> None:
+        self.name = name
+        self.handler = handler
+        self.backend = backend
+        self.workers = workers
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.running = 0
+        self._tasks: list[asyncio.Task] = []
+
+    async def submit(self, **arguments: object) -> Job:
+        """
+        Enqueue a call of the handler with the given keyword arguments.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            QueueFullError: If the queue is full.
+        """
+        self.start()
+        job = Job(id=uuid.uuid4().hex, created_at=time.time())
+        try:
+            await self.backend.put(job, arguments)
+        except QueueFullError:
+            self.rejected += 1
+            raise
+        self.submitted += 1
+        return job
+
+    async def get(self, job_id: str) -> Job:
+        """
+        Return the status of a job, with its result once it has succeeded.
+
+        Raises:
+            JobNotFoundError: If the job is unknown or has expired.
+        """
+        job = await self.backend.load(job_id)
+        if job is None:
+            raise JobNotFoundError(job_id)
+        return job
+
+    def start(self) -> None:
+        """
+        Start the workers if they are not running.
+        """
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            task for task in self._tasks if not task.done() and task.get_loop() is loop
+        ]
+        for _ in range(self.workers - len(self._tasks)):
+            # A fresh context, so that workers started from a request do not inherit its
+            # deadline.
+            self._tasks.append(
+                asyncio.create_task(self._work(), context=contextvars.Context())
+            )
+
+    async def close(self) -> None:
+        """
+        Stop the workers. Jobs still queued or running are abandoned.
+        """
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _work(self) -> None:
+        while True:
+            job, arguments = await self.backend.get()
+            job = job.model_copy(update={"status": JobStatus.RUNNING, "started_at": time.time()})
+            await self.backend.save(job)
+            self.running += 1
+            try:
+                result = await self.handler(**arguments)
+            except Exception as e:
+                self.failed += 1
+                update = {"status": JobStatus.FAILED, "error": _describe(e)}
+                if not isinstance(e, HTTPException | CoreError):
+                    logger.exception(f"Job {job.id} of the {self.name} queue failed.")
+            else:
+                self.succeeded += 1
+                update = {"status": JobStatus.SUCCEEDED, "result": result}
+            finally:
+                self.running -= 1
+            await self.backend.save(
+                job.model_copy(update={**update, "finished_at": time.time()})
+            )
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the number of jobs queued, running, completed and rejected.
+        """
+        return {
+            "queued": self.backend.size(),
+            "running": self.running,
+            "workers": len(self._tasks),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+def _describe(error: Exception) -> dict[str, Any]:
+    if isinstance(error, HTTPException):
+        return {"status_code": error.status_code, "detail": error.detail}
+    if isinstance(error, CoreError):
+        return error.to_dict()
+    return {"error": error.__class__.__name__, "detail": str(error)}
+
+
+# Queues reported by /metrics, registered by the modules defining them.
+job_queues: dict[str, JobQueue] = {}
@@ -0,0 +1,225 @@
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.core.config import settings
+from app.core.executors import executors
+from app.models.gemma import GemmaPayload
+from app.utils.logger import logger
+
+__all__ = [
+    "LLMCache",
+    "llm_cache",
+]
+
+
+class LLMCache:
+    """
+    Content-addressed cache for successful LLM responses.
+
+    Entries are keyed on a stable hash of the model, the method and the canonical JSON
+    form of the payload. A bounded in-memory LRU tier answers hot keys, and an optional
+    SQLite tier keeps entries across restarts. Each model can have its own TTL; a TTL of
+    zero disables caching for that model.
+
+    Example usage:
+        ```python
+        key = llm_cache.make_key("gemma-3-27b-it", "generateContent", payload)
+        response = await llm_cache.get(key, "gemma-3-27b-it")
+        if response is None:
+            response = ...
+            await llm_cache.set(key, "gemma-3-27b-it", response)
+        ```
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: float = 300.0,
+        model_ttls: dict[str, float] | None = None,
+        sqlite_path: str | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.model_ttls = model_ttls or {}
+        self.sqlite_path = sqlite_path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, method: str, payload: GemmaPayload) -> str:
+        """
+        Compute the content address of a request.
+
+        Args:
+            model (str): The model name.
+            method (str): The API method, e.g. ``generateContent``.
+            payload (GemmaPayload): The request payload.
+
+        Returns:
+            str: The hex SHA-256 digest of the canonicalised request.
+        """
+        canonical = json.dumps(
+            {"model": model, "method": method, "payload": payload.dict(by_alias=True)},
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, model: str) -> float:
+        """
+        Return the TTL in seconds for a model, falling back to the default TTL.
+        """
+        return self.model_ttls.get(model, self.default_ttl)
+
+    async def get(self, key: str, model: str) -> dict[str, Any] | None:
+        """
+        Look up a cached response, first in memory then on disk.
+
+        Args:
+            key (str): The content address of the request.
+            model (str): The model name, used to skip disabled models.
+
+        Returns:
+            dict[str, Any] | None: The cached response, or None on a miss.
+        """
+        if self.ttl_for(model) <= 0:
+            return None
+
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(value)
+            del self._entries[key]
+
+        if self.sqlite_path:
+            row = await executors.run_io(self._disk_get, key, now)
+            if row is not None:
+                expires_at, value = row
+                self._remember(key, expires_at, value)
+                self.disk_hits += 1
+                return copy.deepcopy(value)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, model: str, value: dict[str, Any]) -> None:
+        """
+        Store a response in memory and, when configured, on disk.
+
+        Args:
+            key (str): The content address of the request.
+            model (str): The model name, used to pick the TTL.
+            value (dict[str, Any]): The response to cache.
+        """
+        ttl = self.ttl_for(model)
+        if ttl <= 0:
+            return
+
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, value)
+
+        if self.sqlite_path:
+            await executors.run_io(self._disk_set, key, model, expires_at, value)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return hit/miss counters and the current memory footprint in entries.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        """
+        Drop every entry from both tiers and reset the counters.
+        """
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = 0
+        if self.sqlite_path:
+            with self._db_lock:
+                self._connection().execute("DELETE FROM llm_cache")
+                self._connection().commit()
+
+    def close(self) -> None:
+        """
+        Close the SQLite connection, if any.
+        """
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, expires_at: float, value: dict[str, Any]) -> None:
+        self._entries[key] = (expires_at, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, expires_at REAL, value TEXT)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _disk_get(self, key: str, now: float) -> tuple[float, dict[str, Any]] | None:
+        with self._db_lock:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT expires_at, value FROM llm_cache WHERE key = ?", (key,)
+                )
+                .fetchone()
+            )
+            if row is None:
+                return None
+            if row[0] <= now:
+                self._connection().execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._connection().commit()
+                return None
+        return row[0], json.loads(row[1])
+
+    def _disk_set(
+        self, key: str, model: str, expires_at: float, value: dict[str, Any]
+    ) -> None:
+        try:
+            with self._db_lock:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                    (key, model, expires_at, json.dumps(value)),
+                )
+                self._connection().commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist LLM cache entry: {e}")
+
+
+llm_cache = LLMCache(
+    max_entries=settings.llm_cache_max_entries,
+    default_ttl=settings.llm_cache_default_ttl,
+    model_ttls=settings.llm_cache_model_ttls,
+    sqlite_path=settings.llm_cache_sqlite_path,
+)
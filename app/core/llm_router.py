@@ -1,5 +1,7 @@
 import logging
 from app.core.api_request import api_request
+from app.core.config import settings
+from app.core.embedding_router import embedding_router
 from app.models.gemma import GemmaPayload, Content, Part
 
 async def classify_request(user_input: str) -> str:
@@ -8,7 +10,15 @@ async def classify_request(user_input: str) -> str:
     - medgemma
     - clinical_trials
     - web_search
+
+    In ``local`` router mode the request is first classified with the embedding router;
+    only inputs it considers ambiguous pay for the LLM classification round trip.
     """
+    if settings.router_mode == "local":
+        route = await embedding_router.aclassify(user_input)
+        if route is not None:
+            return route
+
     prompt = f"""
     Please classify the following user request into one of these categories: "medgemma", "clinical_trials", or "web_search". Depending on the user request, you may classify it as follows:
     - "medgemma": for requests about general information about medicine.
@@ -0,0 +1,100 @@
+import asyncio
+import contextlib
+import time
+from collections import deque
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+__all__ = [
+    "LoopLagMonitor",
+    "loop_monitor",
+]
+
+
+class LoopLagMonitor:
+    """
+    Measure how late the event loop wakes up, to detect blocking code running on it.
+
+    A background task sleeps for ``interval`` seconds; the time it wakes up beyond that is
+    the loop lag, i.e. how long callbacks had to wait for the loop. Lags above ``threshold``
+    are counted as stalls and logged. Percentiles are computed over the last ``window``
+    samples.
+
+    Example usage:
+        ```python
+        loop_monitor.start()
+        ...
+        await loop_monitor.close()
+        ```
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.1, window: int = 600) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = 0
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._lags: deque[float] = deque(maxlen=window)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """
+        Start measuring. Called from the FastAPI lifespan on startup; a non-positive
+        ``interval`` disables the monitor.
+        """
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(time.perf_counter() - start - self.interval)
+
+    def record(self, lag: float) -> None:
+        """
+        Record one lag measurement, in seconds.
+        """
+        lag = max(lag, 0.0)
+        self.samples += 1
+        self.max_lag = max(self.max_lag, lag)
+        self._lags.append(lag)
+        if lag >= self.threshold:
+            self.stalls += 1
+            logger.warning(f"Event loop stalled for {lag * 1000:.0f}ms.")
+
+    async def close(self) -> None:
+        """
+        Stop measuring. Called from the FastAPI lifespan on shutdown.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the number of samples and stalls, and the recent and maximum lag in
+        milliseconds.
+        """
+        lags = sorted(self._lags)
+
+        def percentile(q: float) -> float:
+            if not lags:
+                return 0.0
+            return round(lags[min(len(lags) - 1, int(q * len(lags)))] * 1000, 2)
+
+        return {
+            "samples": self.samples,
+            "stalls": self.stalls,
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+loop_monitor = LoopLagMonitor(
+    interval=settings.loop_lag_interval, threshold=settings.loop_lag_threshold
+)
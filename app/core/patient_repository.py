@@ -0,0 +1,529 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from app._exceptions import PatientNotFoundError, VersionConflictError
+from app.core.config import settings
+from app.core.executors import executors
+from app.core.patient_store import PatientRecordSnapshot, patient_store
+from app.models.scan import PatientRecord
+from app.utils.json_utils import MergeReport, merge_model_data
+from app.utils.logger import logger
+
+__all__ = [
+    "INDEXED_COLLECTIONS",
+    "compact_patient_records",
+    "PatientRecordHandle",
+    "PatientRepository",
+    "patient_repository",
+]
+
+# List fields of PatientRecord whose items are also stored one per row, so they can be
+# queried (by date) without loading the whole record.
+INDEXED_COLLECTIONS = ("allergies", "treatment", "lab_results", "imaging")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS patient_versions (
+    patient_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (patient_id, version)
+);
+CREATE TABLE IF NOT EXISTS patient_items (
+    patient_id TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    date TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (patient_id, collection, position)
+);
+CREATE INDEX IF NOT EXISTS patient_items_by_date
+    ON patient_items (patient_id, collection, date);
+CREATE TABLE IF NOT EXISTS patient_patches (
+    patient_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    patch TEXT NOT NULL,
+    PRIMARY KEY (patient_id, version)
+);
+"""
+
+
+def _dumps(data: dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _snapshot(data: str, version: int) -> PatientRecordSnapshot:
+    record = PatientRecord.model_validate_json(data)
+    return PatientRecordSnapshot(
+        record=record,
+        data=record.model_dump(),
+        json=data.encode("utf-8"),
+        version=version,
+    )
+
+
+class PatientRepository:
+    """
+    Storage of patient records keyed by patient id, backed by SQLite.
+
+    Each record is stored as a JSON document together with a version number, incremented on
+    every write. Writes can be made conditional on the version the caller read (optimistic
+    concurrency). Items of the list fields in ``INDEXED_COLLECTIONS`` are also stored one per
+    row, indexed by date, so that a sub-collection can be read without loading the whole
+    record.
+
+    Full writes (:meth:`save`) store a snapshot of the record in the history table, while
+    patches (:meth:`apply_patch`, e.g. scan results) are appended to a journal with their
+    source and only add the new collection items, so their cost grows with the patch rather
+    than the record. :meth:`compact` snapshots records with many patches since their last
+    snapshot; past versions are rebuilt from the nearest snapshot and the journal.
+
+    Example usage:
+        ```python
+        snapshot = await patient_repository.get("p-42")
+        await patient_repository.save("p-42", record, expected_version=snapshot.version)
+        ```
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._db_connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use, from a thread holding the lock, so that importing the
+        # module does not create the database.
+        if self._db_connection is None:
+            self._db_connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._db_connection.execute("PRAGMA journal_mode=WAL")
+            self._db_connection.executescript(SCHEMA)
+            self._db_connection.commit()
+        return self._db_connection
+
+    def record(self, patient_id: str) -> "PatientRecordHandle":
+        """
+        Return a handle on one patient, with the ``get``/``update``/``apply_patch`` interface
+        of the single-patient store.
+        """
+        return PatientRecordHandle(self, patient_id)
+
+    async def get(self, patient_id: str) -> PatientRecordSnapshot:
+        """
+        Return the current version of a record.
+
+        Raises:
+            PatientNotFoundError: If the patient does not exist.
+        """
+        data, version = await executors.run_io(self._fetch, patient_id)
+        return _snapshot(data, version)
+
+    async def get_json(self, patient_id: str) -> tuple[bytes, int]:
+        """
+        Return a record as stored (JSON bytes) with its version, without parsing it.
+
+        Raises:
+            PatientNotFoundError: If the patient does not exist.
+        """
+        data, version = await executors.run_io(self._fetch, patient_id)
+        return data.encode("utf-8"), version
+
+    async def get_version(self, patient_id: str, version: int) -> PatientRecordSnapshot:
+        """
+        Return a past version of a record.
+
+        Raises:
+            PatientNotFoundError: If the patient or the version does not exist.
+        """
+        data = await executors.run_io(self._rebuild, patient_id, version)
+        if data is None:
+            raise PatientNotFoundError(patient_id)
+        return _snapshot(_dumps(data), version)
+
+    async def history(self, patient_id: str) -> list[dict[str, Any]]:
+        """
+        Return the versions of a record, oldest first, with the source of patched versions.
+        """
+        rows = await executors.run_io(
+            self._query_all,
+            "SELECT version, MIN(updated_at), MAX(source) FROM ("
+            "SELECT version, updated_at, NULL AS source FROM patient_versions "
+            "WHERE patient_id = ? UNION ALL "
+            "SELECT version, created_at, source FROM patient_patches WHERE patient_id = ?"
+            ") GROUP BY version ORDER BY version",
+            (patient_id, patient_id),
+        )
+        return [
+            {"version": version, "updated_at": updated_at, "source": source}
+            for version, updated_at, source in rows
+        ]
+
+    async def journal(self, patient_id: str) -> list[dict[str, Any]]:
+        """
+        Return the patches applied to a record, oldest first.
+        """
+        rows = await executors.run_io(
+            self._query_all,
+            "SELECT version, created_at, source, patch FROM patient_patches "
+            "WHERE patient_id = ? ORDER BY version",
+            (patient_id,),
+        )
+        return [
+            {
+                "version": version,
+                "timestamp": created_at,
+                "source": source,
+                "patch": json.loads(patch),
+            }
+            for version, created_at, source, patch in rows
+        ]
+
+    async def collection(
+        self,
+        patient_id: str,
+        name: str,
+        since: str | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Return the items of an indexed sub-collection, most recent first.
+
+        Args:
+            patient_id (str): The patient id.
+            name (str): One of ``INDEXED_COLLECTIONS``.
+            since (str | None): Only return items dated on or after this ISO date.
+            limit (int | None): The maximum number of items to return.
+
+        Returns:
+            list[dict[str, Any]]: The items of the collection.
+        """
+        query = "SELECT data FROM patient_items WHERE patient_id = ? AND collection = ?"
+        params: list[Any] = [patient_id, name]
+        if since is not None:
+            query += " AND date >= ?"
+            params.append(since)
+        query += " ORDER BY date DESC, position DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        rows = await executors.run_io(self._query_all, query, tuple(params))
+        return [json.loads(row[0]) for row in rows]
+
+    async def save(
+        self,
+        patient_id: str,
+        record: PatientRecord,
+        expected_version: int | None = None,
+    ) -> PatientRecordSnapshot:
+        """
+        Write a new version of a record.
+
+        Args:
+            patient_id (str): The patient id.
+            record (PatientRecord): The new record.
+            expected_version (int | None): The version the change was based on; 0 to only
+                create the record. None writes unconditionally.
+
+        Returns:
+            PatientRecordSnapshot: The record as written, with its new version.
+
+        Raises:
+            VersionConflictError: If the record is not at ``expected_version``.
+        """
+        data = record.model_dump()
+        document = _dumps(data)
+        version = await executors.run_io(
+            self._write, patient_id, record, document, expected_version
+        )
+        return PatientRecordSnapshot(
+            record=record, data=data, json=document.encode("utf-8"), version=version
+        )
+
+    async def update(
+        self,
+        patient_id: str,
+        change: Callable[[dict[str, Any]], dict[str, Any]],
+        max_attempts: int = 5,
+    ) -> PatientRecordSnapshot:
+        """
+        Apply a change to the latest version of a record, retrying on concurrent writes.
+
+        Raises:
+            PatientNotFoundError: If the patient does not exist.
+            VersionConflictError: If the record kept changing after ``max_attempts``.
+        """
+        for attempt in range(max_attempts):
+            current = await self.get(patient_id)
+            record = PatientRecord.model_validate(change(current.record.model_dump()))
+            try:
+                return await self.save(patient_id, record, expected_version=current.version)
+            except VersionConflictError:
+                if attempt == max_attempts - 1:
+                    raise
+                logger.info(f"Retrying the update of patient {patient_id} after a conflict.")
+
+    async def apply_patch(
+        self, patient_id: str, patch: dict[str, Any], source: str
+    ) -> tuple[PatientRecordSnapshot, MergeReport]:
+        """
+        Merge a patch into a record and append it to the record's journal. A patch that
+        changes nothing is not journaled and does not create a version.
+
+        Args:
+            patient_id (str): The patient id.
+            patch (dict[str, Any]): The new or updated fields.
+            source (str): Where the patch comes from, e.g. ``scan:<sha256 of the image>``.
+
+        Returns:
+            tuple[PatientRecordSnapshot, MergeReport]: The record after the patch and what
+                the merge inserted, updated and ignored.
+
+        Raises:
+            PatientNotFoundError: If the patient does not exist.
+        """
+        record, document, version, report = await executors.run_io(
+            self._patch, patient_id, patch, source
+        )
+        snapshot = PatientRecordSnapshot(
+            record=record,
+            data=record.model_dump(),
+            json=document.encode("utf-8"),
+            version=version,
+        )
+        return snapshot, report
+
+    async def compact(self, min_patches: int = 1) -> int:
+        """
+        Snapshot the records with at least ``min_patches`` patches since their last snapshot,
+        so that rebuilding a past version replays a bounded number of patches.
+
+        Returns:
+            int: The number of records snapshotted.
+        """
+        count = await executors.run_io(self._snapshot_records, min_patches)
+        if count:
+            logger.info(f"Snapshotted {count} patient records.")
+        return count
+
+    async def delete(self, patient_id: str) -> None:
+        """
+        Delete a record and its history.
+        """
+        await executors.run_io(self._delete, patient_id)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db_connection is not None:
+                self._db_connection.close()
+                self._db_connection = None
+
+    def _fetch(self, patient_id: str) -> tuple[str, int]:
+        row = self._query_one(
+            "SELECT data, version FROM patients WHERE id = ?", (patient_id,)
+        )
+        if row is None:
+            raise PatientNotFoundError(patient_id)
+        return row
+
+    def _query_one(self, query: str, params: tuple) -> tuple | None:
+        with self._lock:
+            return self._db.execute(query, params).fetchone()
+
+    def _query_all(self, query: str, params: tuple) -> list[tuple]:
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+
+    def _write(
+        self,
+        patient_id: str,
+        record: PatientRecord,
+        document: str,
+        expected_version: int | None,
+    ) -> int:
+        now = time.time()
+        with self._lock, self._db:
+            # Take the write lock before reading the version, so that the check and the
+            # write are atomic across processes sharing the database.
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute(
+                "SELECT version, data FROM patients WHERE id = ?", (patient_id,)
+            ).fetchone()
+            current = row[0] if row else 0
+            if expected_version is not None and expected_version != current:
+                raise VersionConflictError(patient_id, expected_version, current)
+
+            version = current + 1
+            self._db.execute(
+                "INSERT INTO patients (id, version, updated_at, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET "
+                "version = excluded.version, updated_at = excluded.updated_at, "
+                "data = excluded.data",
+                (patient_id, version, now, document),
+            )
+            self._db.execute(
+                "INSERT INTO patient_versions VALUES (?, ?, ?, ?)",
+                (patient_id, version, now, document),
+            )
+            self._index_items(
+                patient_id, json.loads(row[1]) if row else {}, record.model_dump()
+            )
+        return version
+
+    def _patch(
+        self, patient_id: str, patch: dict[str, Any], source: str
+    ) -> tuple[PatientRecord, str, int, MergeReport]:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute(
+                "SELECT data, version FROM patients WHERE id = ?", (patient_id,)
+            ).fetchone()
+            if row is None:
+                raise PatientNotFoundError(patient_id)
+
+            current = json.loads(row[0])
+            merged, report = merge_model_data(current, json.loads(_dumps(patch)), PatientRecord)
+            if not report.changed:
+                return PatientRecord.model_validate(current), row[0], row[1], report
+
+            record = PatientRecord.model_validate(merged)
+            data = record.model_dump()
+            document = _dumps(data)
+            version = row[1] + 1
+
+            self._db.execute(
+                "UPDATE patients SET version = ?, updated_at = ?, data = ? WHERE id = ?",
+                (version, now, document, patient_id),
+            )
+            self._db.execute(
+                "INSERT INTO patient_patches VALUES (?, ?, ?, ?, ?)",
+                (patient_id, version, now, source, _dumps(patch)),
+            )
+            self._index_items(patient_id, current, data)
+        return record, document, version, report
+
+    def _index_items(
+        self, patient_id: str, old: dict[str, Any], new: dict[str, Any]
+    ) -> None:
+        """
+        Update the rows of the indexed collections. Merges only update items in place or
+        append new ones, so only the rows of changed and new items are written; a
+        collection that shrank is rewritten.
+        """
+        for name in INDEXED_COLLECTIONS:
+            old_items, new_items = old.get(name) or [], new.get(name) or []
+            if new_items == old_items:
+                continue
+
+            if len(new_items) < len(old_items):
+                self._db.execute(
+                    "DELETE FROM patient_items WHERE patient_id = ? AND collection = ?",
+                    (patient_id, name),
+                )
+                old_items = []
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO patient_items VALUES (?, ?, ?, ?, ?)",
+                [
+                    (patient_id, name, position, item.get("date"), _dumps(item))
+                    for position, item in enumerate(new_items)
+                    if position >= len(old_items) or item != old_items[position]
+                ],
+            )
+
+    def _rebuild(self, patient_id: str, version: int) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT version, data FROM patient_versions "
+                "WHERE patient_id = ? AND version <= ? ORDER BY version DESC LIMIT 1",
+                (patient_id, version),
+            ).fetchone()
+            if row is None:
+                return None
+            patches = self._db.execute(
+                "SELECT version, patch FROM patient_patches "
+                "WHERE patient_id = ? AND version > ? AND version <= ? ORDER BY version",
+                (patient_id, row[0], version),
+            ).fetchall()
+
+        data = json.loads(row[1])
+        for _, patch in patches:
+            data, _ = merge_model_data(data, json.loads(patch), PatientRecord)
+        reached = patches[-1][0] if patches else row[0]
+        return PatientRecord.model_validate(data).model_dump() if reached == version else None
+
+    def _snapshot_records(self, min_patches: int) -> int:
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "SELECT id, version, updated_at, data FROM patients AS p WHERE version - ("
+                "SELECT COALESCE(MAX(version), 0) FROM patient_versions "
+                "WHERE patient_id = p.id) >= ?",
+                (max(1, min_patches),),
+            ).fetchall()
+            self._db.executemany("INSERT INTO patient_versions VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def _delete(self, patient_id: str) -> None:
+        with self._lock, self._db:
+            for table, column in (
+                ("patients", "id"),
+                ("patient_versions", "patient_id"),
+                ("patient_patches", "patient_id"),
+                ("patient_items", "patient_id"),
+            ):
+                self._db.execute(f"DELETE FROM {table} WHERE {column} = ?", (patient_id,))
+
+
+class PatientRecordHandle:
+    """
+    One patient of a :class:`PatientRepository`, usable wherever the single-patient
+    :class:`~app.core.patient_store.PatientRecordStore` is.
+    """
+
+    def __init__(self, repository: PatientRepository, patient_id: str) -> None:
+        self.repository = repository
+        self.patient_id = patient_id
+
+    async def get(self) -> PatientRecordSnapshot:
+        return await self.repository.get(self.patient_id)
+
+    async def update(
+        self, change: Callable[[dict[str, Any]], dict[str, Any]]
+    ) -> PatientRecordSnapshot:
+        return await self.repository.update(self.patient_id, change)
+
+    async def apply_patch(
+        self, patch: dict[str, Any], source: str
+    ) -> tuple[PatientRecordSnapshot, MergeReport]:
+        return await self.repository.apply_patch(self.patient_id, patch, source)
+
+
+patient_repository = PatientRepository(settings.patient_db_path)
+
+
+async def compact_patient_records(interval: float, min_patches: int) -> None:
+    """
+    Periodically fold the patch journals: the single-patient journal into the record file,
+    and repository records with at least ``min_patches`` patches into a new snapshot.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await patient_store.compact()
+            await patient_repository.compact(min_patches)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            logger.warning(f"Patient record compaction failed: {e}")
@@ -0,0 +1,288 @@
+import asyncio
+import copy
+import json
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import settings
+from app.core.executors import executors
+from app.models.scan import PatientRecord
+from app.utils.json_utils import MergeReport, merge_model_data
+from app.utils.logger import logger
+
+__all__ = [
+    "PatientRecordSnapshot",
+    "PatientRecordStore",
+    "patient_store",
+]
+
+# Key of the record file holding the position of the last journal entry folded into it.
+# It is stripped before validation and never exposed.
+JOURNAL_KEY = "_journal"
+
+FileStat = tuple[int, int] | None
+
+
+@dataclass(frozen=True)
+class PatientRecordSnapshot:
+    """
+    An immutable view of the patient record at a given version.
+
+    ``data`` is shared between readers and must not be mutated; ``json`` is the record
+    pre-serialized for the ``/records`` endpoint.
+    """
+
+    record: PatientRecord
+    data: dict[str, Any]
+    json: bytes
+    version: int
+
+
+class PatientRecordStore:
+    """
+    In-memory cache of the patient record file, with an append-only journal of patches.
+
+    The parsed and validated record is served from memory and only reloaded when the record
+    file or its journal changes on disk. Patches (e.g. the result of a scan) are appended to
+    the journal, with their source and a timestamp, and applied to the in-memory view, so a
+    write costs the size of the patch rather than the size of the record. The journal is
+    never rewritten and doubles as the audit trail of the record.
+
+    :meth:`compact` periodically folds the journal into the record file, which is written to
+    a temporary file and atomically renamed over the original together with the journal
+    position it covers; loading then only replays the journal past that position. Writers
+    are serialized with a lock.
+
+    Example usage:
+        ```python
+        snapshot = await patient_store.get()
+        snapshot, report = await patient_store.apply_patch({"allergies": [...]}, "scan:ab12")
+        ```
+    """
+
+    def __init__(self, path: str, journal_path: str | None = None) -> None:
+        self.path = path
+        self.journal_path = journal_path or f"{path}.journal"
+        self.loads = 0
+        self.writes = 0
+        self.patches = 0
+        self.compactions = 0
+        self._snapshot: PatientRecordSnapshot | None = None
+        self._stat: tuple[FileStat, FileStat] | None = None
+        self._version = 0
+        self._seq = 0
+        self._pending = 0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> PatientRecordSnapshot:
+        """
+        Return the current record, reloading it if the file changed on disk.
+
+        Raises:
+            FileNotFoundError: If the record file does not exist.
+            json.JSONDecodeError: If the file is not valid JSON.
+            pydantic.ValidationError: If the file does not hold a valid record.
+        """
+        if self._snapshot is None or self._file_stat() != self._stat:
+            async with self._lock:
+                await self._refresh()
+        return self._snapshot
+
+    async def apply_patch(
+        self, patch: dict[str, Any], source: str
+    ) -> tuple[PatientRecordSnapshot, MergeReport]:
+        """
+        Merge a patch into the record and append it to the journal. A patch that changes
+        nothing (e.g. a document scanned twice) is not journaled.
+
+        Args:
+            patch (dict[str, Any]): The new or updated fields.
+            source (str): Where the patch comes from, e.g. ``scan:<sha256 of the image>``.
+
+        Returns:
+            tuple[PatientRecordSnapshot, MergeReport]: The record after the patch and what
+                the merge inserted, updated and ignored.
+        """
+        async with self._lock:
+            await self._refresh()
+
+            data, report = merge_model_data(
+                self._snapshot.data, copy.deepcopy(patch), PatientRecord
+            )
+            if not report.changed:
+                return self._snapshot, report
+
+            record = PatientRecord.model_validate(data)
+            entry = {
+                "seq": self._seq + 1,
+                "timestamp": time.time(),
+                "source": source,
+                "patch": patch,
+                "report": report.model_dump(),
+            }
+            stat = await executors.run_io(self._append, entry)
+            self._seq += 1
+            self._pending += 1
+            self.patches += 1
+            self._remember(record, stat)
+            return self._snapshot, report
+
+    async def update(
+        self, change: Callable[[dict[str, Any]], dict[str, Any]]
+    ) -> PatientRecordSnapshot:
+        """
+        Replace the record with a changed copy, rewriting the record file.
+
+        Args:
+            change (Callable[[dict[str, Any]], dict[str, Any]]): Receives a copy of the current
+                record data and returns the new data.
+
+        Returns:
+            PatientRecordSnapshot: The record after the change.
+        """
+        async with self._lock:
+            await self._refresh()
+
+            record = PatientRecord.model_validate(change(copy.deepcopy(self._snapshot.data)))
+            stat = await executors.run_io(self._write, record.model_dump())
+            self._pending = 0
+            self._remember(record, stat)
+            self.writes += 1
+            logger.info(f"Patient record updated to version {self._version}.")
+            return self._snapshot
+
+    async def compact(self) -> bool:
+        """
+        Fold the journal entries applied since the last compaction into the record file.
+
+        Returns:
+            bool: Whether there was anything to compact.
+        """
+        async with self._lock:
+            if self._snapshot is None:
+                return False
+
+            await self._refresh()
+            if not self._pending:
+                return False
+
+            self._stat = await executors.run_io(self._write, self._snapshot.data)
+            logger.info(f"Compacted {self._pending} journal entries into the patient record.")
+            self._pending = 0
+            self.compactions += 1
+            return True
+
+    async def journal(self) -> list[dict[str, Any]]:
+        """
+        Return every journal entry (patch, source and timestamp), oldest first.
+        """
+        return await executors.run_io(self._read_journal, 0)
+
+    async def _refresh(self) -> None:
+        stat = self._file_stat()
+        if self._snapshot is not None and stat == self._stat:
+            return
+
+        self.loads += 1
+        data, entries = await executors.run_io(self._read)
+        position = data.pop(JOURNAL_KEY, {})
+        self._seq = position.get("seq", 0)
+        self._pending = 0
+        for entry in entries:
+            if entry["seq"] > self._seq:
+                data, _ = merge_model_data(data, entry["patch"], PatientRecord)
+                self._seq = entry["seq"]
+                self._pending += 1
+
+        self._remember(PatientRecord.model_validate(data), self._file_stat())
+
+    def _file_stat(self) -> tuple[FileStat, FileStat]:
+        return self._stat_of(self.path), self._stat_of(self.journal_path)
+
+    @staticmethod
+    def _stat_of(path: str) -> FileStat:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+        with open(self.path, "rb") as f:
+            data = json.loads(f.read())
+        offset = data.get(JOURNAL_KEY, {}).get("offset", 0)
+        return data, self._read_journal(offset)
+
+    def _read_journal(self, offset: int) -> list[dict[str, Any]]:
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(offset)
+                content = f.read()
+        except FileNotFoundError:
+            return []
+
+        complete, _, partial = content.rpartition(b"\n")
+        if partial:
+            # An append interrupted by a crash: drop it so the next entry starts on its own line.
+            logger.warning("Dropping a truncated entry at the end of the patient journal.")
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(offset + len(content) - len(partial))
+
+        return [json.loads(line) for line in complete.splitlines() if line.strip()]
+
+    def _append(self, entry: dict[str, Any]) -> tuple[FileStat, FileStat]:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with open(self.journal_path, "ab") as f:
+            f.write(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        return self._file_stat()
+
+    def _write(self, data: dict[str, Any]) -> tuple[FileStat, FileStat]:
+        journal_size = self._stat_of(self.journal_path)
+        position = {"seq": self._seq, "offset": journal_size[1] if journal_size else 0}
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({**data, JOURNAL_KEY: position}, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self._file_stat()
+
+    def _remember(self, record: PatientRecord, stat: tuple[FileStat, FileStat]) -> None:
+        data = record.model_dump()
+        self._version += 1
+        self._stat = stat
+        self._snapshot = PatientRecordSnapshot(
+            record=record,
+            data=data,
+            json=json.dumps(data, ensure_ascii=False).encode("utf-8"),
+            version=self._version,
+        )
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the number of loads from disk, writes, patches and compactions, and the
+        current version.
+        """
+        return {
+            "loads": self.loads,
+            "writes": self.writes,
+            "patches": self.patches,
+            "compactions": self.compactions,
+            "pending_patches": self._pending,
+            "version": self._version,
+        }
+
+
+patient_store = PatientRecordStore(settings.patient_record_path)
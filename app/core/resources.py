@@ -0,0 +1,176 @@
+import asyncio
+import contextlib
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from app._enums import ResourceState
+from app._exceptions import RetrievalUnavailableError
+from app.core.config import settings
+from app.core.executors import executors
+from app.utils.logger import logger
+
+__all__ = [
+    "RetrievalResources",
+    "retrieval_resources",
+]
+
+
+class RetrievalResources:
+    """
+    Container for the retrieval stack: the Chroma client and collection and the clinical
+    embedding model.
+
+    Nothing is imported or loaded when the application starts: the FastAPI lifespan calls
+    :meth:`start`, which loads and warms the stack up in a background thread, and the first
+    use loads it if that has not happened yet. Until the stack is ready, callers that can do
+    without it (the request router) check :attr:`ready` and fall back instead of waiting.
+    With ``enabled=False`` the API runs without retrieval and :meth:`load` raises
+    :class:`RetrievalUnavailableError`.
+
+    Example usage:
+        ```python
+        await retrieval_resources.start()
+        results = retrieval_resources.collection.query(query_texts=["..."], n_results=5)
+        ```
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        chroma_path: str,
+        collection_name: str,
+        embedding_model: str,
+        device: str = "cpu",
+    ) -> None:
+        self.enabled = enabled
+        self.chroma_path = chroma_path
+        self.collection_name = collection_name
+        self.embedding_model = embedding_model
+        self.device = device
+        self.state = ResourceState.COLD if enabled else ResourceState.DISABLED
+        self.error: str | None = None
+        self.load_seconds: float | None = None
+        self._client: Any = None
+        self._collection: Any = None
+        self._embedding_function: Any = None
+        self._lock = threading.Lock()
+        self._warmup: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == ResourceState.READY
+
+    @property
+    def collection(self) -> Any:  # noqa: ANN401
+        """
+        The clinical trials collection, loading the stack if needed (blocking).
+        """
+        self.load()
+        return self._collection
+
+    def embed(self, texts: Sequence[str]) -> Sequence[Any]:
+        """
+        Embed texts with the clinical embedding model, loading it if needed (blocking).
+        """
+        self.load()
+        return self._embedding_function(list(texts))
+
+    def load(self) -> None:
+        """
+        Create the Chroma client, load the embedding model and warm it up with a dummy
+        encode, so that the first query does not pay for lazy initialization. Blocking; a
+        failed load is retried on the next call.
+
+        Raises:
+            RetrievalUnavailableError: If retrieval is disabled or the stack failed to load.
+        """
+        if self.state == ResourceState.READY:
+            return
+        if not self.enabled:
+            raise RetrievalUnavailableError("Retrieval is disabled (RETRIEVAL_ENABLED=false).")
+
+        with self._lock:
+            if self.state == ResourceState.READY:
+                return
+
+            self.state = ResourceState.LOADING
+            start = time.perf_counter()
+            try:
+                import chromadb
+                from chromadb.config import Settings as ChromadbSettings
+                from chromadb.utils import embedding_functions
+
+                client = chromadb.PersistentClient(
+                    path=self.chroma_path,
+                    settings=ChromadbSettings(anonymized_telemetry=False),
+                )
+                logger.info(f"Loading the embedding model {self.embedding_model}...")
+                embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=self.embedding_model,
+                    device=self.device,
+                    trust_remote_code=True,
+                )
+                collection = client.get_or_create_collection(
+                    name=self.collection_name, embedding_function=embedding_function
+                )
+                embedding_function(["warm-up"])
+            except Exception as e:
+                self.state = ResourceState.FAILED
+                self.error = str(e)
+                raise RetrievalUnavailableError(e) from e
+
+            self._client = client
+            self._embedding_function = embedding_function
+            self._collection = collection
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            self.error = None
+            self.state = ResourceState.READY
+            logger.info(f"Retrieval stack ready in {self.load_seconds}s.")
+
+    async def start(self, warmup: bool = True) -> None:
+        """
+        Start loading the stack in the background. Called from the FastAPI lifespan on
+        startup; the application serves requests while the model loads.
+        """
+        if self.enabled and warmup and self._warmup is None:
+            self._warmup = asyncio.create_task(self._load_in_background())
+
+    async def _load_in_background(self) -> None:
+        try:
+            await executors.run_cpu(self.load)
+        except RetrievalUnavailableError:
+            logger.warning("Retrieval warm-up failed; it will be retried on first use.")
+
+    async def close(self) -> None:
+        """
+        Stop waiting for a warm-up in progress and release the stack.
+        """
+        if self._warmup is not None:
+            self._warmup.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._warmup
+            self._warmup = None
+        self._client = self._collection = self._embedding_function = None
+        if self.enabled:
+            self.state = ResourceState.COLD
+
+    def readiness(self) -> dict[str, Any]:
+        """
+        Return the state of the stack, for readiness probes.
+        """
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+retrieval_resources = RetrievalResources(
+    enabled=settings.retrieval_enabled,
+    chroma_path=settings.chroma_path,
+    collection_name=settings.chroma_collection_name,
+    embedding_model=settings.embedding_model,
+    device=settings.embedding_device,
+)
@@ -1,32 +1,98 @@
+import base64
+import hashlib
 import json
 from fastapi import HTTPException
-import binascii
 from pydantic import ValidationError
 
+from app._enums import Priority
 from app.core.api_request import api_request
+from app.core.context_cache import context_cache
+from app.core.config import settings
+from app.core.image_pipeline import image_pipeline
+from app.core.jobs import InMemoryJobQueueBackend, JobQueue, JobQueueBackend, job_queues
+from app.core.patient_repository import patient_repository
+from app.core.patient_store import patient_store
+from app.core.scan_cache import scan_cache
 from app.models.gemma import GemmaPayload
-from app.models.scan import PatientRecord
-from app.utils.image_processing import pad_base64_string
-from app.utils.json_utils import deep_merge
+from app.utils.logger import logger
 
 
-async def process_scan(image_base64: str) -> dict:
+async def process_scan(
+    image: bytes, mime_type: str = "image/jpeg", patient_id: str | None = None
+) -> dict:
+    """
+    Extract new or updated information from a scanned document and merge it into the
+    patient record: the record of ``patient_id`` in the patient repository, or the
+    single-patient record file when no id is given.
+
+    A document uploaded before for the same record, byte for byte or, when perceptual
+    matching is enabled, as a near-identical photo, reuses the previously extracted data
+    instead of calling the model.
+
+    Args:
+        image (bytes): The scanned document, as uploaded.
+        mime_type (str): The MIME type of the upload.
+        patient_id (str | None): The patient whose record is updated.
+    """
+    store = patient_repository.record(patient_id) if patient_id else patient_store
+    cache_key = f"scan:{patient_id}" if patient_id else "scan"
+
     try:
-        mime_type = "image/jpeg"  # Default MIME type
-        if image_base64.startswith("data:image"):
-            header, image_base64 = image_base64.split(",", 1)
-            mime_type = header.split(":")[1].split(";")[0]
+        scan_hash = hashlib.sha256(image).hexdigest()
+        dhash = None
+        new_data = scan_cache.get(cache_key, scan_hash)
+        cached = new_data is not None
+        if not cached:
+            processed = await image_pipeline.process(image, mime_type)
+            if processed is not None:
+                image, mime_type, dhash = processed.data, processed.mime_type, processed.dhash
+            new_data = scan_cache.get_similar(cache_key, dhash)
 
-        image_base64 = "".join(image_base64.split())
-        image_base64 = pad_base64_string(image_base64)
+        if new_data is None:
+            patient_data = (await store.get()).data
+            image_base64 = base64.b64encode(image).decode("ascii")
+            new_data = await extract_scan_data(patient_data, image_base64, mime_type, cache_key)
+        else:
+            logger.info(f"Scan {scan_hash[:12]} matches a document scanned before.")
 
-        with open("app/assets/patient.json", "r") as f:
-            patient_data = json.load(f)
+        try:
+            # Merged by the store into the latest version of the record, so that concurrent
+            # scans do not overwrite each other's updates, and journaled with its source.
+            snapshot, report = await store.apply_patch(new_data, source=f"scan:{scan_hash}")
+            logger.info(
+                f"Scan {scan_hash[:12]}: {len(report.inserted)} inserted, "
+                f"{len(report.updated)} updated, {len(report.ignored)} ignored."
+            )
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Invalid data structure after merging: {e}",
+            )
 
-        prompt = f"""
-        Analyze the attached image and extract any new or updated information for the patient.
+        if not cached:
+            scan_cache.set(cache_key, scan_hash, dhash, new_data)
+        return snapshot.data
+
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Patient records not found.")
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=500, detail="Error decoding patient records.")
+
+
+async def extract_scan_data(
+    patient_data: dict, image_base64: str, mime_type: str, cache_key: str
+) -> dict:
+    """
+    Ask the vision model for the new or updated fields found in a scanned document.
+    """
+    # The patient data heads the prompt so that it can be served from the context cache.
+    patient_context = f"""
         The current patient data is:
         {json.dumps(patient_data, indent=4)}
+        """
+
+    prompt = patient_context + f"""
+        Analyze the attached image and extract any new or updated information for the patient.
 
         Return ONLY a JSON object containing the new or updated fields, without any additional text, comments, or markdown formatting.
         For example, if you find a new lab result, return:
@@ -42,58 +108,59 @@ async def process_scan(image_base64: str) -> dict:
         }}
         """
 
-        payload_dict = {
-            "contents": [
-                {
-                    "role": "user",
-                    "parts": [
-                        {"text": prompt},
-                        {"inlineData": {"mimeType": mime_type, "data": image_base64}},
-                    ],
-                }
-            ]
-        }
-        payload = GemmaPayload.parse_obj(payload_dict)
+    payload_dict = {
+        "contents": [
+            {
+                "role": "user",
+                "parts": [
+                    {"text": prompt},
+                    {"inlineData": {"mimeType": mime_type, "data": image_base64}},
+                ],
+            }
+        ]
+    }
+    payload = GemmaPayload.parse_obj(payload_dict)
+    payload = await context_cache.apply(
+        payload, patient_context, model="gemini-1.5-flash", key=cache_key
+    )
 
-        response = await api_request(payload, model="gemini-1.5-flash")
-        if response["status"] != "success":
-            raise HTTPException(
-                status_code=500, detail=f"Gemini API error: {response['error_message']}"
-            )
+    response = await api_request(
+        payload, model="gemini-1.5-flash", priority=Priority.BACKGROUND
+    )
+    if response["status"] != "success":
+        raise HTTPException(
+            status_code=500, detail=f"Gemini API error: {response['error_message']}"
+        )
 
-        updated_patient_data_str = response["data"].strip()
-        
-        # Clean the response to ensure it's valid JSON
-        if updated_patient_data_str.startswith("```json"):
-            updated_patient_data_str = updated_patient_data_str[7:]
-        if updated_patient_data_str.endswith("```"):
-            updated_patient_data_str = updated_patient_data_str[:-3]
-        
-        updated_patient_data_str = updated_patient_data_str.strip()
-        
-        try:
-            new_data = json.loads(updated_patient_data_str)
-            merged_data = deep_merge(patient_data, new_data)
-            patient_record = PatientRecord.parse_obj(merged_data)
-        except json.JSONDecodeError:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to decode JSON from model response: {updated_patient_data_str}",
-            )
-        except ValidationError as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Invalid data structure after merging: {e}",
-            )
+    updated_patient_data_str = response["data"].strip()
 
-        with open("app/assets/patient.json", "w") as f:
-            json.dump(patient_record.dict(), f, indent=4)
+    # Clean the response to ensure it's valid JSON
+    if updated_patient_data_str.startswith("```json"):
+        updated_patient_data_str = updated_patient_data_str[7:]
+    if updated_patient_data_str.endswith("```"):
+        updated_patient_data_str = updated_patient_data_str[:-3]
 
-        return patient_record.dict()
+    updated_patient_data_str = updated_patient_data_str.strip()
 
-    except binascii.Error:
-        raise HTTPException(status_code=400, detail="Invalid base64 string.")
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Patient records not found.")
+    try:
+        new_data = json.loads(updated_patient_data_str)
     except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Error decoding patient records.")
+        new_data = None
+    if not isinstance(new_data, dict):
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to decode JSON from model response: {updated_patient_data_str}",
+        )
+    return new_data
+
+
+def _build_job_backend() -> JobQueueBackend:
+    if settings.scan_job_backend == "memory":
+        return InMemoryJobQueueBackend(settings.scan_job_queue_size, settings.scan_job_ttl)
+    raise ValueError(f"Unknown scan job backend: {settings.scan_job_backend}")
+
+
+scan_jobs = JobQueue(
+    "scan", process_scan, backend=_build_job_backend(), workers=settings.scan_job_workers
+)
+job_queues[scan_jobs.name] = scan_jobs
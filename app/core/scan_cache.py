@@ -0,0 +1,153 @@
+import copy
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import settings
+from app.utils.image_processing import hamming_distance
+
+__all__ = [
+    "ScanFingerprintCache",
+    "scan_cache",
+]
+
+
+@dataclass
+class ScanCacheEntry:
+    dhash: int | None
+    patch: dict[str, Any]
+    expires_at: float
+
+
+class ScanFingerprintCache:
+    """
+    Remember the patch extracted from each scanned document, so that a document uploaded
+    again (a retry, another device syncing the same file) is answered without a vision call.
+
+    Documents are matched on the SHA-256 of the uploaded bytes and, when ``max_distance``
+    is not negative, on the difference hash of the preprocessed image for new photos of the
+    same page: the closest entry within ``max_distance`` bits is used. Perceptual matching is
+    disabled by default, as reports printed from the same template hash alike even when
+    their values differ, and reusing their patch would record wrong data. Entries are scoped
+    by patient record and expire after ``ttl`` seconds; beyond ``max_entries``, the least
+    recently used (``lru``) or the oldest (``fifo``) entry is evicted.
+
+    Example usage:
+        ```python
+        patch = scan_cache.get("patient-1", sha256) or scan_cache.get_similar("patient-1", dhash)
+        if patch is None:
+            patch = ...
+            scan_cache.set("patient-1", sha256, dhash, patch)
+        ```
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 86400.0,
+        max_distance: int = -1,
+        eviction: str = "lru",
+    ) -> None:
+        if eviction not in ("lru", "fifo"):
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.eviction = eviction
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], ScanCacheEntry] = OrderedDict()
+
+    def get(self, scope: str, sha256: str) -> dict[str, Any] | None:
+        """
+        Return the patch extracted from an identical upload, if it was scanned before.
+
+        Args:
+            scope (str): The patient record the document belongs to.
+            sha256 (str): The hex SHA-256 of the uploaded bytes.
+
+        Returns:
+            dict[str, Any] | None: A copy of the cached patch, or None.
+        """
+        key = (scope, sha256)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self.hits += 1
+        return self._use(key, entry)
+
+    def get_similar(self, scope: str, dhash: int | None) -> dict[str, Any] | None:
+        """
+        Return the patch extracted from the closest image within ``max_distance`` bits.
+        Called after :meth:`get` missed; a miss here is a cache miss.
+
+        Args:
+            scope (str): The patient record the document belongs to.
+            dhash (int | None): The difference hash of the image, None if it could not be
+                computed.
+
+        Returns:
+            dict[str, Any] | None: A copy of the cached patch, or None on a miss.
+        """
+        if dhash is None or self.max_distance < 0:
+            self.misses += 1
+            return None
+
+        now = time.time()
+        best_key, best, best_distance = None, None, self.max_distance + 1
+        for key, entry in self._entries.items():
+            if key[0] != scope or entry.dhash is None or entry.expires_at <= now:
+                continue
+            distance = hamming_distance(dhash, entry.dhash)
+            if distance < best_distance:
+                best_key, best, best_distance = key, entry, distance
+
+        if best is None:
+            self.misses += 1
+            return None
+        self.similar_hits += 1
+        return self._use(best_key, best)
+
+    def _use(self, key: tuple[str, str], entry: ScanCacheEntry) -> dict[str, Any]:
+        if self.eviction == "lru":
+            self._entries.move_to_end(key)
+        return copy.deepcopy(entry.patch)
+
+    def set(self, scope: str, sha256: str, dhash: int | None, patch: dict[str, Any]) -> None:
+        """
+        Remember the patch extracted from a document.
+        """
+        if not self.max_entries:
+            return
+
+        self._entries[(scope, sha256)] = ScanCacheEntry(
+            dhash=dhash, patch=copy.deepcopy(patch), expires_at=time.time() + self.ttl
+        )
+        self._entries.move_to_end((scope, sha256))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the number of exact and perceptual hits, misses and cached documents.
+        """
+        return {
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+        }
+
+
+scan_cache = ScanFingerprintCache(
+    max_entries=settings.scan_cache_max_entries,
+    ttl=settings.scan_cache_ttl,
+    max_distance=settings.scan_cache_max_distance,
+    eviction=settings.scan_cache_eviction,
+)
@@ -0,0 +1,207 @@
+import abc
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.core.executors import executors
+from app.models.gemma import Content
+
+__all__ = [
+    "ChatSession",
+    "SessionBackend",
+    "SessionStore",
+    "SqliteSessionBackend",
+    "session_store",
+]
+
+
+class ChatSession(BaseModel):
+    """
+    Server-side state of a conversation.
+
+    ``contents`` holds the upstream ``Content`` objects, already built (introduction included),
+    so a new turn only appends to it. ``messages`` keeps the conversation as the client sees it.
+    ``summary`` and ``summarized`` hold the rolling summary of the turns that no longer fit
+    the token budget.
+    """
+
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    contents: list[Content] = Field(default_factory=list)
+    messages: list[dict[str, str]] = Field(default_factory=list)
+    summary: str | None = None
+    summarized: int = 0
+    created_at: float = Field(default_factory=time.time)
+    updated_at: float = Field(default_factory=time.time)
+
+    def append(self, sender: str, message: str, content: Content) -> None:
+        """
+        Record a turn both as displayed and as sent upstream.
+        """
+        self.messages.append({"sender": sender, "message": message})
+        self.contents.append(content)
+        self.updated_at = time.time()
+
+
+class SessionBackend(abc.ABC):
+    """
+    Persistent storage for chat sessions. Methods are blocking and run off the event loop.
+    """
+
+    @abc.abstractmethod
+    def load(self, session_id: str) -> ChatSession | None: ...
+
+    @abc.abstractmethod
+    def save(self, session: ChatSession) -> None: ...
+
+    @abc.abstractmethod
+    def delete(self, session_id: str) -> None: ...
+
+
+class SqliteSessionBackend(SessionBackend):
+    """
+    Session backend keeping one JSON document per session in SQLite.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "id TEXT PRIMARY KEY, updated_at REAL, data TEXT)"
+            )
+            self._db.commit()
+
+    def load(self, session_id: str) -> ChatSession | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM chat_sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return ChatSession.model_validate_json(row[0]) if row else None
+
+    def save(self, session: ChatSession) -> None:
+        data = session.model_dump_json(by_alias=True, exclude_none=True)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO chat_sessions VALUES (?, ?, ?)",
+                (session.id, session.updated_at, data),
+            )
+            self._db.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+            self._db.commit()
+
+
+class SessionStore:
+    """
+    Bounded in-memory session store with an optional persistent backend.
+
+    Recently used sessions are kept in an LRU map and expire after ``ttl`` seconds of
+    inactivity; sessions evicted from memory are reloaded from the backend when one is set.
+    Each stored session has a lock so that concurrent turns are appended in order; locks
+    are only created for sessions that exist and are dropped with them.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl: float = 86400.0,
+        backend: SessionBackend | None = None,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.backend = backend
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    @asynccontextmanager
+    async def turn(self, session_id: str) -> AsyncIterator[ChatSession | None]:
+        """
+        Hold the lock serializing the turns of a session for the duration of the block.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Yields:
+            ChatSession | None: The session, read once the lock is held, or None if it does
+                not exist or has expired.
+        """
+        if await self.get(session_id) is None:
+            # Unknown ids get no lock, so that they cannot grow the lock map.
+            yield None
+            return
+
+        async with self._locks.setdefault(session_id, asyncio.Lock()):
+            yield await self.get(session_id)
+
+    async def create(self) -> ChatSession:
+        """
+        Create and store an empty session.
+        """
+        session = ChatSession()
+        await self.save(session)
+        return session
+
+    async def get(self, session_id: str) -> ChatSession | None:
+        """
+        Return a session, or None if it does not exist or has expired.
+        """
+        session = self._sessions.get(session_id)
+        if session is None and self.backend is not None:
+            session = await executors.run_io(self.backend.load, session_id)
+
+        if session is None:
+            return None
+        if time.time() - session.updated_at > self.ttl:
+            await self.delete(session_id)
+            return None
+
+        self._remember(session)
+        return session
+
+    async def save(self, session: ChatSession) -> None:
+        """
+        Store a session in memory and in the backend.
+        """
+        self._remember(session)
+        if self.backend is not None:
+            await executors.run_io(self.backend.save, session)
+
+    async def delete(self, session_id: str) -> None:
+        """
+        Remove a session from memory and from the backend.
+        """
+        self._sessions.pop(session_id, None)
+        self._locks.pop(session_id, None)
+        if self.backend is not None:
+            await executors.run_io(self.backend.delete, session_id)
+
+    def _remember(self, session: ChatSession) -> None:
+        self._sessions[session.id] = session
+        self._sessions.move_to_end(session.id)
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            lock = self._locks.get(evicted_id)
+            if lock is not None and not lock.locked():
+                del self._locks[evicted_id]
+
+
+session_store = SessionStore(
+    max_sessions=settings.chat_session_max,
+    ttl=settings.chat_session_ttl,
+    backend=(
+        SqliteSessionBackend(settings.chat_session_sqlite_path)
+        if settings.chat_session_sqlite_path
+        else None
+    ),
+)
@@ -0,0 +1,71 @@
+import asyncio
+from collections.abc import Awaitable
+from typing import TypeVar
+
+__all__ = [
+    "Speculation",
+    "speculations",
+]
+
+T = TypeVar("T")
+
+
+class Speculation:
+    """
+    Track work started before knowing whether it will be needed.
+
+    A speculative task is launched with :meth:`launch`, then either kept with :meth:`confirm`
+    or dropped with :meth:`discard`, which cancels it if it is still running. The counters
+    give the speculation hit rate and the number of upstream calls wasted on misses.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.launched = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted_completed = 0
+        speculations[name] = self
+
+    def launch(self, work: Awaitable[T]) -> asyncio.Future[T]:
+        """
+        Start the speculative work in the background.
+        """
+        self.launched += 1
+        return asyncio.ensure_future(work)
+
+    async def confirm(self, task: asyncio.Future[T]) -> T:
+        """
+        Keep the speculative work and wait for its result.
+        """
+        self.hits += 1
+        return await task
+
+    def discard(self, task: asyncio.Future[T]) -> None:
+        """
+        Drop the speculative work, cancelling it if it has not completed yet.
+        """
+        self.misses += 1
+        if not task.done():
+            task.cancel()
+            return
+
+        self.wasted_completed += 1
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, float | int]:
+        """
+        Return the hit rate and the number of discarded (cancelled or completed) speculations.
+        """
+        decided = self.hits + self.misses
+        return {
+            "launched": self.launched,
+            "hits": self.hits,
+            "misses": self.misses,
+            "wasted_completed": self.wasted_completed,
+            "hit_rate": self.hits / decided if decided else 0.0,
+        }
+
+
+speculations: dict[str, Speculation] = {}
@@ -0,0 +1,257 @@
+import hashlib
+from collections import OrderedDict
+
+from pydantic import BaseModel, Field
+
+from app._enums import Priority
+from app._exceptions import CoreError
+from app.core.api_request import api_request
+from app.core.config import settings
+from app.models.gemma import Content, GemmaPayload, Part
+from app.utils.logger import logger
+from app.utils.tokens import DEFAULT_CHARS_PER_TOKEN, estimate_content_tokens
+
+__all__ = [
+    "CompactionResult",
+    "ConversationCompactor",
+    "SummaryCache",
+    "summary_cache",
+    "usage_headers",
+]
+
+# Token allowance reserved for the rolling summary when sizing the recent window.
+SUMMARY_TOKENS = 512
+
+
+class CompactionResult(BaseModel):
+    contents: list[Content]
+    summary: str | None = Field(
+        default=None, description="Rolling summary of the turns folded so far."
+    )
+    summarized: int = Field(
+        default=0, description="Index of the first turn not covered by the summary."
+    )
+    tokens_estimate: int = Field(..., description="Estimated input tokens of the contents.")
+    compacted: bool = False
+
+
+class SummaryCache:
+    """
+    Rolling summaries keyed by the conversation prefix they cover.
+
+    Stateless clients (``/chat``) resend the whole history on every turn and keep no
+    summary, so without this cache the old turns would be summarized again on each turn.
+    The compactor looks up the longest prefix of the conversation summarized before and
+    only folds the turns after it.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    @staticmethod
+    def prefix_keys(contents: list[Content]) -> list[str]:
+        """
+        Return the key of every prefix of the conversation: ``keys[k]`` covers
+        ``contents[:k]``.
+        """
+        keys = [hashlib.sha256().hexdigest()]
+        for content in contents:
+            keys.append(
+                hashlib.sha256(
+                    (keys[-1] + content.model_dump_json()).encode("utf-8")
+                ).hexdigest()
+            )
+        return keys
+
+    def get(self, key: str) -> str | None:
+        summary = self._entries.get(key)
+        if summary is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return summary
+
+    def set(self, key: str, summary: str) -> None:
+        if not self.max_entries:
+            return
+        self._entries[key] = summary
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class ConversationCompactor:
+    """
+    Keep a conversation within a model's input token budget.
+
+    The first exchange (the introduction carrying the medical file and its answer) and the
+    most recent messages are sent verbatim. When the conversation exceeds the budget, the
+    turns in between are folded into a rolling summary, maintained incrementally: only the
+    turns not yet covered by the previous summary are sent to the summarization model. The
+    summary is prefixed to the first recent user turn so roles keep alternating. When the
+    caller keeps no summary, the previous one is found in ``cache`` by conversation prefix.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        keep_recent: int = 6,
+        summary_model: str = "gemini-1.5-flash",
+        chars_per_token: float = DEFAULT_CHARS_PER_TOKEN,
+        cache: SummaryCache | None = None,
+    ) -> None:
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.summary_model = summary_model
+        self.chars_per_token = chars_per_token
+        self.cache = cache
+
+    @classmethod
+    def for_model(cls, model: str | None = None) -> "ConversationCompactor":
+        """
+        Build a compactor from the settings of a model (the default model if None).
+        """
+        model = model or settings.google_default_model
+        return cls(
+            budget=settings.model_context_budgets.get(model, 0),
+            keep_recent=settings.chat_keep_recent_messages,
+            summary_model=settings.chat_summary_model,
+            chars_per_token=settings.model_chars_per_token.get(
+                model, DEFAULT_CHARS_PER_TOKEN
+            ),
+            cache=summary_cache,
+        )
+
+    def estimate(self, contents: list[Content]) -> int:
+        """
+        Estimate the input tokens of a list of turns.
+        """
+        return sum(
+            estimate_content_tokens(content, self.chars_per_token) for content in contents
+        )
+
+    async def compact(
+        self,
+        contents: list[Content],
+        summary: str | None = None,
+        summarized: int = 0,
+    ) -> CompactionResult:
+        """
+        Fit the conversation to the budget.
+
+        Args:
+            contents (list[Content]): The full conversation, ending with the new user turn.
+            summary (str | None): The rolling summary from a previous turn, if any; looked
+                up in the summary cache when None.
+            summarized (int): Index of the first turn not covered by ``summary``.
+
+        Returns:
+            CompactionResult: The contents to send and the updated summary state.
+        """
+        total = self.estimate(contents)
+        if not self.budget or total <= self.budget:
+            return CompactionResult(
+                contents=contents,
+                summary=summary,
+                summarized=summarized,
+                tokens_estimate=total,
+            )
+
+        first_user = next(
+            (i for i, content in enumerate(contents) if content.role == "user"), 0
+        )
+        head_end = min(first_user + 2, len(contents) - 1)
+        head = contents[:head_end]
+        head_tokens = self.estimate(head) + SUMMARY_TOKENS
+
+        start = max(head_end, len(contents) - self.keep_recent, summarized)
+        while (
+            start < len(contents) - 1
+            and head_tokens + self.estimate(contents[start:]) > self.budget
+        ):
+            start += 1
+        while start < len(contents) - 1 and contents[start].role != "user":
+            start += 1
+
+        keys = self.cache.prefix_keys(contents) if self.cache is not None else None
+        if summary is None and keys is not None:
+            for end in range(start, head_end, -1):
+                cached = self.cache.get(keys[end])
+                if cached is not None:
+                    summary, summarized = cached, end
+                    break
+
+        folded = contents[max(head_end, summarized) : start]
+        if folded:
+            new_summary = await self._summarize(summary, folded)
+            if new_summary is not None:
+                summary, summarized = new_summary, start
+                if keys is not None:
+                    self.cache.set(keys[start], summary)
+
+        recent = [content.model_copy(deep=True) for content in contents[start:]]
+        if summary and recent and recent[0].parts:
+            recent[0].parts[0].text = (
+                f"(Résumé de la suite de notre échange : {summary})\n\n"
+                f"{recent[0].parts[0].text or ''}"
+            )
+
+        compacted = head + recent
+        logger.info(
+            f"Compacted conversation from {total} to {self.estimate(compacted)} estimated tokens."
+        )
+        return CompactionResult(
+            contents=compacted,
+            summary=summary,
+            summarized=summarized,
+            tokens_estimate=self.estimate(compacted),
+            compacted=True,
+        )
+
+    async def _summarize(self, summary: str | None, turns: list[Content]) -> str | None:
+        transcript = "\n".join(
+            f"{'Patient' if turn.role == 'user' else 'Assistant'} : "
+            + " ".join(part.text for part in turn.parts if part.text)
+            for turn in turns
+        )
+        prompt = f"""Résumez de façon concise l'échange suivant entre un patient et un assistant médical.
+Conservez les faits médicaux, les questions posées et les conclusions importantes. Répondez uniquement par le résumé.
+
+Résumé précédent :
+{summary or "(aucun)"}
+
+Nouveaux échanges :
+{transcript}
+"""
+        payload = GemmaPayload(
+            contents=[Content(role="user", parts=[Part(text=prompt, inlineData=None)])]
+        )
+        try:
+            response = await api_request(
+                payload, model=self.summary_model, priority=Priority.BACKGROUND
+            )
+        except CoreError as e:
+            # The summary is best effort: the turns are then dropped without one.
+            logger.warning(f"Conversation summary failed: {e}")
+            return None
+        if response.get("status") != "success" or not response.get("data"):
+            logger.warning(
+                f"Conversation summary failed: {response.get('error_message')}"
+            )
+            return None
+        return response["data"].strip()
+
+
+summary_cache = SummaryCache(max_entries=settings.chat_summary_cache_max_entries)
+
+
+def usage_headers(api_response: dict) -> dict[str, str]:
+    """
+    Return the ``X-Tokens-In``/``X-Tokens-Out`` headers reporting the usage of a call.
+    """
+    usage = api_response.get("usage") or {}
+    return {
+        "X-Tokens-In": str(usage.get("tokens_in", 0)),
+        "X-Tokens-Out": str(usage.get("tokens_out", 0)),
+    }
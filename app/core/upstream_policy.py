@@ -0,0 +1,41 @@
+import httpx
+
+from app.core.config import settings
+from app.utils.resilience import CircuitBreaker, remaining_time
+
+__all__ = [
+    "circuit_breakers",
+    "get_circuit_breaker",
+    "upstream_timeout",
+]
+
+
+circuit_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Return the circuit breaker for an upstream, e.g. ``gemini:gemma-3-27b-it``, creating it
+    from the settings on first use.
+    """
+    if name not in circuit_breakers:
+        circuit_breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=settings.circuit_breaker_failure_threshold,
+            reset_timeout=settings.circuit_breaker_reset_timeout,
+        )
+    return circuit_breakers[name]
+
+
+def upstream_timeout() -> httpx.Timeout:
+    """
+    Return the per-attempt timeout, shortened to the remaining request deadline if any.
+    """
+    read_timeout = settings.http_read_timeout
+    remaining = remaining_time()
+    if remaining is not None:
+        read_timeout = max(0.0, min(read_timeout, remaining))
+
+    return httpx.Timeout(
+        read_timeout, connect=min(settings.http_connect_timeout, read_timeout)
+    )
@@ -1,38 +1,43 @@
 import asyncio
+
 import httpx
 from bs4 import BeautifulSoup
+
+from app._exceptions import CoreError
+from app.core.executors import executors
+from app.core.http_client import get_http_client
+from app.core.upstream_policy import upstream_timeout
+from app.utils.decorators import async_retry
 from app.utils.web_search import search
 
 
-async def scrape_url(url: str) -> str:
+@async_retry(max_retries=1)
+async def fetch(url: str) -> httpx.Response:
     """
-    Scrape the content of a URL.
+    Fetch a URL with the shared client, retrying once on transient failures.
+    """
+    response = await get_http_client().get(
+        url, follow_redirects=True, timeout=upstream_timeout()
+    )
+    response.raise_for_status()
+    return response
+
+
+def extract_text(html: str, parser: str = "lxml", max_chars: int = 1500) -> str:
+    """
+    Extract the visible text of an HTML or XML page.
+
+    Parsing holds the GIL, so :func:`scrape_url` runs it in a worker process.
 
     Args:
-        url: The URL to scrape.
+        html: The page markup.
+        parser: The BeautifulSoup parser to use.
+        max_chars: The maximum number of characters to return.
 
     Returns:
-        The text content of the URL.
+        The text content of the page, one phrase per line.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, follow_redirects=True)
-            response.raise_for_status()
-            
-            # Check content type
-            content_type = response.headers.get("content-type")
-            if content_type and "text/html" not in content_type:
-                return ""  # Not an HTML page
-
-        except httpx.HTTPStatusError as e:
-            return f"HTTP error occurred: {e}"
-        except httpx.RequestError as e:
-            return f"An error occurred while requesting {e.request.url!r}: {e}"
-
-    parser = "lxml"
-    if "xml" in content_type:
-        parser = "lxml-xml"
-    soup = BeautifulSoup(response.text, parser)
+    soup = BeautifulSoup(html, parser)
     # Remove script and style elements
     for script_or_style in soup(["script", "style"]):
         script_or_style.decompose()
@@ -45,9 +50,38 @@ async def scrape_url(url: str) -> str:
     chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
     # Drop blank lines
     text = "\n".join(chunk for chunk in chunks if chunk)
-    
+
     # Limit character count
-    return text[:1500]
+    return text[:max_chars]
+
+
+async def scrape_url(url: str) -> str:
+    """
+    Scrape the content of a URL.
+
+    Args:
+        url: The URL to scrape.
+
+    Returns:
+        The text content of the URL.
+    """
+    try:
+        response = await fetch(url)
+
+        # Check content type
+        content_type = response.headers.get("content-type")
+        if content_type and "text/html" not in content_type:
+            return ""  # Not an HTML page
+
+    except httpx.HTTPStatusError as e:
+        return f"HTTP error occurred: {e}"
+    except httpx.RequestError as e:
+        return f"An error occurred while requesting {e.request.url!r}: {e}"
+    except CoreError as e:
+        return f"An error occurred while requesting {url!r}: {e.message}"
+
+    parser = "lxml-xml" if "xml" in (content_type or "") else "lxml"
+    return await executors.run_process(extract_text, response.text, parser)
 
 
 async def webscraper(query: str) -> dict:
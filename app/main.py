@@ -1,3 +1,8 @@
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.gzip import GZipMiddleware
 from starlette.responses import JSONResponse
@@ -6,16 +11,63 @@ from dotenv import load_dotenv
 from app._exceptions import CoreError
 from app.api.v1.router import router as api_router
 from app.core.config import settings
+from app.core.context_cache import context_cache
+from app.core.embedding_cache import embedding_cache
+from app.core.executors import executors
+from app.core.http_client import close_http_client, open_http_client
+from app.core.llm_cache import llm_cache
+from app.core.loop_monitor import loop_monitor
+from app.core.patient_repository import compact_patient_records, patient_repository
+from app.core.patient_store import patient_store
+from app.core.resources import retrieval_resources
+from app.core.scan import scan_jobs
+from app.middleware import DeadlineMiddleware
 
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """
+    Open application-scoped resources on startup and release them on shutdown.
+    """
+    loop_monitor.start()
+    await open_http_client()
+    await retrieval_resources.start(warmup=settings.retrieval_warmup)
+    compaction = asyncio.create_task(
+        compact_patient_records(
+            settings.patient_compaction_interval, settings.patient_snapshot_min_patches
+        )
+    )
+    scan_jobs.start()
+    try:
+        yield
+    finally:
+        await scan_jobs.close()
+        compaction.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await compaction
+        with contextlib.suppress(OSError):
+            await patient_store.compact()
+        await context_cache.close()
+        await retrieval_resources.close()
+        await close_http_client()
+        llm_cache.close()
+        embedding_cache.close()
+        patient_repository.close()
+        executors.close()
+        await loop_monitor.close()
+
+
 app = FastAPI(
     title=settings.name,
     description="Hackaton Google : Solve for Healthcare & Life Sciences with Gemma",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(GZipMiddleware, minimum_size=1000)
+app.add_middleware(DeadlineMiddleware, seconds=settings.request_deadline)
 app.include_router(api_router, prefix="/api/v1")
 
 
@@ -29,6 +81,16 @@ async def error_handler(_: Request, exc: CoreError) -> JSONResponse:
     status_codes = {
         "TaskNotFoundError": 404,
         "TaskInitalizationError": 500,
+        "CircuitOpenError": 503,
+        "DeadlineExceededError": 504,
+        "RateLimitExceededError": 429,
+        "PatientNotFoundError": 404,
+        "VersionConflictError": 409,
+        "InvalidUploadError": 400,
+        "UploadTooLargeError": 413,
+        "JobNotFoundError": 404,
+        "QueueFullError": 503,
+        "RetrievalUnavailableError": 503,
     }
 
     # Default to 400 if not specified
@@ -0,0 +1,3 @@
+from .deadline import DeadlineMiddleware
+
+__all__ = ["DeadlineMiddleware"]
@@ -0,0 +1,26 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.utils.resilience import deadline_scope
+
+__all__ = ["DeadlineMiddleware"]
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving every HTTP request a time budget.
+
+    The deadline is stored in a context variable so upstream retries issued while handling
+    the request never wait beyond the remaining budget.
+    """
+
+    def __init__(self, app: ASGIApp, seconds: float | None) -> None:
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with deadline_scope(self.seconds):
+            await self.app(scope, receive, send)
@@ -1,6 +1,10 @@
 from pydantic import BaseModel, Field
 
-__all__: list[str] = ["ClinicalTrialRequest"]
+__all__: list[str] = [
+    "ClinicalTrialBatchRequest",
+    "ClinicalTrialBatchResults",
+    "ClinicalTrialRequest",
+]
 
 
 class ClinicalTrialRequest(BaseModel):
@@ -29,3 +33,50 @@ class ClinicalTrialResults(BaseModel):
         default_factory=list,
         description="List of clinical trial results.",
     )
+
+
+class ClinicalTrialBatchRequest(BaseModel):
+    queries: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        description="The query strings to search for clinical trials, at most 50.",
+    )
+    n_results: int = Field(
+        default=3,
+        ge=1,
+        le=100,
+        description="The number of results to return per query. Must be between 1 and 100.",
+    )
+    summarize: bool = Field(
+        default=False,
+        description="Whether to summarize the trials found for each query with the model.",
+    )
+
+
+class ClinicalTrialMatch(BaseModel):
+    id: str
+    distance: float | None = None
+
+
+class ClinicalTrialQueryResults(BaseModel):
+    query: str
+    matches: list[ClinicalTrialMatch] = Field(
+        default_factory=list,
+        description="The trials found for the query, closest first, as keys of `trials`.",
+    )
+    summary: str | None = Field(
+        default=None,
+        description="The model's summary of the trials, when requested and available.",
+    )
+
+
+class ClinicalTrialBatchResults(BaseModel):
+    results: list[ClinicalTrialQueryResults] = Field(
+        default_factory=list,
+        description="The results of each query, in the order of the queries.",
+    )
+    trials: dict[str, ClinicalTrialResult] = Field(
+        default_factory=dict,
+        description="Every trial found, once, keyed by id.",
+    )
@@ -18,7 +18,28 @@ class Content(BaseModel):
 
 class GemmaPayload(BaseModel):
     contents: list[Content]
+    system_instruction: Content | None = Field(None, alias="systemInstruction")
+    cached_content: str | None = Field(None, alias="cachedContent")
 
     def dict(self, **kwargs: object) -> dict[str, Any]:
         kwargs.update({"by_alias": True, "exclude_none": True})
         return super().dict(**kwargs)
+
+    def inline_system_instruction(self) -> "GemmaPayload":
+        """
+        Return a payload with the system instruction prepended to the first user turn,
+        for models that do not accept a system instruction (Gemma).
+        """
+        if self.system_instruction is None:
+            return self
+
+        instruction = "\n".join(
+            part.text for part in self.system_instruction.parts if part.text
+        )
+        contents = [content.model_copy(deep=True) for content in self.contents]
+        for content in contents:
+            if content.role == "user" and content.parts:
+                content.parts[0].text = f"{instruction}\n\n{content.parts[0].text or ''}"
+                break
+
+        return GemmaPayload(contents=contents, cachedContent=self.cached_content)
@@ -0,0 +1,19 @@
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from app._enums import JobStatus
+
+__all__: list[str] = [
+    "Job",
+]
+
+
+class Job(BaseModel):
+    id: str = Field(..., description="The job identifier.")
+    status: JobStatus = Field(default=JobStatus.QUEUED, description="The job status.")
+    created_at: float = Field(..., description="When the job was submitted (epoch seconds).")
+    started_at: float | None = Field(default=None, description="When a worker picked it up.")
+    finished_at: float | None = Field(default=None, description="When the job completed.")
+    result: Any = Field(default=None, description="The result of a successful job.")
+    error: dict[str, Any] | None = Field(default=None, description="Why the job failed.")
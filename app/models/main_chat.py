@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ChatInput(BaseModel):
@@ -9,3 +9,21 @@ class MultimodalInput(BaseModel):
     medical_file: str
     text_input: str = ""
     uploaded_files: list[dict[str, str]] = []
+
+
+class ChatSessionCreate(BaseModel):
+    conversation: list[dict[str, str]] = Field(
+        default_factory=list,
+        description="Optional existing conversation to seed the session with.",
+    )
+
+
+class ChatMessageInput(BaseModel):
+    message: str = Field(..., min_length=1, description="The new user message.")
+
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    conversation: list[dict[str, str]]
+    created_at: float
+    updated_at: float
@@ -12,7 +12,9 @@ class Surgery(BaseModel):
 
 class MedicalHistory(BaseModel):
     conditions: Optional[List[str]] = Field(None, description="List of medical conditions")
-    surgeries: Optional[List[Surgery]] = Field(None, description="List of surgeries")
+    surgeries: Optional[List[Surgery]] = Field(
+        None, description="List of surgeries", json_schema_extra={"merge_key": ["name"]}
+    )
 
 class Allergy(BaseModel):
     substance: Optional[str] = Field(None, description="Substance the patient is allergic to")
@@ -43,8 +45,25 @@ class Imaging(BaseModel):
 class PatientRecord(BaseModel):
     personal_information: Optional[PersonalInformation] = Field(None, description="Patient's personal information")
     medical_history: Optional[MedicalHistory] = Field(None, description="Patient's medical history")
-    allergies: Optional[List[Allergy]] = Field(None, description="List of patient's allergies")
-    treatment: Optional[List[Treatment]] = Field(None, description="List of patient's treatments")
+    allergies: Optional[List[Allergy]] = Field(
+        None,
+        description="List of patient's allergies",
+        json_schema_extra={"merge_key": ["substance"]},
+    )
+    treatment: Optional[List[Treatment]] = Field(
+        None,
+        description="List of patient's treatments",
+        json_schema_extra={"merge_key": ["medication"]},
+    )
     lifestyle: Optional[Lifestyle] = Field(None, description="Patient's lifestyle information")
-    lab_results: Optional[List[LabResult]] = Field(None, description="List of patient's lab results")
-    imaging: Optional[List[Imaging]] = Field(None, description="List of patient's imaging results")
+    # One result per date, holding one field per analyte: merged per date and analyte.
+    lab_results: Optional[List[LabResult]] = Field(
+        None,
+        description="List of patient's lab results",
+        json_schema_extra={"merge_key": ["date"]},
+    )
+    imaging: Optional[List[Imaging]] = Field(
+        None,
+        description="List of patient's imaging results",
+        json_schema_extra={"merge_key": ["date", "type"]},
+    )
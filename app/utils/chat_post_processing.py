@@ -1,30 +1,75 @@
 import logging
+import re
+
+from app._enums import Priority
+from app._exceptions import CoreError
 from app.core.api_request import api_request
+from app.core.config import settings
 from app.models.gemma import Content, GemmaPayload, Part
 
-async def format_chat_response(text: str) -> str:
+__all__: list[str] = ["format_chat_response", "normalize_chat_html"]
+
+_BOLD = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_ITALIC = re.compile(r"(?<![\w*])\*(?=\S)([^*\n]+?)(?<=\S)\*(?![\w*])")
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+_BULLET = re.compile(r"^(\s*)[*\-+]\s+", re.MULTILINE)
+_BREAK = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def normalize_chat_html(text: str) -> str:
     """
-    Formats the given text as a chat response using an LLM.
+    Convert the markdown a model may still emit into the light HTML the front end renders.
+
+    Bold and headings become ``<b>``, italics are unwrapped, bullet markers become "•" and
+    line breaks become ``<br>``. Existing ``<br>``/``<b>`` tags are preserved.
     """
+    text = text.replace("\r\n", "\n").strip()
+    text = _BREAK.sub("\n", text)
+    text = _HEADING.sub(r"<b>\1</b>", text)
+    text = _BULLET.sub(r"\1• ", text)
+    text = _BOLD.sub(r"<b>\2</b>", text)
+    text = _ITALIC.sub(r"\1", text)
+    text = _BLANK_LINES.sub("\n\n", text)
+    return text.replace("\n", "<br>")
+
+
+async def format_chat_response(text: str, mode: str | None = None) -> str:
+    """
+    Formats the given text as a chat response.
+
+    The formatting requirements are part of the generation prompt, so the default ``local``
+    mode only normalizes the markup. The ``llm`` mode is the legacy behavior, kept as an
+    opt-in: it rewrites the text with a second LLM call, formatting medgemma answers a
+    second time on top of their system instruction, at the cost of one more call per answer.
+    """
+    mode = mode or settings.chat_format_mode
+    if mode != "llm":
+        return normalize_chat_html(text)
+
     logging.info("Formatting chat response.")
-    
+
     prompt = f"""You are a helpful assistant. Your task is to format the following text as a natural and friendly chat response.
     The response should be easy to read and understand.
-    
+
     Original text:
     ---
     {text}
     ---
-    
+
     Formatted response:
     """
-    
+
     payload = GemmaPayload(contents=[Content(role="user", parts=[Part(text=prompt, inlineData=None)])])
-    
-    api_response = await api_request(payload)
-    
+
+    try:
+        api_response = await api_request(payload, priority=Priority.BACKGROUND)
+    except CoreError as e:
+        logging.error(f"Failed to format chat response from LLM: {e}")
+        return normalize_chat_html(text)
+
     if api_response and api_response.get("data"):
-        return api_response["data"]
+        return normalize_chat_html(api_response["data"])
     else:
         logging.error("Failed to format chat response from LLM.")
-        return text
+        return normalize_chat_html(text)
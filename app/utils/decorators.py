@@ -1,8 +1,10 @@
-from collections.abc import Callable
+import functools
+from collections.abc import Awaitable, Callable
 from time import sleep
 from typing import Any
 
 from app.utils.logger import logger
+from app.utils.resilience import CircuitBreaker, is_retryable_http_error, retry_async
 
 
 def retry(
@@ -46,4 +48,42 @@ def retry(
     return decorator
 
 
+def async_retry(
+    max_retries: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    is_retryable: Callable[[Exception], bool] = is_retryable_http_error,
+    circuit_breaker: CircuitBreaker | None = None,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Decorator to retry a coroutine function without blocking the event loop.
+
+    Retries use exponential backoff with full jitter, honor ``Retry-After`` and never
+    sleep past the current request deadline. See :func:`app.utils.resilience.retry_async`.
+
+    Args:
+        max_retries (int): Maximum number of retries after the first attempt.
+        base_delay (float): Backoff base in seconds, doubled on every retry.
+        max_delay (float): Upper bound of the computed backoff in seconds.
+        is_retryable (Callable[[Exception], bool]): Predicate selecting retryable errors.
+        circuit_breaker (CircuitBreaker | None): Optional breaker shared by all calls.
+
+    Returns:
+        Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]: Decorated coroutine function.
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):  # noqa: ANN202, ANN002, ANN003
+            return await retry_async(
+                lambda: func(*args, **kwargs),
+                max_retries=max_retries,
+                base_delay=base_delay,
+                max_delay=max_delay,
+                is_retryable=is_retryable,
+                circuit_breaker=circuit_breaker,
+            )
 
+        return wrapper
+
+    return decorator
@@ -1,12 +1,50 @@
 import base64
-from PIL import Image
+import io
+from dataclasses import dataclass
 
-__all__ = ["detect_inverted", "correct_inversion", "pad_base64_string"]
+from PIL import Image, ImageOps
+
+__all__ = [
+    "ProcessedImage",
+    "correct_inversion",
+    "detect_inverted",
+    "difference_hash",
+    "hamming_distance",
+    "pad_base64_string",
+    "preprocess_image",
+]
+
+# EXIF tag holding the orientation of the camera when the photo was taken.
+ORIENTATION_TAG = 274
+
+FORMAT_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+# Side of the difference hash grid: 16x16 gradients, i.e. a 256-bit hash, fine enough to
+# tell apart documents sharing the same layout.
+HASH_SIZE = 16
+
+
+@dataclass(frozen=True)
+class ProcessedImage:
+    """
+    An image ready to be sent to the model, with its size before preprocessing.
+    """
+
+    data: bytes
+    mime_type: str
+    original_size: int
+    width: int
+    height: int
+    dhash: int | None = None
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
 
 
 def detect_inverted(image: Image.Image) -> bool:
     """Return True if the image orientation is horizontally flipped."""
-    orientation = image.getexif().get(274)
+    orientation = image.getexif().get(ORIENTATION_TAG)
     return orientation == 2
 
 
@@ -34,3 +72,110 @@ def pad_base64_string(base64_string: str) -> str:
     if missing_padding != 0:
         base64_string += "=" * (4 - missing_padding)
     return base64_string
+
+
+def preprocess_image(
+    data: bytes,
+    max_dimension: int,
+    quality: int = 85,
+    image_format: str = "JPEG",
+) -> ProcessedImage:
+    """
+    Decode an uploaded image, apply its EXIF orientation, downsize it and recompress it
+    without metadata.
+
+    The image is rotated or flipped according to its EXIF orientation (which also fixes
+    horizontally inverted photos, see :func:`correct_inversion`), scaled down so that its
+    longest side is at most ``max_dimension`` pixels and re-encoded in ``image_format``
+    without EXIF data. An image that needs no transformation and is already smaller than
+    its re-encoding is returned unchanged. Only the first frame of animated images is kept.
+
+    Args:
+        data (bytes): The encoded image.
+        max_dimension (int): The maximum width and height, 0 to keep the original size.
+        quality (int): The JPEG/WebP quality, from 1 to 100.
+        image_format (str): The output format: ``JPEG``, ``WEBP`` or ``PNG``.
+
+    Returns:
+        ProcessedImage: The encoded image, its dimensions and its difference hash.
+
+    Raises:
+        PIL.UnidentifiedImageError: If the data is not a supported image.
+    """
+    image_format = image_format.upper()
+    with Image.open(io.BytesIO(data)) as source:
+        source_format = source.format
+        has_exif = bool(source.getexif())
+        oriented = source.getexif().get(ORIENTATION_TAG, 1) != 1
+
+        image = ImageOps.exif_transpose(source)
+        resized = bool(max_dimension) and max(image.size) > max_dimension
+        if resized:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+        if image_format == "JPEG" and image.mode != "RGB":
+            image = _flatten(image)
+
+        buffer = io.BytesIO()
+        image.save(
+            buffer,
+            format=image_format,
+            quality=quality,
+            optimize=True,
+            icc_profile=source.info.get("icc_profile"),
+        )
+
+        dhash = difference_hash(image)
+
+    encoded = buffer.getvalue()
+    if (
+        not (resized or oriented or has_exif)
+        and source_format == image_format
+        and len(data) <= len(encoded)
+    ):
+        encoded = data
+
+    return ProcessedImage(
+        data=encoded,
+        mime_type=FORMAT_MIME_TYPES[image_format],
+        original_size=len(data),
+        width=image.width,
+        height=image.height,
+        dhash=dhash,
+    )
+
+
+def difference_hash(image: Image.Image, size: int = HASH_SIZE) -> int:
+    """
+    Compute the difference hash (dHash) of an image: whether each pixel of a grayscale
+    ``size + 1`` by ``size`` thumbnail is brighter than its right neighbour. Photos of the same
+    page differing in compression, scale or slight lighting changes have hashes a few bits
+    apart, compared with :func:`hamming_distance`.
+    """
+    pixels = image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS).tobytes()
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    Return the number of differing bits between two hashes.
+    """
+    return (a ^ b).bit_count()
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """
+    Convert an image to RGB, compositing transparent pixels over a white background.
+    """
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
@@ -1,14 +1,185 @@
-import collections.abc
+import types
+import typing
+from typing import Any
 
-def deep_merge(d, u):
+from pydantic import BaseModel, Field, ValidationError
+
+__all__: list[str] = ["MergeReport", "merge_model_data"]
+
+
+class MergeReport(BaseModel):
+    inserted: list[str] = Field(default_factory=list, description="Items added.")
+    updated: list[str] = Field(default_factory=list, description="Items or fields changed.")
+    ignored: list[str] = Field(
+        default_factory=list,
+        description="Items or fields already present, unknown or invalid.",
+    )
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserted or self.updated)
+
+
+def merge_model_data(
+    current: dict[str, Any],
+    patch: dict[str, Any],
+    model: type[BaseModel],
+    report: MergeReport | None = None,
+    path: str = "",
+) -> tuple[dict[str, Any], MergeReport]:
+    """
+    Merge a partial update into the data of a pydantic model, upserting list items.
+
+    Items of a list of models are matched on the natural key declared on the field with
+    ``json_schema_extra={"merge_key": [...]}`` (strings compared case-insensitively): a
+    matching item has its non-null fields updated, other items are appended. Lists of
+    scalars are merged as sets, and lists without a key only skip exact duplicates. Each
+    list is indexed once, so a merge is linear in the size of the record and the patch.
+    Null values and fields unknown to the model are ignored.
+
+    Args:
+        current (dict[str, Any]): The current data; it is not modified.
+        patch (dict[str, Any]): The new or updated fields.
+        model (type[BaseModel]): The model describing ``current``.
+        report (MergeReport | None): The report to add to, a new one if None.
+        path (str): The location of ``current`` in the record, for the report.
+
+    Returns:
+        tuple[dict[str, Any], MergeReport]: The merged data and what the merge did.
+    """
+    report = report if report is not None else MergeReport()
+    merged = dict(current)
+
+    for name, value in patch.items():
+        field = model.model_fields.get(name)
+        field_path = f"{path}.{name}" if path else name
+        if field is None:
+            report.ignored.append(field_path)
+            continue
+        if value is None:
+            continue
+
+        item_model, is_list = _inner_model(field.annotation)
+        if is_list and isinstance(value, list):
+            extra = field.json_schema_extra if isinstance(field.json_schema_extra, dict) else {}
+            merged[name] = _merge_list(
+                current.get(name) or [],
+                value,
+                item_model,
+                tuple(extra.get("merge_key", ())),
+                report,
+                field_path,
+            )
+        elif item_model is not None and isinstance(value, dict):
+            merged[name], _ = merge_model_data(
+                current.get(name) or {}, value, item_model, report, field_path
+            )
+        elif current.get(name) == value:
+            report.ignored.append(field_path)
+        else:
+            merged[name] = value
+            report.updated.append(field_path)
+
+    return merged, report
+
+
+def _merge_list(
+    existing: list[Any],
+    incoming: list[Any],
+    item_model: type[BaseModel] | None,
+    key_fields: tuple[str, ...],
+    report: MergeReport,
+    path: str,
+) -> list[Any]:
+    merged = list(existing)
+
+    if item_model is None:
+        seen = {_normalize(value) for value in merged}
+        for value in incoming:
+            if _normalize(value) in seen:
+                report.ignored.append(f"{path}[{value}]")
+            else:
+                seen.add(_normalize(value))
+                merged.append(value)
+                report.inserted.append(f"{path}[{value}]")
+        return merged
+
+    index: dict[tuple, int] = {}
+    for position, item in enumerate(merged):
+        key = _key(item, key_fields)
+        if key is not None:
+            index.setdefault(key, position)
+
+    for item in incoming:
+        try:
+            item = item_model.model_validate(item).model_dump(exclude_unset=True)
+        except ValidationError:
+            report.ignored.append(f"{path}[{len(merged)}]")
+            continue
+
+        key = _key(item, key_fields)
+        label = (
+            f"{path}[{', '.join(str(item.get(field)) for field in key_fields)}]"
+            if key is not None
+            else f"{path}[{len(merged)}]"
+        )
+
+        if key is None or key not in index:
+            if key is None and any(_contains(known, item) for known in merged):
+                report.ignored.append(label)
+                continue
+            if key is not None:
+                index[key] = len(merged)
+            merged.append(item)
+            report.inserted.append(label)
+            continue
+
+        # The key fields matched (case-insensitively): keep their stored spelling.
+        position = index[key]
+        changes = {field: value for field, value in item.items() if field not in key_fields}
+        updated, _ = merge_model_data(merged[position], changes, item_model)
+        if updated == merged[position]:
+            report.ignored.append(label)
+        else:
+            merged[position] = updated
+            report.updated.append(label)
+
+    return merged
+
+
+def _inner_model(annotation: object) -> tuple[type[BaseModel] | None, bool]:
     """
-    Recursively merges two dictionaries, concatenating lists.
+    Return the model type of a field (or of its items) and whether the field is a list.
     """
-    for k, v in u.items():
-        if isinstance(v, collections.abc.Mapping):
-            d[k] = deep_merge(d.get(k, {}), v)
-        elif isinstance(v, list) and isinstance(d.get(k), list):
-            d[k].extend(v)
+    is_list = False
+    while True:
+        origin = typing.get_origin(annotation)
+        if origin in (typing.Union, types.UnionType):
+            args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+            annotation = args[0] if len(args) == 1 else Any
+        elif origin is list:
+            is_list = True
+            annotation = typing.get_args(annotation)[0]
         else:
-            d[k] = v
-    return d
+            break
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, is_list
+    return None, is_list
+
+
+def _normalize(value: object) -> object:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    return value
+
+
+def _key(item: dict[str, Any], key_fields: tuple[str, ...]) -> tuple | None:
+    if not key_fields:
+        return None
+    key = tuple(_normalize(item.get(field)) for field in key_fields)
+    return None if all(value is None for value in key) else key
+
+
+def _contains(known: dict[str, Any], item: dict[str, Any]) -> bool:
+    return all(known.get(field) == value for field, value in item.items())
@@ -0,0 +1,122 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+__all__ = [
+    "PriorityLimiter",
+    "TokenBucket",
+]
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``rate_per_minute``.
+
+    The bucket starts full with ``capacity`` tokens (one minute worth by default), so short
+    bursts are absorbed while the sustained rate stays bounded.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None) -> None:
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self) -> float:
+        """
+        Return the number of tokens currently available.
+        """
+        self._refill()
+        return self.tokens
+
+    async def take(self, amount: float, timeout: float | None = None) -> None:
+        """
+        Wait until ``amount`` tokens are available and consume them.
+
+        Requests larger than the bucket capacity are clamped to the capacity so they can
+        eventually be admitted.
+
+        Args:
+            amount (float): The number of tokens to consume.
+            timeout (float | None): Maximum time to wait in seconds. None waits indefinitely.
+
+        Raises:
+            TimeoutError: If the tokens cannot be obtained within ``timeout``.
+        """
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+
+            wait = (amount - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise TimeoutError("token bucket exhausted")
+            await asyncio.sleep(wait)
+
+
+class PriorityLimiter:
+    """
+    Concurrency limiter whose waiting queue is ordered by priority, then arrival.
+
+    Lower priority values are served first. A released slot is handed over directly to the
+    next waiter so that newcomers cannot overtake the queue.
+    """
+
+    def __init__(self, max_in_flight: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        """
+        Return the number of callers waiting for a slot.
+        """
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int = 0, timeout: float | None = None) -> None:
+        """
+        Wait for a free slot.
+
+        Args:
+            priority (int): The caller priority, lower values first.
+            timeout (float | None): Maximum time to wait in seconds. None waits indefinitely.
+
+        Raises:
+            TimeoutError: If no slot was granted within ``timeout``.
+        """
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            return
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (TimeoutError, asyncio.CancelledError):
+            if future.done() and not future.cancelled():
+                # The slot was granted concurrently with the timeout: pass it on.
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """
+        Release a slot, handing it over to the highest-priority waiter if any.
+        """
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
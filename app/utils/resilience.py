@@ -0,0 +1,266 @@
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from app._exceptions import CircuitOpenError, DeadlineExceededError
+from app.utils.logger import logger
+
+__all__ = [
+    "CircuitBreaker",
+    "deadline_scope",
+    "is_retryable_http_error",
+    "remaining_time",
+    "retry_after_seconds",
+    "retry_async",
+]
+
+RETRYABLE_STATUS_CODES: frozenset[int] = frozenset({408, 429, 500, 502, 503, 504})
+
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float | None) -> Iterator[None]:
+    """
+    Set a deadline for the enclosed work, propagated to nested calls through a context variable.
+
+    A nested scope can only tighten the deadline inherited from its parent, never extend it.
+
+    Args:
+        seconds (float | None): The time budget from now. None leaves the current deadline unchanged.
+    """
+    current = _deadline.get()
+    deadline = current
+    if seconds is not None:
+        candidate = time.monotonic() + seconds
+        deadline = candidate if current is None else min(current, candidate)
+
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> float | None:
+    """
+    Return the seconds left before the current deadline, or None when no deadline is set.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def is_retryable_http_error(exc: Exception) -> bool:
+    """
+    Return True for transport errors and for HTTP statuses worth retrying (429, 5xx, 408).
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+
+def retry_after_seconds(exc: Exception) -> float | None:
+    """
+    Extract the server-requested delay from an HTTP error.
+
+    Both the standard ``Retry-After`` header (seconds or HTTP date) and the ``retryDelay``
+    field of Google API ``RetryInfo`` error details are honored.
+
+    Args:
+        exc (Exception): The exception raised by the failed attempt.
+
+    Returns:
+        float | None: The delay in seconds, or None if the server did not request one.
+    """
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+
+    header = exc.response.headers.get("retry-after")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    try:
+        details = exc.response.json().get("error", {}).get("details", [])
+    except Exception:
+        return None
+    for detail in details:
+        delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+        if isinstance(delay, str) and delay.endswith("s"):
+            try:
+                return max(0.0, float(delay[:-1]))
+            except ValueError:
+                return None
+    return None
+
+
+class CircuitBreaker:
+    """
+    Fail-fast guard around an unhealthy upstream.
+
+    The breaker opens after ``failure_threshold`` consecutive failures and rejects calls
+    with :class:`CircuitOpenError` for ``reset_timeout`` seconds. It then lets a single
+    probe through (half-open); the probe's outcome closes or re-opens the circuit. A probe
+    that ends without an upstream answer (cancelled, rejected locally) counts as a failure.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """
+        Return the breaker state: ``closed``, ``open`` or ``half_open``.
+        """
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    @property
+    def probing(self) -> bool:
+        """
+        Whether the half-open probe is in flight.
+        """
+        return self._probing
+
+    def check(self) -> bool:
+        """
+        Raise :class:`CircuitOpenError` if the call must not be attempted.
+
+        Returns:
+            bool: Whether the call is the half-open probe, whose outcome must be recorded.
+        """
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+
+        elapsed = time.monotonic() - (self.opened_at or 0.0)
+        raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self) -> None:
+        """
+        Close the circuit after a successful call.
+        """
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """
+        Count an upstream failure, opening the circuit when the threshold is reached.
+        """
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                logger.warning(f"Circuit '{self.name}' opened after {self.failures} failures.")
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def stats(self) -> dict[str, object]:
+        """
+        Return the breaker state and its consecutive failure count.
+        """
+        return {"state": self.state, "failures": self.failures}
+
+
+async def retry_async[T](
+    func: Callable[[], Awaitable[T]],
+    *,
+    max_retries: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    is_retryable: Callable[[Exception], bool] = is_retryable_http_error,
+    circuit_breaker: CircuitBreaker | None = None,
+) -> T:
+    """
+    Await ``func`` with retries, exponential backoff with full jitter and deadline awareness.
+
+    A server-provided ``Retry-After`` takes precedence over the computed backoff. No retry is
+    attempted when the delay would exceed the remaining request deadline; the last error is
+    raised instead.
+
+    Args:
+        func (Callable[[], Awaitable[T]]): A zero-argument coroutine factory performing one attempt.
+        max_retries (int): Maximum number of retries after the first attempt.
+        base_delay (float): Backoff base in seconds, doubled on every retry.
+        max_delay (float): Upper bound of the computed backoff in seconds.
+        is_retryable (Callable[[Exception], bool]): Predicate selecting retryable errors.
+        circuit_breaker (CircuitBreaker | None): Optional breaker checked before every attempt.
+
+    Returns:
+        T: The result of the first successful attempt.
+
+    Raises:
+        CircuitOpenError: If the circuit breaker rejects the call.
+        DeadlineExceededError: If the deadline is already exhausted before an attempt.
+    """
+    attempt = 0
+    while True:
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError(f"no time left after {attempt} attempt(s)")
+
+        probe = circuit_breaker.check() if circuit_breaker is not None else False
+
+        try:
+            result = await func()
+        except Exception as e:
+            retryable = is_retryable(e)
+            if circuit_breaker is not None:
+                if retryable:
+                    circuit_breaker.record_failure()
+                elif isinstance(e, httpx.HTTPStatusError):
+                    # The upstream answered: it is healthy even if the request was rejected.
+                    circuit_breaker.record_success()
+            if not retryable or attempt >= max_retries:
+                raise
+
+            delay = retry_after_seconds(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+            remaining = remaining_time()
+            if remaining is not None and delay >= remaining:
+                raise
+
+            logger.warning(
+                f"Retrying after {type(e).__name__} in {delay:.2f}s "
+                f"(attempt {attempt + 1}/{max_retries})."
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        else:
+            if circuit_breaker is not None:
+                circuit_breaker.record_success()
+            return result
+        finally:
+            # A probe that got no answer (cancelled, rejected locally) must not leave the
+            # breaker half-open with its single probe slot taken.
+            if probe and circuit_breaker.probing:
+                circuit_breaker.record_failure()
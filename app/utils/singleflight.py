@@ -0,0 +1,88 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypeVar
+
+__all__ = [
+    "SingleFlight",
+    "single_flight_groups",
+]
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing the same key into a single execution.
+
+    The first caller for a key starts the work; callers arriving while it is in flight await
+    the same task and receive its result (or exception). Waiters are shielded from each other:
+    cancelling one waiter does not cancel the shared work, which is only cancelled once every
+    waiter has gone.
+
+    Example usage:
+        ```python
+        flights = SingleFlight("search")
+        results = await flights.do(query, lambda: search(query))
+        ```
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.executed = 0
+        self.shared = 0
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        single_flight_groups[name] = self
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``func`` for ``key`` unless an identical call is already in flight.
+
+        Args:
+            key (Hashable): The identity of the call.
+            func (Callable[[], Awaitable[T]]): A zero-argument coroutine factory doing the work.
+
+        Returns:
+            T: The result of the shared execution.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.executed += 1
+        else:
+            self.shared += 1
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+                self._forget(key, task)
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if task.done() and not task.cancelled():
+            # Retrieve the exception so an unawaited failure is not reported as never retrieved.
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the number of executions, coalesced calls and calls currently in flight.
+        """
+        return {
+            "executed": self.executed,
+            "shared": self.shared,
+            "in_flight": len(self._calls),
+        }
+
+
+single_flight_groups: dict[str, SingleFlight] = {}
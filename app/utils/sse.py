@@ -0,0 +1,58 @@
+import json
+from collections.abc import AsyncIterator
+
+from starlette.responses import StreamingResponse
+
+from app.utils.logger import logger
+
+__all__: list[str] = ["sse_event", "sse_response"]
+
+
+def sse_event(data: str, event: str | None = None) -> str:
+    """
+    Encode a single server-sent event.
+
+    The payload is JSON-encoded so that newlines inside model output do not break
+    the event framing.
+
+    Args:
+        data (str): The event payload.
+        event (str | None): Optional event name. Unnamed events are plain ``message`` events.
+
+    Returns:
+        str: The encoded event, terminated by a blank line.
+    """
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_response(chunks: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Forward text chunks to the client as server-sent events.
+
+    Each chunk is sent as a ``message`` event as soon as it is available. The stream
+    ends with a ``done`` event, or an ``error`` event if the producer fails mid-way.
+
+    Args:
+        chunks (AsyncIterator[str]): The text chunks to forward.
+
+    Returns:
+        StreamingResponse: A ``text/event-stream`` response.
+    """
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for chunk in chunks:
+                yield sse_event(chunk)
+        except Exception as e:
+            logger.error(f"Streaming failed: {e}")
+            yield sse_event(str(e), event="error")
+            return
+        yield sse_event("", event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,50 @@
+from app.models.gemma import Content, GemmaPayload
+
+__all__: list[str] = [
+    "estimate_content_tokens",
+    "estimate_payload_tokens",
+    "estimate_tokens",
+]
+
+# Rough number of tokens billed per inline image by the Gemini API.
+IMAGE_TOKENS = 258
+
+# Average characters per token of the Gemma/Gemini SentencePiece vocabulary on mixed
+# French/English medical text.
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN) -> int:
+    """
+    Estimate the number of tokens of a text from its length.
+    """
+    return max(1, round(len(text) / chars_per_token)) if text else 0
+
+
+def estimate_content_tokens(
+    content: Content, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN
+) -> int:
+    """
+    Estimate the number of tokens of a single turn, text and inline data included.
+    """
+    total = 0
+    for part in content.parts:
+        if part.text:
+            total += estimate_tokens(part.text, chars_per_token)
+        if part.inline_data:
+            total += IMAGE_TOKENS
+    return total
+
+
+def estimate_payload_tokens(
+    payload: GemmaPayload, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN
+) -> int:
+    """
+    Estimate the number of input tokens of a payload, text and inline data included.
+    """
+    total = sum(
+        estimate_content_tokens(content, chars_per_token) for content in payload.contents
+    )
+    if payload.system_instruction is not None:
+        total += estimate_content_tokens(payload.system_instruction, chars_per_token)
+    return total
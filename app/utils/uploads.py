@@ -0,0 +1,155 @@
+import base64
+import binascii
+from dataclasses import dataclass
+
+from starlette.datastructures import FormData, UploadFile
+from starlette.requests import Request
+from starlette.types import Message
+
+from app._exceptions import InvalidUploadError, UploadTooLargeError
+
+__all__: list[str] = [
+    "Upload",
+    "decode_base64_upload",
+    "is_multipart",
+    "limit_body",
+    "read_body",
+    "read_multipart",
+    "read_upload",
+]
+
+# MIME type of legacy base64 bodies without a ``data:`` header.
+DEFAULT_MIME_TYPE = "image/jpeg"
+
+
+@dataclass(frozen=True)
+class Upload:
+    """
+    An uploaded file, decoded to its raw bytes.
+    """
+
+    data: bytes
+    mime_type: str
+    filename: str | None = None
+
+
+def is_multipart(request: Request) -> bool:
+    return request.headers.get("content-type", "").startswith("multipart/form-data")
+
+
+def limit_body(request: Request, max_bytes: int) -> Request:
+    """
+    Return the request with a body reader that fails as soon as more than ``max_bytes``
+    have been received, so that oversized uploads are rejected while streaming instead of
+    after being buffered.
+
+    Raises:
+        UploadTooLargeError: If the declared ``Content-Length`` exceeds the limit.
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    received = 0
+
+    async def receive() -> Message:
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+        return message
+
+    return Request(request.scope, receive)
+
+
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Read the request body, failing as soon as it exceeds ``max_bytes``.
+
+    Raises:
+        UploadTooLargeError: If the body exceeds ``max_bytes``.
+    """
+    return await limit_body(request, max_bytes).body()
+
+
+async def read_multipart(request: Request, max_bytes: int) -> tuple[FormData, list[Upload]]:
+    """
+    Parse a ``multipart/form-data`` body and read its file parts.
+
+    Returns:
+        tuple[FormData, list[Upload]]: The form, for its text fields, and the uploaded files.
+
+    Raises:
+        UploadTooLargeError: If the body exceeds ``max_bytes``.
+    """
+    form = await limit_body(request, max_bytes).form()
+    uploads = []
+    for _, value in form.multi_items():
+        if isinstance(value, UploadFile):
+            uploads.append(
+                Upload(
+                    data=await value.read(),
+                    mime_type=value.content_type or "application/octet-stream",
+                    filename=value.filename,
+                )
+            )
+            await value.close()
+    return form, uploads
+
+
+def decode_base64_upload(body: bytes | str) -> Upload:
+    """
+    Decode a legacy base64 body, optionally prefixed with a ``data:<mime>;base64,`` header.
+    Whitespace and missing padding are tolerated.
+
+    Raises:
+        InvalidUploadError: If the body is not valid base64.
+    """
+    if isinstance(body, str):
+        body = body.encode("ascii", errors="replace")
+
+    mime_type = DEFAULT_MIME_TYPE
+    if body.startswith(b"data:"):
+        header, _, body = body.partition(b",")
+        mime_type = header[5:].split(b";")[0].decode("ascii", errors="replace")
+
+    body = b"".join(body.split())
+    try:
+        data = base64.b64decode(body + b"=" * (-len(body) % 4), validate=True)
+    except binascii.Error as e:
+        raise InvalidUploadError(e) from e
+    return Upload(data=data, mime_type=mime_type)
+
+
+async def read_upload(request: Request, max_bytes: int) -> Upload:
+    """
+    Read a single uploaded file, sent either as a ``multipart/form-data`` file part, as a
+    raw binary body (``image/*`` or ``application/octet-stream``) or, for compatibility,
+    as a base64 body of any other content type.
+
+    Args:
+        request (Request): The incoming request.
+        max_bytes (int): The maximum size of the request body.
+
+    Returns:
+        Upload: The decoded file.
+
+    Raises:
+        InvalidUploadError: If the body holds no file or invalid base64.
+        UploadTooLargeError: If the body exceeds ``max_bytes``.
+    """
+    if is_multipart(request):
+        _, uploads = await read_multipart(request, max_bytes)
+        if not uploads:
+            raise InvalidUploadError("The multipart body holds no file.")
+        return uploads[0]
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = await read_body(request, max_bytes)
+    if content_type.startswith("image/"):
+        return Upload(data=body, mime_type=content_type)
+    if content_type == "application/octet-stream":
+        return Upload(data=body, mime_type=DEFAULT_MIME_TYPE)
+    return decode_base64_upload(body)
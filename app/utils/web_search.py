@@ -1,27 +1,61 @@
-from googleapiclient.discovery import build
 from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.core.upstream_policy import get_circuit_breaker, upstream_timeout
+from app.utils.decorators import async_retry
+from app.utils.singleflight import SingleFlight
 
 __all__: list[str] = ["search"]
 
+search_flights = SingleFlight("cse")
 
-async def search(query: str, **kwargs) -> list[dict]:
+
+async def search(query: str, **kwargs: object) -> list[dict]:
     """
     Perform a web search using Google Custom Search API.
 
+    Concurrent identical searches share a single upstream call. Each caller receives its
+    own copy of the result items, which callers are free to mutate.
+
+    Args:
+        query: The query to search for.
+
+    Returns:
+        A list of search results.
+    """
+    key = (query, tuple(sorted(kwargs.items())))
+    items = await search_flights.do(key, lambda: _search(query, **kwargs))
+    return [dict(item) for item in items]
+
+
+@async_retry(
+    max_retries=settings.upstream_max_retries,
+    base_delay=settings.upstream_backoff_base,
+    max_delay=settings.upstream_backoff_max,
+    circuit_breaker=get_circuit_breaker("google_cse"),
+)
+async def _search(query: str, **kwargs: object) -> list[dict]:
+    """
+    Query the Google Custom Search JSON API.
+
+    The JSON API is called directly through the shared HTTP client so the search
+    reuses pooled connections instead of building a discovery service per call.
+
     Args:
         query: The query to search for.
 
     Returns:
         A list of search results.
     """
-    service = build("customsearch", "v1", developerKey=settings.api_key)
-    res = (
-        service.cse()
-        .list(
-            q=query,
-            cx=settings.google_cse_id,
+    client = get_http_client()
+    res = await client.get(
+        settings.google_cse_url,
+        params={
+            "key": settings.api_key,
+            "cx": settings.google_cse_id,
+            "q": query,
             **kwargs,
-        )
-        .execute()
+        },
+        timeout=upstream_timeout(),
     )
-    return res.get("items", [])
\ No newline at end of file
+    res.raise_for_status()
+    return res.json().get("items", [])
@@ -1,7 +1,9 @@
 import pytest
 from httpx import ASGITransport, AsyncClient
 
-from app.main import app
+from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.main import app, lifespan
 
 
 @pytest.mark.asyncio
@@ -11,3 +13,15 @@ async def test_app_starts_and_serves_docs():
     ) as ac:
         response = await ac.get("/docs")
     assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_lifespan_opens_and_closes_the_shared_http_client(monkeypatch):
+    monkeypatch.setattr(settings, "retrieval_warmup", False)
+
+    async with lifespan(app):
+        client = get_http_client()
+        assert not client.is_closed
+        assert get_http_client() is client
+
+    assert client.is_closed
@@ -0,0 +1,23 @@
+import pytest
+
+from app.utils.chat_post_processing import format_chat_response, normalize_chat_html
+
+
+def test_markdown_is_converted_to_front_end_html():
+    text = "## Résumé\nVotre **créatinine** est *normale*.\n\n* point un\n- point deux"
+
+    assert normalize_chat_html(text) == (
+        "<b>Résumé</b><br>Votre <b>créatinine</b> est normale.<br><br>"
+        "• point un<br>• point deux"
+    )
+
+
+def test_existing_html_is_preserved():
+    assert normalize_chat_html("Déjà <b>formaté</b><br/>ligne") == (
+        "Déjà <b>formaté</b><br>ligne"
+    )
+
+
+@pytest.mark.asyncio
+async def test_local_mode_does_not_call_the_llm():
+    assert await format_chat_response("a **b**", mode="local") == "a <b>b</b>"
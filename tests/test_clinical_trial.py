@@ -0,0 +1,60 @@
+import pytest
+
+from app.api.v1.endpoints.clinical_trial_router import merge_trial_results
+from app.core.clinical_trial import ClinicalTrialRetriever
+from app.core.embedding_batcher import EmbeddingBatcher
+
+TRIALS = {
+    "diabetes": ["NCT01", "NCT02"],
+    "obesity": ["NCT02", "NCT03"],
+}
+
+
+class Collection:
+    def __init__(self) -> None:
+        self.queries = []
+
+    def query(self, query_embeddings: list[list[float]], n_results: int) -> dict:
+        self.queries.append(query_embeddings)
+        ids = [TRIALS[embedding[0]][:n_results] for embedding in query_embeddings]
+        return {
+            "ids": ids,
+            "documents": [[f"Trial {id_}" for id_ in row] for row in ids],
+            "metadatas": [[{"nct_id": id_} for id_ in row] for row in ids],
+            "distances": [[0.1 * i for i in range(len(row))] for row in ids],
+            "uris": None,
+        }
+
+
+class Resources:
+    def __init__(self) -> None:
+        self.collection = Collection()
+        self.batches = []
+
+    def embed(self, texts: list[str]) -> list[list[str]]:
+        self.batches.append(list(texts))
+        return [[text] for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_many_queries_are_embedded_and_searched_at_once():
+    resources = Resources()
+    retriever = ClinicalTrialRetriever(
+        resources=resources, batcher=EmbeddingBatcher(resources.embed, window=0.01)
+    )
+    queries = ["diabetes", "obesity", "diabetes"]
+
+    results = await retriever.aretrieve_many(queries, n_results=2)
+
+    assert resources.batches == [["diabetes", "obesity"]]
+    assert len(resources.collection.queries) == 1
+    assert [[trial.id for trial in r.results] for r in results] == [
+        ["NCT01", "NCT02"],
+        ["NCT02", "NCT03"],
+        ["NCT01", "NCT02"],
+    ]
+
+    batch = merge_trial_results(queries, results, [None] * len(queries))
+    assert sorted(batch.trials) == ["NCT01", "NCT02", "NCT03"]
+    assert [match.id for match in batch.results[1].matches] == ["NCT02", "NCT03"]
+    assert batch.results[1].matches[0].distance == 0.0
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.core.context_cache import ContextCache, LocalContextCacheBackend
+from app.models.gemma import Content, GemmaPayload, Part
+
+INSTRUCTION = Content(role="user", parts=[Part(text="Be concise.")])
+
+
+def make_payload(prefix: str, question: str) -> GemmaPayload:
+    return GemmaPayload(
+        contents=[Content(role="user", parts=[Part(text=prefix + question)])],
+        systemInstruction=INSTRUCTION,
+    )
+
+
+async def apply(cache: ContextCache, prefix: str, question: str) -> GemmaPayload:
+    return await cache.apply(
+        make_payload(prefix, question), prefix, model="gemini-1.5-flash", key="patient"
+    )
+
+
+@pytest.mark.asyncio
+async def test_prefix_is_registered_once_and_expanded_before_sending():
+    backend = LocalContextCacheBackend()
+    cache = ContextCache(backend, min_tokens={"gemini-1.5-flash": 1})
+
+    first = await apply(cache, "record v1\n", "a?")
+    second = await apply(cache, "record v1\n", "b?")
+
+    assert first.cached_content == second.cached_content
+    assert second.contents[0].parts[0].text == "b?"
+    assert second.system_instruction is None
+    assert cache.stats()["created"] == 1
+    assert cache.stats()["reused"] == 1
+
+    expanded = cache.expand(second)
+    assert expanded.contents[0].parts[0].text == "record v1\n"
+    assert expanded.system_instruction == INSTRUCTION
+
+
+@pytest.mark.asyncio
+async def test_record_change_releases_the_previous_prefix_after_a_grace_period():
+    backend = LocalContextCacheBackend()
+    cache = ContextCache(backend, min_tokens={"gemini-1.5-flash": 1}, release_grace=0.05)
+
+    old = await apply(cache, "v1\n", "a?")
+    new = await apply(cache, "v2\n", "a?")
+
+    assert old.cached_content != new.cached_content
+    assert cache.stats()["invalidated"] == 1
+    # A request built just before the change can still be served.
+    assert cache.expand(old).contents[0].parts[0].text == "v1\n"
+
+    await asyncio.sleep(0.06)
+    await apply(cache, "v2\n", "b?")
+    assert list(backend.entries) == [new.cached_content]
+    assert cache.stats()["retired"] == 0
+
+
+@pytest.mark.asyncio
+async def test_refreshed_prefix_is_left_to_expire():
+    backend = LocalContextCacheBackend()
+    cache = ContextCache(backend, ttl=30.0, min_tokens={"gemini-1.5-flash": 1})
+
+    first = await apply(cache, "v1\n", "a?")
+    # The prefix expires within the refresh margin: it is registered again.
+    second = await apply(cache, "v1\n", "b?")
+
+    assert first.cached_content != second.cached_content
+    assert cache.stats()["retired"] == 0
+    assert cache.expand(first).contents[0].parts[0].text == "v1\n"
+
+
+@pytest.mark.asyncio
+async def test_unsupported_models_and_small_prefixes_are_sent_inline():
+    cache = ContextCache(LocalContextCacheBackend(), min_tokens={"gemini-1.5-flash": 1000})
+    payload = make_payload("record\n", "a?")
+
+    assert await cache.apply(payload, "record\n", "gemma-3-27b-it", "k") is payload
+    assert await cache.apply(payload, "record\n", "gemini-1.5-flash", "k") is payload
+    assert cache.stats()["inlined"] == 2
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.core.embedding_batcher import EmbeddingBatcher
+
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_are_encoded_in_batches():
+    calls = []
+
+    def embed(texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(embed, max_batch_size=4, window=0.05)
+    queries = ["a", "bb", "a", "ccc", "dddd", "eeeee"]
+    embeddings = await asyncio.gather(*(batcher.embed(query) for query in queries))
+
+    assert embeddings == [[1.0], [2.0], [1.0], [3.0], [4.0], [5.0]]
+    assert calls == [["a", "bb", "ccc", "dddd"], ["eeeee"]]
+    assert batcher.stats()["requests"] == 6
+    assert batcher.stats()["largest_batch"] == 4
+
+
+@pytest.mark.asyncio
+async def test_encoding_errors_reach_every_caller():
+    def embed(texts: list[str]) -> list[list[float]]:
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(embed, window=0.01)
+    results = await asyncio.gather(
+        batcher.embed("a"), batcher.embed("b"), return_exceptions=True
+    )
+
+    assert [str(result) for result in results] == ["model unavailable"] * 2
@@ -0,0 +1,117 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from app.core.embedding_batcher import EmbeddingBatcher
+from app.core.embedding_cache import EmbeddingCache
+
+
+def test_memory_tier_is_bounded_in_bytes():
+    cache = EmbeddingCache(model="test", max_bytes=2 * 4 * 4)
+    for text in ("a", "b", "c"):
+        cache.set(text, [1.0, 2.0, 3.0, 4.0])
+
+    assert cache.get("a") is None
+    assert cache.get(" b  ") is not None
+    assert cache.stats()["bytes"] == 32
+    assert cache.stats()["hits"] == 1
+
+
+def test_disk_tier_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "embeddings.npy")
+    worker = EmbeddingCache(model="test", path=path, disk_entries=8)
+    other_worker = EmbeddingCache(model="test", path=path, disk_entries=8)
+    other_model = EmbeddingCache(model="other", path=path, disk_entries=8)
+
+    assert other_worker.get("diabetes trials") is None
+    worker.set("diabetes trials", [0.5, 0.25])
+
+    assert np.array_equal(other_worker.get("diabetes  trials"), [0.5, 0.25])
+    assert other_worker.stats()["disk_hits"] == 1
+    assert other_model.get("diabetes trials") is None
+    for cache in (worker, other_worker, other_model):
+        cache.close()
+
+
+def test_file_is_created_once_and_workers_follow_its_replacement(tmp_path):
+    path = str(tmp_path / "embeddings.npy")
+    worker = EmbeddingCache(model="test", path=path, disk_entries=8)
+    other_worker = EmbeddingCache(model="test", path=path, disk_entries=8)
+
+    worker.set("asthma", [1.0, 2.0])
+    inode = os.stat(path).st_ino
+    other_worker.set("diabetes", [3.0, 4.0])
+    assert os.stat(path).st_ino == inode
+    assert np.array_equal(worker.get_from_disk("diabetes"), [3.0, 4.0])
+
+    # A new model dimension unlinks the file and creates another one.
+    new_model = EmbeddingCache(model="test", path=path, disk_entries=8)
+    new_model.set("obesity", [1.0, 2.0, 3.0])
+    assert os.stat(path).st_ino != inode
+    assert np.array_equal(worker.get_from_disk("obesity"), [1.0, 2.0, 3.0])
+    assert worker.get_from_disk("asthma") is None
+    assert sorted(os.listdir(tmp_path)) == ["embeddings.npy", "embeddings.npy.lock"]
+    for cache in (worker, other_worker, new_model):
+        cache.close()
+
+
+@pytest.mark.asyncio
+async def test_cached_queries_skip_the_model():
+    calls = []
+
+    def embed(texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(embed, window=0, cache=EmbeddingCache(model="test"))
+    await batcher.embed_many(["diabetes", "asthma"])
+    embeddings = await batcher.embed_many(["asthma", "diabetes", "obesity"])
+
+    assert [list(embedding) for embedding in embeddings] == [[6.0], [8.0], [7.0]]
+    assert calls == [["diabetes", "asthma"], ["obesity"]]
+
+
+def test_memory_lookups_do_not_wait_for_disk_writes(tmp_path):
+    cache = EmbeddingCache(model="test", path=str(tmp_path / "embeddings.npy"))
+    cache.set("asthma", [1.0])
+    writing = threading.Event()
+    done = threading.Event()
+
+    def slow_write() -> None:
+        with cache._disk_lock:
+            writing.set()
+            done.wait(5)
+
+    writer = threading.Thread(target=slow_write)
+    writer.start()
+    writing.wait(5)
+    try:
+        assert cache.get_in_memory("asthma") is not None
+        assert cache.get_in_memory("diabetes") is None
+    finally:
+        done.set()
+        writer.join()
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_batcher_reads_the_shared_file_of_other_workers(tmp_path):
+    path = str(tmp_path / "embeddings.npy")
+    other_worker = EmbeddingCache(model="test", path=path, disk_entries=8)
+    other_worker.set("asthma", [6.0])
+    cache = EmbeddingCache(model="test", path=path, disk_entries=8)
+
+    def embed(texts: list[str]) -> list[list[float]]:
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(embed, window=0, cache=cache)
+    embeddings = await batcher.embed_many(["asthma", "obesity"])
+
+    assert [list(embedding) for embedding in embeddings] == [[6.0], [7.0]]
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert batcher.stats()["texts"] == 1
+    for worker in (other_worker, cache):
+        worker.close()
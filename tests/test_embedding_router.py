@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from app.core import llm_router
+from app.core.embedding_router import EmbeddingRouter
+
+VOCABULARY = ["trial", "search", "result"]
+
+
+def embed(texts: list[str]) -> list[list[float]]:
+    # One axis per keyword, plus a constant one so that no vector is null.
+    return [
+        [float(text.lower().count(word)) for word in VOCABULARY] + [0.1] for text in texts
+    ]
+
+
+def make_router(tmp_path) -> EmbeddingRouter:
+    examples = tmp_path / "router_examples.json"
+    examples.write_text(
+        json.dumps(
+            {
+                "clinical_trials": ["Which trial can I join?", "Any trial for asthma?"],
+                "web_search": ["Search for a cardiologist.", "Search the web for clinics."],
+                "medgemma": ["Is my result normal?", "Explain my blood result."],
+            }
+        )
+    )
+    return EmbeddingRouter(
+        examples_path=str(examples), embedding_function=embed, confidence_threshold=0.2
+    )
+
+
+@pytest.mark.asyncio
+async def test_inputs_are_routed_to_the_nearest_centroid(tmp_path):
+    router = make_router(tmp_path)
+
+    assert await router.aclassify("Is there a trial for my diabetes?") == "clinical_trials"
+    assert await router.aclassify("Search for a hospital in Paris") == "web_search"
+    assert await router.aclassify("What does this result mean?") == "medgemma"
+    assert router.stats() == {"local_hits": 3, "escalations": 0}
+
+
+@pytest.mark.asyncio
+async def test_ambiguous_inputs_are_escalated(tmp_path):
+    router = make_router(tmp_path)
+
+    assert await router.aclassify("Search for a trial") is None
+    assert await router.aclassify("Hello") is None
+    assert router.stats() == {"local_hits": 0, "escalations": 2}
+
+
+@pytest.mark.asyncio
+async def test_classify_request_falls_back_to_the_llm(tmp_path, monkeypatch):
+    prompts = []
+
+    async def api_request(payload):
+        prompts.append(payload.contents[0].parts[0].text)
+        return {"status": "success", "data": "web_search"}
+
+    monkeypatch.setattr(llm_router.settings, "router_mode", "local")
+    monkeypatch.setattr(llm_router, "embedding_router", make_router(tmp_path))
+    monkeypatch.setattr(llm_router, "api_request", api_request)
+
+    assert await llm_router.classify_request("Any trial for asthma?") == "clinical_trials"
+    assert prompts == []
+
+    assert await llm_router.classify_request("Search for a trial") == "web_search"
+    assert len(prompts) == 1
+    assert "Search for a trial" in prompts[0]
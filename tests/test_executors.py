@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.executors import ExecutorPools
+from app.core.loop_monitor import LoopLagMonitor
+from app.core.web_scraper import extract_text
+
+
+@pytest.mark.asyncio
+async def test_blocking_work_runs_off_the_event_loop():
+    pools = ExecutorPools(io_workers=2, cpu_workers=2, process_workers=1)
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+
+    html = "<html><script>x()</script><p>Phase III  trial</p></html>"
+    _, text = await asyncio.gather(
+        pools.run_cpu(time.sleep, 0.2), pools.run_process(extract_text, html, "html.parser")
+    )
+    await monitor.close()
+    pools.close()
+
+    assert text == "Phase III\ntrial"
+    assert monitor.stats()["stalls"] == 0
+    assert pools.stats()["cpu"]["calls"] == 1
+    assert pools.stats()["process"]["calls"] == 1
+    assert pools.stats()["process"]["failures"] == 0
+
+
+def test_worker_processes_are_not_forked():
+    pools = ExecutorPools(io_workers=1, cpu_workers=1, process_workers=1)
+
+    executor = pools._get_executor("process")
+    pools.close()
+
+    assert executor._mp_context.get_start_method() == "spawn"
+
+
+@pytest.mark.asyncio
+async def test_monitor_reports_stalls():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)
+    await asyncio.sleep(0.02)
+    await monitor.close()
+
+    assert monitor.stats()["stalls"] == 1
+    assert monitor.stats()["max_ms"] >= 50
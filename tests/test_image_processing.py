@@ -0,0 +1,47 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from app.core.image_pipeline import ImagePipeline
+from app.utils.image_processing import preprocess_image
+
+
+def camera_photo(width: int, height: int, orientation: int) -> bytes:
+    image = Image.new("RGB", (width, height), (200, 30, 30))
+    exif = Image.Exif()
+    exif[274] = orientation
+    exif[271] = "Camera maker"
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=100, exif=exif)
+    return buffer.getvalue()
+
+
+def test_photo_is_oriented_downsized_and_stripped():
+    # Orientation 6: the camera was rotated, the stored image is landscape.
+    data = camera_photo(4000, 3000, orientation=6)
+
+    processed = preprocess_image(data, max_dimension=1000, quality=80)
+
+    assert (processed.width, processed.height) == (750, 1000)
+    assert processed.mime_type == "image/jpeg"
+    assert processed.size < processed.original_size == len(data)
+    with Image.open(io.BytesIO(processed.data)) as image:
+        assert image.size == (750, 1000)
+        assert not image.getexif()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_reports_bytes_and_passes_other_files_through():
+    pipeline = ImagePipeline(max_dimension=500)
+    photo = base64.b64encode(camera_photo(2000, 1000, orientation=1)).decode()
+
+    image_base64, mime_type = await pipeline.process_base64(photo, "image/png")
+    pdf = await pipeline.process_base64("JVBERi0x", "application/pdf")
+
+    assert mime_type == "image/jpeg"
+    assert len(image_base64) < len(photo)
+    assert pdf == ("JVBERi0x", "application/pdf")
+    assert pipeline.stats()["processed"] == 1
+    assert pipeline.stats()["bytes_out"] < pipeline.stats()["bytes_in"]
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app._enums import JobStatus
+from app._exceptions import QueueFullError
+from app.core.jobs import InMemoryJobQueueBackend, JobQueue, job_queues
+from app.core.scan import scan_jobs
+from app.models.jobs import Job
+
+
+async def wait_until_finished(queue: JobQueue, job_id: str):
+    for _ in range(100):
+        job = await queue.get(job_id)
+        if job.finished_at is not None:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+@pytest.mark.asyncio
+async def test_jobs_report_their_result_or_error():
+    async def handler(value: int) -> dict:
+        if value < 0:
+            raise HTTPException(status_code=400, detail="negative")
+        return {"double": value * 2}
+
+    queue = JobQueue("test-results", handler, InMemoryJobQueueBackend(max_size=4))
+    ok = await queue.submit(value=21)
+    ko = await queue.submit(value=-1)
+
+    assert ok.status == JobStatus.QUEUED
+    assert (await wait_until_finished(queue, ok.id)).result == {"double": 42}
+    failed = await wait_until_finished(queue, ko.id)
+    assert failed.status == JobStatus.FAILED
+    assert failed.error == {"status_code": 400, "detail": "negative"}
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_submissions():
+    release = asyncio.Event()
+
+    async def handler() -> None:
+        await release.wait()
+
+    queue = JobQueue("test-backpressure", handler, InMemoryJobQueueBackend(max_size=1), workers=1)
+    running = await queue.submit()
+    await asyncio.sleep(0)
+    await queue.submit()
+
+    with pytest.raises(QueueFullError):
+        await queue.submit()
+    assert queue.stats()["rejected"] == 1
+
+    release.set()
+    assert (await wait_until_finished(queue, running.id)).status == JobStatus.SUCCEEDED
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_expire_behind_a_long_running_job():
+    backend = InMemoryJobQueueBackend(max_size=4, ttl=60.0)
+    now = time.time()
+    long_job = Job(id="long", created_at=now - 120)
+    short_job = Job(id="short", created_at=now - 110)
+    for job in (long_job, short_job):
+        await backend.put(job, {})
+
+    await backend.save(short_job.model_copy(update={"finished_at": now - 100}))
+    await backend.save(long_job.model_copy(update={"finished_at": now}))
+
+    assert await backend.load("short") is None
+    assert await backend.load("long") is not None
+
+
+def test_queues_are_not_registered_for_metrics_implicitly():
+    async def handler() -> None:
+        pass
+
+    JobQueue("test-unregistered", handler, InMemoryJobQueueBackend(max_size=1))
+    assert "test-unregistered" not in job_queues
+    assert job_queues["scan"] is scan_jobs
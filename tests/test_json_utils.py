@@ -0,0 +1,46 @@
+from app.models.scan import PatientRecord
+from app.utils.json_utils import merge_model_data
+
+CURRENT = {
+    "medical_history": {"conditions": ["Arterial hypertension"], "surgeries": None},
+    "allergies": [{"substance": "Penicillin", "reaction": "skin rash"}],
+    "lab_results": [
+        {
+            "date": "2024-02-15",
+            "sodium_mmol_per_L": 134,
+            "potassium_mmol_per_L": None,
+            "creatinine_umol_per_L": 89,
+        }
+    ],
+}
+
+
+def test_rescanning_the_same_document_changes_nothing():
+    merged, report = merge_model_data(CURRENT, CURRENT, PatientRecord)
+
+    assert merged == CURRENT
+    assert not report.changed
+
+
+def test_items_are_upserted_on_their_natural_key():
+    patch = {
+        "medical_history": {"conditions": ["arterial  Hypertension", "Asthma"]},
+        "allergies": [{"substance": "PENICILLIN", "reaction": None}],
+        "lab_results": [
+            {"date": "2024-02-15", "potassium_mmol_per_L": "4.4"},
+            {"date": "2024-06-01", "sodium_mmol_per_L": 140},
+        ],
+        "unknown": 1,
+    }
+    merged, report = merge_model_data(CURRENT, patch, PatientRecord)
+
+    assert merged["medical_history"]["conditions"] == ["Arterial hypertension", "Asthma"]
+    assert merged["allergies"] == CURRENT["allergies"]
+    assert [result["date"] for result in merged["lab_results"]] == ["2024-02-15", "2024-06-01"]
+    assert merged["lab_results"][0]["potassium_mmol_per_L"] == 4.4
+    assert merged["lab_results"][0]["sodium_mmol_per_L"] == 134
+    assert report.inserted == ["medical_history.conditions[Asthma]", "lab_results[2024-06-01]"]
+    assert report.updated == ["lab_results[2024-02-15]"]
+    assert "unknown" in report.ignored
+    assert CURRENT["lab_results"][0]["potassium_mmol_per_L"] is None
+    PatientRecord.model_validate(merged)
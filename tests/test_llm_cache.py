@@ -0,0 +1,58 @@
+import pytest
+
+from app.core.llm_cache import LLMCache
+from app.models.gemma import Content, GemmaPayload, Part
+
+
+def make_payload(text: str) -> GemmaPayload:
+    return GemmaPayload(contents=[Content(role="user", parts=[Part(text=text)])])
+
+
+def test_key_is_stable_and_content_addressed():
+    key = LLMCache.make_key("gemma-3-27b-it", "generateContent", make_payload("a"))
+    assert key == LLMCache.make_key("gemma-3-27b-it", "generateContent", make_payload("a"))
+    assert key != LLMCache.make_key("gemma-3-27b-it", "generateContent", make_payload("b"))
+    assert key != LLMCache.make_key("gemini-1.5-flash", "generateContent", make_payload("a"))
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_counters():
+    cache = LLMCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        await cache.set(key, "m", {"data": key})
+
+    assert await cache.get("a", "m") is None
+    assert (await cache.get("c", "m"))["data"] == "c"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_callers_cannot_mutate_cached_responses():
+    cache = LLMCache()
+    response = {"data": "a", "usage": {"tokens_in": 3, "tokens_out": 1}}
+    await cache.set("a", "m", response)
+    response["usage"]["tokens_out"] = 99
+    (await cache.get("a", "m"))["usage"]["tokens_in"] = 99
+
+    assert (await cache.get("a", "m"))["usage"] == {"tokens_in": 3, "tokens_out": 1}
+
+
+@pytest.mark.asyncio
+async def test_model_ttl_zero_disables_caching():
+    cache = LLMCache(model_ttls={"m": 0})
+    await cache.set("a", "m", {"data": "a"})
+    assert await cache.get("a", "m") is None
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMCache(sqlite_path=path)
+    await cache.set("a", "m", {"data": "a"})
+    cache.close()
+
+    restarted = LLMCache(sqlite_path=path)
+    assert (await restarted.get("a", "m"))["data"] == "a"
+    assert restarted.stats()["disk_hits"] == 1
+    restarted.close()
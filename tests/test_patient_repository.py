@@ -0,0 +1,79 @@
+import pytest
+
+from app._exceptions import PatientNotFoundError, VersionConflictError
+from app.core.patient_repository import PatientRepository
+from app.models.scan import LabResult, PatientRecord
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = PatientRepository(str(tmp_path / "patients.db"))
+    yield repository
+    repository.close()
+
+
+def lab_results(*dates: str) -> PatientRecord:
+    return PatientRecord(lab_results=[LabResult(date=date) for date in dates])
+
+
+@pytest.mark.asyncio
+async def test_versions_and_optimistic_concurrency(repository):
+    created = await repository.save("p1", lab_results("2024-01-01"), expected_version=0)
+    updated = await repository.save("p1", lab_results(), expected_version=created.version)
+
+    with pytest.raises(VersionConflictError):
+        await repository.save("p1", lab_results(), expected_version=created.version)
+    with pytest.raises(PatientNotFoundError):
+        await repository.get("p2")
+
+    assert (await repository.get("p1")).version == updated.version == 2
+    assert [entry["version"] for entry in await repository.history("p1")] == [1, 2]
+    old = await repository.get_version("p1", 1)
+    assert old.record.lab_results[0].date == "2024-01-01"
+
+
+@pytest.mark.asyncio
+async def test_collections_are_queried_by_date(repository):
+    await repository.save("p1", lab_results("2023-05-01", "2024-02-15", "2024-06-30"))
+
+    recent = await repository.collection("p1", "lab_results", since="2024-01-01")
+    assert [item["date"] for item in recent] == ["2024-06-30", "2024-02-15"]
+    assert len(await repository.collection("p1", "lab_results", limit=1)) == 1
+    assert await repository.collection("p1", "imaging") == []
+
+
+@pytest.mark.asyncio
+async def test_update_applies_the_change_to_the_latest_version(repository):
+    await repository.save("p1", lab_results("2024-01-01"))
+
+    def add_result(data):
+        data["lab_results"].append({"date": "2024-02-01"})
+        return data
+
+    snapshot = await repository.update("p1", add_result)
+    assert snapshot.version == 2
+    assert len(snapshot.record.lab_results) == 2
+
+
+@pytest.mark.asyncio
+async def test_patches_are_journaled_and_past_versions_rebuilt(repository):
+    await repository.save("p1", lab_results("2024-01-01"))
+    await repository.apply_patch("p1", {"lab_results": [{"date": "2024-02-01"}]}, "scan:a")
+    await repository.apply_patch("p1", {"lab_results": [{"date": "2024-03-01"}]}, "scan:b")
+
+    _, report = await repository.apply_patch(
+        "p1", {"lab_results": [{"date": "2024-03-01"}]}, "scan:b"
+    )
+    assert not report.changed
+    assert [entry["source"] for entry in await repository.journal("p1")] == ["scan:a", "scan:b"]
+    dates = [item["date"] for item in await repository.collection("p1", "lab_results")]
+    assert dates == ["2024-03-01", "2024-02-01", "2024-01-01"]
+
+    assert await repository.compact(min_patches=2) == 1
+    middle = await repository.get_version("p1", 2)
+    assert [result.date for result in middle.record.lab_results] == ["2024-01-01", "2024-02-01"]
+    assert [entry["source"] for entry in await repository.history("p1")] == [
+        None,
+        "scan:a",
+        "scan:b",
+    ]
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from app.core.patient_store import JOURNAL_KEY, PatientRecordStore
+
+
+@pytest.fixture
+def record_path(tmp_path):
+    path = tmp_path / "patient.json"
+    path.write_text(json.dumps({"allergies": [{"substance": "Penicillin"}]}))
+    return path
+
+
+@pytest.mark.asyncio
+async def test_record_is_cached_until_the_file_changes(record_path):
+    store = PatientRecordStore(str(record_path))
+
+    first = await store.get()
+    assert await store.get() is first
+    assert store.stats()["loads"] == 1
+
+    record_path.write_text(json.dumps({"allergies": []}))
+    os.utime(record_path, ns=(0, 1))
+    reloaded = await store.get()
+    assert reloaded.data["allergies"] == []
+    assert reloaded.version > first.version
+    assert json.loads(reloaded.json) == reloaded.data
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_are_not_lost(record_path):
+    store = PatientRecordStore(str(record_path))
+
+    def add(substance):
+        def change(data):
+            data["allergies"].append({"substance": substance})
+            return data
+
+        return change
+
+    await asyncio.gather(*(store.update(add(f"S{i}")) for i in range(5)))
+
+    on_disk = json.loads(record_path.read_text())
+    on_disk.pop(JOURNAL_KEY)
+    assert len(on_disk["allergies"]) == 6
+    assert (await store.get()).data == on_disk
+    assert not [name for name in os.listdir(record_path.parent) if name.endswith(".tmp")]
+
+
+@pytest.mark.asyncio
+async def test_patches_are_journaled_replayed_and_compacted(record_path):
+    store = PatientRecordStore(str(record_path))
+    before = record_path.read_text()
+
+    for i in range(3):
+        await store.apply_patch({"allergies": [{"substance": f"S{i}"}]}, f"scan:{i}")
+
+    assert record_path.read_text() == before
+    assert [entry["source"] for entry in await store.journal()] == ["scan:0", "scan:1", "scan:2"]
+
+    replayed = await PatientRecordStore(str(record_path)).get()
+    assert replayed.data == (await store.get()).data
+    assert len(replayed.data["allergies"]) == 4
+
+    assert await store.compact()
+    assert not await store.compact()
+    compacted = PatientRecordStore(str(record_path))
+    assert (await compacted.get()).data == replayed.data
+    assert compacted.stats()["pending_patches"] == 0
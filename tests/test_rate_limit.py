@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from app._enums import Priority
+from app._exceptions import RateLimitExceededError
+from app.core import api_request as api_request_module
+from app.core.admission import ModelLimiter
+from app.core.config import ModelLimits, settings
+from app.models.gemma import Content, GemmaPayload, Part
+from app.utils.rate_limit import PriorityLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_by_priority_then_arrival():
+    limiter = PriorityLimiter(1)
+    await limiter.acquire()
+    served = []
+
+    async def wait(name: str, priority: int) -> None:
+        await limiter.acquire(priority)
+        served.append(name)
+        limiter.release()
+
+    waiters = [
+        asyncio.create_task(wait("background", Priority.BACKGROUND)),
+        asyncio.create_task(wait("interactive-1", Priority.INTERACTIVE)),
+        asyncio.create_task(wait("interactive-2", Priority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    assert limiter.queued == 3
+
+    limiter.release()
+    await asyncio.gather(*waiters)
+
+    assert served == ["interactive-1", "interactive-2", "background"]
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_timed_out_waiter_does_not_take_a_slot():
+    limiter = PriorityLimiter(1)
+    await limiter.acquire()
+
+    with pytest.raises(TimeoutError):
+        await limiter.acquire(timeout=0.01)
+
+    limiter.release()
+    assert limiter.in_flight == 0
+    assert limiter.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_bucket_refuses_waits_beyond_the_timeout():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    await bucket.take(2)
+
+    with pytest.raises(TimeoutError):
+        await bucket.take(1, timeout=0.1)
+    await bucket.take(1, timeout=1.5)
+    assert bucket.available() < 1
+
+
+@pytest.mark.asyncio
+async def test_model_limiter_rejects_when_saturated():
+    limiter = ModelLimiter("gemini-test", ModelLimits(max_in_flight=1, rpm=60))
+
+    async with limiter.admit(10):
+        with pytest.raises(RateLimitExceededError):
+            async with limiter.admit(10, timeout=0.01):
+                pass
+
+    assert limiter.stats()["admitted"] == 1
+    assert limiter.stats()["rejected"] == 1
+    assert limiter.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_api_request_lets_rate_limit_errors_propagate(monkeypatch):
+    limiter = ModelLimiter("gemini-test", ModelLimits(max_in_flight=1))
+    monkeypatch.setattr(
+        api_request_module,
+        "admit",
+        lambda model, tokens, priority: limiter.admit(tokens, priority, timeout=0.01),
+    )
+    payload = GemmaPayload(
+        contents=[Content(role="user", parts=[Part(text="Bonjour", inlineData=None)])]
+    )
+
+    async with limiter.admit(1):
+        with pytest.raises(RateLimitExceededError):
+            await api_request_module.api_request(
+                payload, model="gemini-test", use_cache=False
+            )
+
+
+@pytest.mark.asyncio
+async def test_bucket_waits_follow_priority_without_holding_slots():
+    limiter = ModelLimiter("gemini-test", ModelLimits(tpm=6000, max_in_flight=1))
+    await limiter.tokens.take(6000)
+    admitted = []
+
+    async def request(name: str, priority: Priority) -> None:
+        async with limiter.admit(10, priority, timeout=5):
+            admitted.append(name)
+
+    first = asyncio.create_task(request("first", Priority.INTERACTIVE))
+    await asyncio.sleep(0)
+    background = asyncio.create_task(request("background", Priority.BACKGROUND))
+    interactive = asyncio.create_task(request("interactive", Priority.INTERACTIVE))
+    await asyncio.sleep(0.01)
+    # Waiting for the bucket to refill does not take an in-flight slot.
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["queued"] == 2
+
+    await asyncio.gather(first, background, interactive)
+    assert admitted == ["first", "interactive", "background"]
+
+
+@pytest.mark.asyncio
+async def test_requests_above_the_token_limit_are_rejected_at_once():
+    limiter = ModelLimiter("gemini-test", ModelLimits(tpm=1000))
+
+    with pytest.raises(RateLimitExceededError) as error:
+        async with limiter.admit(1001, timeout=5):
+            pass
+    assert "tokens-per-minute" in error.value.details["reason"]
+
+
+def test_default_context_budgets_fit_the_token_limits():
+    for model, budget in settings.model_context_budgets.items():
+        limits = settings.model_limits.get(model)
+        assert limits is None or not limits.tpm or budget <= limits.tpm
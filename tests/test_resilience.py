@@ -0,0 +1,115 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app._exceptions import CircuitOpenError
+from app.utils.resilience import (
+    CircuitBreaker,
+    deadline_scope,
+    retry_after_seconds,
+    retry_async,
+)
+
+
+def status_error(status_code: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://upstream.test")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return httpx.HTTPStatusError("upstream error", request=request, response=response)
+
+
+def test_retry_after_header_is_parsed():
+    assert retry_after_seconds(status_error(429, {"Retry-After": "2"})) == 2.0
+    assert retry_after_seconds(status_error(503)) is None
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors_then_succeeds():
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        if calls < 3:
+            raise status_error(503)
+        return "ok"
+
+    assert await retry_async(flaky, base_delay=0.001) == "ok"
+    assert calls == 3
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    calls = 0
+
+    async def bad_request():
+        nonlocal calls
+        calls += 1
+        raise status_error(400)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await retry_async(bad_request, base_delay=0.001)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_never_sleeps_past_the_deadline():
+    async def throttled():
+        raise status_error(429, {"Retry-After": "30"})
+
+    with deadline_scope(1.0), pytest.raises(httpx.HTTPStatusError):
+        await retry_async(throttled)
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_fails_fast():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+    async def down():
+        raise httpx.ConnectError("down")
+
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            await retry_async(down, max_retries=0, circuit_breaker=breaker)
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await retry_async(down, max_retries=0, circuit_breaker=breaker)
+
+
+@pytest.mark.asyncio
+async def test_probe_is_released_on_every_exit_path():
+    breaker = CircuitBreaker("test-probe", failure_threshold=1, reset_timeout=0.01)
+    started = asyncio.Event()
+
+    async def down():
+        raise httpx.ConnectError("down")
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def bad_request():
+        raise status_error(400)
+
+    async def ok():
+        return "ok"
+
+    with pytest.raises(httpx.ConnectError):
+        await retry_async(down, max_retries=0, circuit_breaker=breaker)
+    await asyncio.sleep(0.02)
+
+    # A cancelled probe (e.g. a discarded speculation) re-opens the circuit.
+    probe = asyncio.create_task(retry_async(hang, circuit_breaker=breaker))
+    await started.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert not breaker.probing
+    await asyncio.sleep(0.02)
+
+    # A client error proves the upstream is answering and closes it.
+    with pytest.raises(httpx.HTTPStatusError):
+        await retry_async(bad_request, circuit_breaker=breaker)
+    assert breaker.state == "closed"
+    assert await retry_async(ok, circuit_breaker=breaker) == "ok"
@@ -0,0 +1,37 @@
+import pytest
+
+from app._enums import ResourceState
+from app._exceptions import RetrievalUnavailableError
+from app.core.embedding_router import EmbeddingRouter
+from app.core.resources import RetrievalResources
+
+
+def resources(enabled: bool = True) -> RetrievalResources:
+    return RetrievalResources(
+        enabled=enabled,
+        chroma_path="chromadb",
+        collection_name="clinical_trials",
+        embedding_model="unused",
+    )
+
+
+def test_disabled_retrieval_is_ready_without_loading_anything():
+    disabled = resources(enabled=False)
+
+    assert disabled.readiness()["state"] == ResourceState.DISABLED
+    with pytest.raises(RetrievalUnavailableError):
+        disabled.embed(["query"])
+
+
+@pytest.mark.asyncio
+async def test_router_escalates_while_the_model_is_not_loaded():
+    cold = resources()
+    router = EmbeddingRouter(
+        examples_path="unused.json",
+        embedding_function=cold.embed,
+        available=lambda: cold.ready,
+    )
+
+    assert await router.aclassify("Quels essais cliniques pour mon diabète ?") is None
+    assert cold.state == ResourceState.COLD
+    assert router.stats() == {"local_hits": 0, "escalations": 1}
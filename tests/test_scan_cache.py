@@ -0,0 +1,121 @@
+import base64
+import io
+import shutil
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.core import scan
+from app.core.image_pipeline import image_pipeline
+from app.core.patient_store import PatientRecordStore
+from app.core.scan_cache import ScanFingerprintCache
+from app.utils.image_processing import preprocess_image
+
+PATCH = {"allergies": [{"substance": "Penicillin"}]}
+
+
+def lab_report(date: str, sodium: int, potassium: float, creatinine: int) -> bytes:
+    image = Image.new("RGB", (1200, 1600), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((100, 100, 1100, 220), "black")
+    lines = [
+        "LABORATOIRE CENTRAL - BIOCHIMIE",
+        f"Date: {date}",
+        f"Sodium: {sodium} mmol/L",
+        f"Potassium: {potassium} mmol/L",
+        f"Creatinine: {creatinine} umol/L",
+    ]
+    for i, line in enumerate(lines):
+        draw.text((120, 300 + 80 * i), line, fill="black", font_size=40)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def reencode(data: bytes) -> bytes:
+    # Another upload of the same page: smaller and more compressed.
+    image = Image.open(io.BytesIO(data)).resize((900, 1200))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=60)
+    return buffer.getvalue()
+
+
+def dhash(data: bytes) -> int:
+    return preprocess_image(data, max_dimension=1600).dhash
+
+
+def test_only_identical_uploads_are_reused_by_default():
+    page = lab_report("2026-01-05", 140, 4.1, 90)
+    cache = ScanFingerprintCache()
+    cache.set("scan:p1", "sha-page", dhash(page), PATCH)
+
+    assert cache.get("scan:p1", "sha-page") == PATCH
+    assert cache.get("scan:p1", "sha-photo") is None
+    assert cache.get_similar("scan:p1", dhash(reencode(page))) is None
+    assert cache.get("scan:p2", "sha-page") is None
+    assert cache.stats() == {"hits": 1, "similar_hits": 0, "misses": 1, "entries": 1}
+
+
+def test_near_identical_uploads_are_reused_when_enabled():
+    page = lab_report("2026-01-05", 140, 4.1, 90)
+    cache = ScanFingerprintCache(max_distance=2)
+    cache.set("scan:p1", "sha-page", dhash(page), PATCH)
+
+    assert cache.get("scan:p1", "sha-photo") is None
+    assert cache.get_similar("scan:p1", dhash(reencode(page))) == PATCH
+    assert cache.get_similar("scan:p2", dhash(reencode(page))) is None
+    assert cache.get_similar("scan:p1", None) is None
+    assert cache.stats() == {"hits": 0, "similar_hits": 1, "misses": 2, "entries": 1}
+
+
+@pytest.mark.asyncio
+async def test_reports_from_the_same_template_are_each_extracted(tmp_path, monkeypatch):
+    record = tmp_path / "patient.json"
+    shutil.copy("app/assets/patient.json", record)
+    monkeypatch.setattr(scan, "patient_store", PatientRecordStore(str(record)))
+    monkeypatch.setattr(scan, "scan_cache", ScanFingerprintCache())
+    monkeypatch.setattr(image_pipeline, "enabled", False)
+
+    reports = {
+        lab_report("2026-01-05", 140, 4.1, 90): ("2026-01-05", 140, 4.1, 90),
+        lab_report("2026-03-12", 131, 5.2, 132): ("2026-03-12", 131, 5.2, 132),
+    }
+    extracted = []
+
+    async def extract_scan_data(patient_data, image_base64, mime_type, cache_key):
+        date, sodium, potassium, creatinine = reports[base64.b64decode(image_base64)]
+        extracted.append(date)
+        return {
+            "lab_results": [
+                {
+                    "date": date,
+                    "sodium_mmol_per_L": sodium,
+                    "potassium_mmol_per_L": potassium,
+                    "creatinine_umol_per_L": creatinine,
+                }
+            ]
+        }
+
+    monkeypatch.setattr(scan, "extract_scan_data", extract_scan_data)
+    for report in reports:
+        data = await scan.process_scan(report)
+    await scan.process_scan(next(iter(reports)))
+
+    assert extracted == ["2026-01-05", "2026-03-12"]
+    latest = next(lab for lab in data["lab_results"] if lab["date"] == "2026-03-12")
+    assert latest["sodium_mmol_per_L"] == 131
+
+
+def test_eviction_policies():
+    lru = ScanFingerprintCache(max_entries=2, eviction="lru")
+    fifo = ScanFingerprintCache(max_entries=2, eviction="fifo")
+    for cache in (lru, fifo):
+        cache.set("scan", "a", None, {"a": 1})
+        cache.set("scan", "b", None, {"b": 1})
+        cache.get("scan", "a")
+        cache.set("scan", "c", None, {"c": 1})
+
+    assert lru.get("scan", "a") == {"a": 1}
+    assert lru.get("scan", "b") is None
+    assert fifo.get("scan", "a") is None
+    assert fifo.get("scan", "b") == {"b": 1}
@@ -0,0 +1,143 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.api.v1.endpoints import sessions
+from app.core.sessions import SessionStore
+from app.core.token_budget import CompactionResult
+from app.main import app
+
+
+@pytest.fixture
+def store(monkeypatch) -> SessionStore:
+    store = SessionStore(max_sessions=2)
+    prompts = []
+    introductions = []
+
+    async def classify_request(message: str) -> str:
+        return "web_search" if message.startswith("Cherche") else "medgemma"
+
+    async def medgemma_introduction() -> str:
+        introductions.append(len(prompts))
+        return "Dossier médical.\n"
+
+    async def other_route(route, input_data, user_input):
+        return sessions.Response(content=f"Résultats pour {user_input}")
+
+    async def api_request(payload):
+        prompts.append([content.parts[0].text for content in payload.contents])
+        return {"status": "success", "data": f"Réponse {len(prompts)}"}
+
+    async def format_chat_response(text: str) -> str:
+        return text
+
+    monkeypatch.setattr(sessions, "session_store", store)
+    monkeypatch.setattr(sessions, "classify_request", classify_request)
+    monkeypatch.setattr(sessions, "medgemma_introduction", medgemma_introduction)
+    monkeypatch.setattr(sessions, "api_request", api_request)
+    monkeypatch.setattr(sessions, "format_chat_response", format_chat_response)
+    monkeypatch.setattr(sessions, "other_route", other_route)
+    store.prompts = prompts
+    store.introductions = introductions
+    return store
+
+
+def client() -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_turns_are_appended_to_the_session(store):
+    async with client() as ac:
+        created = await ac.post("/api/v1/chat/sessions")
+        session_id = created.json()["session_id"]
+        first = await ac.post(
+            f"/api/v1/chat/sessions/{session_id}/messages", json={"message": "Bonjour"}
+        )
+        second = await ac.post(
+            f"/api/v1/chat/sessions/{session_id}/messages", json={"message": "Et ensuite ?"}
+        )
+        history = await ac.get(f"/api/v1/chat/sessions/{session_id}")
+
+    assert created.status_code == 201
+    assert (first.text, second.text) == ("Réponse 1", "Réponse 2")
+    # Only the first user turn carries the medical file.
+    assert store.prompts[-1] == ["Dossier médical.\nBonjour", "Réponse 1", "Et ensuite ?"]
+    assert [entry["message"] for entry in history.json()["conversation"]] == [
+        "Bonjour",
+        "Réponse 1",
+        "Et ensuite ?",
+        "Réponse 2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_introduction_is_rendered_only_when_it_is_sent(store):
+    async with client() as ac:
+        session_id = (await ac.post("/api/v1/chat/sessions")).json()["session_id"]
+        url = f"/api/v1/chat/sessions/{session_id}/messages"
+        await ac.post(url, json={"message": "Cherche un cardiologue"})
+        await ac.post(url, json={"message": "Cherche une clinique"})
+        await ac.post(url, json={"message": "Et mes résultats ?"})
+
+    # The first turn carries the file; later turns render it for the medgemma route only.
+    assert len(store.introductions) == 2
+    assert store.prompts[-1][0] == "Dossier médical.\nCherche un cardiologue"
+
+
+@pytest.mark.asyncio
+async def test_summary_is_kept_only_when_the_turn_is_answered(store, monkeypatch):
+    class Compactor:
+        @classmethod
+        def for_model(cls):
+            return cls()
+
+        async def compact(self, contents, summary=None, summarized=0):
+            return CompactionResult(
+                contents=contents[-1:], summary="Résumé", summarized=2, tokens_estimate=10
+            )
+
+    responses = iter([{"status": "error", "data": None}, {"status": "success", "data": "Oui"}])
+
+    async def api_request(payload):
+        return next(responses)
+
+    monkeypatch.setattr(sessions, "ConversationCompactor", Compactor)
+    monkeypatch.setattr(sessions, "api_request", api_request)
+    session = await store.create()
+    async with client() as ac:
+        url = f"/api/v1/chat/sessions/{session.id}/messages"
+        failed = await ac.post(url, json={"message": "Bonjour"})
+        assert (session.summary, session.summarized) == (None, 0)
+        answered = await ac.post(url, json={"message": "Bonjour"})
+
+    assert failed.status_code == 500
+    assert answered.status_code == 200
+    assert (session.summary, session.summarized) == ("Résumé", 2)
+
+
+@pytest.mark.asyncio
+async def test_unknown_sessions_are_not_found_and_leave_no_lock(store):
+    async with client() as ac:
+        for i in range(3):
+            response = await ac.post(
+                f"/api/v1/chat/sessions/unknown-{i}/messages", json={"message": "Bonjour"}
+            )
+            assert response.status_code == 404
+        assert (await ac.get("/api/v1/chat/sessions/unknown-0")).status_code == 404
+
+    assert store._locks == {}
+    assert store.prompts == []
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_sessions_are_evicted(store):
+    first, second = await store.create(), await store.create()
+    for session in (first, second):
+        async with store.turn(session.id) as locked:
+            assert locked is session
+    third = await store.create()
+
+    assert await store.get(first.id) is None
+    assert await store.get(second.id) is second
+    assert await store.get(third.id) is third
+    assert first.id not in store._locks
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.core import api_request as api_request_module
+from app.models.gemma import Content, GemmaPayload, Part
+from app.utils.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    flights = SingleFlight("test-shared")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert flights.stats() == {"executed": 1, "shared": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_failures_are_shared_and_not_cached():
+    flights = SingleFlight("test-failure")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    results = await asyncio.gather(
+        flights.do("key", fail), flights.do("key", fail), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def succeed():
+        return "ok"
+
+    assert await flights.do("key", succeed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_waiter_does_not_cancel_the_shared_call():
+    flights = SingleFlight("test-cancel")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.create_task(flights.do("key", work))
+    second = asyncio.create_task(flights.do("key", work))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
+
+
+@pytest.mark.asyncio
+async def test_shared_call_is_cancelled_when_every_waiter_is_gone():
+    flights = SingleFlight("test-abandon")
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(10)
+
+    waiter = asyncio.create_task(flights.do("key", work))
+    await started.wait()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert flights.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesced_llm_responses_are_independent_copies(monkeypatch):
+    calls = 0
+
+    async def generate(response, payload, model, method, priority):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {**response, "data": "Bonjour", "usage": {"tokens_in": 3, "tokens_out": 1}}
+
+    monkeypatch.setattr(api_request_module, "_generate", generate)
+    monkeypatch.setattr(api_request_module.settings, "llm_cache_enabled", False)
+    payload = GemmaPayload(
+        contents=[Content(role="user", parts=[Part(text="Bonjour", inlineData=None)])]
+    )
+
+    first, second = await asyncio.gather(
+        api_request_module.api_request(payload, model="gemini-test"),
+        api_request_module.api_request(payload, model="gemini-test"),
+    )
+    first["usage"]["tokens_out"] = 99
+
+    assert calls == 1
+    assert second["usage"] == {"tokens_in": 3, "tokens_out": 1}
@@ -0,0 +1,88 @@
+import json
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app._exceptions import CompletionError
+from app.core import api_request as api_request_module
+from app.models.gemma import Content, GemmaPayload, Part
+from app.utils.sse import sse_response
+
+
+def parse_events(body: str) -> list[tuple[str, str]]:
+    events = []
+    for block in body.split("\n\n"):
+        if not block:
+            continue
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+async def stream(chunks: list[str], error: Exception | None = None) -> list[tuple[str, str]]:
+    async def produce() -> AsyncIterator[str]:
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+
+    async def endpoint(request: Request) -> StreamingResponse:
+        return sse_response(produce())
+
+    app = Starlette(routes=[Route("/stream", endpoint)])
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/stream")
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return parse_events(response.text)
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_framed_as_events_and_the_stream_ends_with_done():
+    events = await stream(["Bonjour,\n\nvoici", " la réponse."])
+
+    # Newlines inside a chunk must not end the event early.
+    assert events == [
+        ("message", "Bonjour,\n\nvoici"),
+        ("message", " la réponse."),
+        ("done", ""),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failures_mid_stream_end_with_an_error_event():
+    events = await stream(["Bonjour"], CompletionError("503: unavailable"))
+
+    assert events[0] == ("message", "Bonjour")
+    assert events[-1][0] == "error"
+    assert "503: unavailable" in events[-1][1]
+    assert "done" not in [event for event, _ in events]
+
+
+@pytest.mark.asyncio
+async def test_upstream_sse_is_forwarded_as_text_chunks(monkeypatch):
+    def upstream(request: httpx.Request) -> httpx.Response:
+        assert request.url.params["alt"] == "sse"
+        lines = [
+            json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]})
+            for text in ("Bon", "jour")
+        ]
+        body = "".join(f"data: {line}\r\n\r\n" for line in lines)
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    monkeypatch.setattr(api_request_module, "get_http_client", lambda: client)
+    payload = GemmaPayload(
+        contents=[Content(role="user", parts=[Part(text="Bonjour", inlineData=None)])]
+    )
+
+    chunks = [chunk async for chunk in api_request_module.api_request_stream(payload)]
+    await client.aclose()
+
+    assert chunks == ["Bon", "jour"]
@@ -0,0 +1,65 @@
+import pytest
+
+from app.core.token_budget import ConversationCompactor, SummaryCache
+from app.models.gemma import Content, Part
+
+
+class FakeSummaryCompactor(ConversationCompactor):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.folded: list[int] = []
+
+    async def _summarize(self, summary, turns):
+        self.folded.append(len(turns))
+        return f"{summary or ''}+{len(turns)}"
+
+
+def conversation(turns: int, size: int = 800) -> list[Content]:
+    return [
+        Content(role="user" if i % 2 == 0 else "model", parts=[Part(text=(f"{i}" * size)[:size])])
+        for i in range(turns)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_short_conversations_are_sent_verbatim():
+    contents = conversation(3)
+    result = await FakeSummaryCompactor(budget=10_000).compact(contents)
+
+    assert result.contents == contents
+    assert not result.compacted
+
+
+@pytest.mark.asyncio
+async def test_old_turns_are_folded_and_roles_keep_alternating():
+    compactor = FakeSummaryCompactor(budget=2_000, keep_recent=4)
+    result = await compactor.compact(conversation(11))
+
+    roles = [content.role for content in result.contents]
+    assert roles == ["user", "model", "user", "model", "user"]
+    assert result.summary == "+6"
+    assert result.summarized == 8
+    assert "+6" in result.contents[2].parts[0].text
+
+
+@pytest.mark.asyncio
+async def test_summary_is_maintained_incrementally():
+    compactor = FakeSummaryCompactor(budget=2_000, keep_recent=4)
+    first = await compactor.compact(conversation(11))
+    second = await compactor.compact(
+        conversation(13), summary=first.summary, summarized=first.summarized
+    )
+
+    assert compactor.folded == [6, 2]
+    assert second.summary == "+6+2"
+
+
+@pytest.mark.asyncio
+async def test_stateless_history_is_summarized_incrementally():
+    compactor = FakeSummaryCompactor(budget=2_000, keep_recent=4, cache=SummaryCache())
+    await compactor.compact(conversation(11))
+    second = await compactor.compact(conversation(13))
+
+    assert compactor.folded == [6, 2]
+    assert second.summary == "+6+2"
+    assert compactor.cache.hits == 1
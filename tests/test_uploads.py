@@ -0,0 +1,63 @@
+import base64
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app._exceptions import UploadTooLargeError
+from app.utils.uploads import read_upload
+
+IMAGE = bytes(range(256)) * 40
+
+
+async def upload(request: Request) -> JSONResponse:
+    try:
+        file = await read_upload(request, max_bytes=16_384)
+    except UploadTooLargeError:
+        return JSONResponse({}, status_code=413)
+    return JSONResponse({"same": file.data == IMAGE, "mime": file.mime_type})
+
+
+def client() -> AsyncClient:
+    app = Starlette(routes=[Route("/scan", upload, methods=["POST"])])
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_multipart_raw_and_legacy_base64_bodies_decode_to_the_same_file():
+    encoded = base64.b64encode(IMAGE).decode()
+    async with client() as ac:
+        responses = [
+            await ac.post("/scan", files={"file": ("scan.png", IMAGE, "image/png")}),
+            await ac.post("/scan", content=IMAGE, headers={"Content-Type": "image/png"}),
+            await ac.post("/scan", content=f"data:image/png;base64,{encoded}"),
+            # Legacy clients may wrap lines and drop the padding.
+            await ac.post("/scan", content=f"{encoded[:100]}\n{encoded[100:]}".rstrip("=")),
+        ]
+
+    assert [response.json()["same"] for response in responses] == [True] * 4
+    assert [response.json()["mime"] for response in responses] == [
+        "image/png",
+        "image/png",
+        "image/png",
+        "image/jpeg",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_oversized_uploads_are_rejected_while_streaming():
+    async def chunks():
+        for _ in range(10):
+            yield IMAGE
+
+    headers = {"Content-Type": "image/png"}
+    async with client() as ac:
+        declared = await ac.post("/scan", content=IMAGE * 2, headers=headers)
+        # Without a Content-Length, the limit is enforced as the body is received.
+        streamed = await ac.post("/scan", content=chunks(), headers=headers)
+
+    assert declared.status_code == 413
+    assert streamed.status_code == 413